@@ -87,11 +87,14 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'dashboard.querystats.QueryStatsMiddleware',
+    'dashboard.replicas.ReplicaMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'dashboard.tenancy.TenantMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'social_django.middleware.SocialAuthExceptionMiddleware',
@@ -114,6 +117,8 @@ TEMPLATES = [
                 "django.template.context_processors.static",
                 'social_django.context_processors.backends',
                 'social_django.context_processors.login_redirect',
+                'dashboard.roles.roles',
+                'dashboard.notifications.notifications',
             ],
         },
     },
@@ -163,6 +168,41 @@ else:
     }
 # [END db_setup]
 
+# Read-only views read from a replica when one is configured, see
+# dashboard/replicas.py.
+if os.getenv('DATABASE_REPLICA_HOST', None):
+    DATABASES['replica'] = dict(DATABASES['default'],
+                                HOST=os.getenv('DATABASE_REPLICA_HOST'))
+DATABASE_ROUTERS = ['dashboard.replicas.ReplicaRouter']
+# Seconds after a user's POST during which their reads stay on the primary.
+REPLICA_STICKY_SECONDS = 10
+
+# Cache
+# https://docs.djangoproject.com/en/2.2/topics/cache/
+
+# Roles, tenants, reference data and API tokens (see dashboard/roles.py,
+# tenancy.py, reference.py and api.py) are cached and invalidated by signal
+# receivers, which only reach other instances through a shared cache; a
+# per-process cache would keep serving stale entries until they expire.
+# Memcached is used when MEMCACHED_HOSTS lists its servers; otherwise
+# App Engine falls back to the database cache, whose table is created with
+# `python manage.py createcachetable`. Running locally, the default
+# per-process memory cache is enough.
+if os.getenv('MEMCACHED_HOSTS', None):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.memcached.MemcachedCache',
+            'LOCATION': os.getenv('MEMCACHED_HOSTS').split(','),
+        }
+    }
+elif os.getenv('GAE_APPLICATION', None):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+            'LOCATION': 'dashboard_cache',
+        }
+    }
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
@@ -210,3 +250,28 @@ if os.getenv('GAE_APPLICATION', None):
 else:
     STATICFILES_DIRS = (os.path.join(BASE_DIR, 'static/'),)
 MEDIA_URL = 'https://storage.googleapis.com/crystal-ims.appspot.com/'
+
+# Query count and timing of every request, see dashboard/querystats.py.
+# Set QUERY_LOG_LEVEL=DEBUG to log the figures of each request.
+QUERY_STATS_HEADERS = DEBUG
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'dashboard.queries': {
+            'handlers': ['console'],
+            'level': os.getenv('QUERY_LOG_LEVEL', 'WARNING'),
+            'propagate': False,
+        },
+    },
+}
+
+# Seconds between the navigation bar's checks of messages/updates/ for new
+# messages. Each check that finds none doubles the wait, up to the maximum.
+MESSAGE_POLL_INTERVAL = 15
+MESSAGE_POLL_MAX_INTERVAL = 120
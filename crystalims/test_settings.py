@@ -0,0 +1,11 @@
+"""Settings for the test suite, which exercises replica routing:
+
+    python manage.py test --settings=crystalims.test_settings
+
+The replica is a test mirror of the default database, so read-only views
+route their reads to it without a second database being created.
+"""
+from .settings import *  # noqa: F401,F403
+from .settings import DATABASES
+
+DATABASES['replica'] = dict(DATABASES['default'], TEST={'MIRROR': 'default'})
@@ -38,3 +38,18 @@ admin.site.register(Message)
 admin.site.register(Supplier)
 admin.site.register(PurchaseOrder)
 admin.site.register(ItemReturn)
+admin.site.register(CompanyMetrics)
+admin.site.register(DemandForecast)
+admin.site.register(UnreadCounter)
+admin.site.register(Task)
+admin.site.register(OutgoingEmail)
+admin.site.register(ItemSearchIndex)
+admin.site.register(StockMovement)
+admin.site.register(StockSnapshot)
+
+
+@admin.register(ApiToken)
+class ApiTokenAdmin(admin.ModelAdmin):
+    list_display = ('name', 'prefix', 'company', 'user', 'is_active',
+                    'last_used_at')
+    readonly_fields = ('prefix', 'key_hash', 'last_used_at')
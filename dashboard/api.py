@@ -0,0 +1,462 @@
+"""Versioned JSON API for integrations and scanners.
+
+Machine clients send an ``ApiToken`` key as ``Authorization: Bearer <key>``
+and every request is scoped to the token's company. The views skip
+sessions, CSRF and templates: tokens are resolved from the cache, and rows
+are read with ``values_list()`` and written as compact JSON. Saving or
+deleting a token drops its cache entry, which revokes it.
+
+List and detail endpoints take ``fields=sku,price`` to return only some
+fields. Lists are ordered by primary key and continue from the ``next``
+value of the previous page, passed back as ``after``. The batch endpoints
+accept up to ``MAX_BATCH`` entries per call, validate all of them before
+writing anything and write them with a handful of queries.
+"""
+import datetime
+import json
+from collections import namedtuple
+from functools import wraps
+
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.http import JsonResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from django.views.decorators.csrf import csrf_exempt
+
+from . import stock
+
+from .models import (ApiToken, CompanyMetrics, Employee, Item, ItemRequest,
+                     PurchaseOrder, StockMovement, Supplier)
+from .replicas import read_only
+
+MAX_BATCH = 1000
+DEFAULT_LIMIT = 100
+CACHE_TIMEOUT = 5 * 60
+# Record the last use of a token at most this often, in seconds.
+LAST_USED_INTERVAL = 5 * 60
+
+ITEM_FIELDS = {
+    'sku': 'SKU',
+    'description': 'description',
+    'price': 'price',
+    'supplier': 'supplier_id',
+    'category': 'category_id',
+    'quantity_purchased': 'quantity_purchased',
+    'quantity_available': 'quantity_available',
+    'reorder_point': 'reorder_point',
+    'is_returnable': 'is_returnable',
+    'created_at': 'created_at',
+}
+REQUEST_FIELDS = {
+    'id': 'id',
+    'sku': 'item_id',
+    'user': 'user_id',
+    'status': 'status',
+    'created_at': 'created_at',
+}
+ORDER_FIELDS = {
+    'id': 'id',
+    'sku': 'item_id',
+    'quantity': 'quantity',
+    'status': 'status',
+    'created_at': 'created_at',
+}
+SUPPLIER_FIELDS = {
+    'id': 'id',
+    'name': 'name',
+    'email': 'email',
+    'description': 'description',
+}
+
+Client = namedtuple('Client', 'token_id company_id user_id')
+
+
+class ApiError(Exception):
+    def __init__(self, message, status=400, **extra):
+        super().__init__(message)
+        self.status = status
+        self.extra = extra
+
+
+def json_response(data, status=200):
+    return JsonResponse(data, status=status, encoder=DjangoJSONEncoder,
+                        json_dumps_params={'separators': (',', ':')})
+
+
+def error_response(message, status=400, **extra):
+    return json_response(dict(extra, error=message), status=status)
+
+
+def cache_key(key_hash):
+    return 'api-token:{0}'.format(key_hash)
+
+
+def authenticate(request):
+    """Return the ``Client`` of the request's bearer token, or ``None``."""
+    scheme, _, key = request.META.get('HTTP_AUTHORIZATION', '').partition(' ')
+    if scheme.lower() != 'bearer' or not key.strip():
+        return None
+    key_hash = ApiToken.hash_key(key.strip())
+    client = cache.get(cache_key(key_hash))
+    if client is None:
+        row = ApiToken.objects.filter(
+            key_hash=key_hash, is_active=True).values_list(
+            'id', 'company_id', 'user_id').first()
+        if row is None:
+            return None
+        client = Client(*row)
+        cache.set(cache_key(key_hash), client, CACHE_TIMEOUT)
+    if cache.add('api-token-used:{0}'.format(client.token_id), True,
+                 LAST_USED_INTERVAL):
+        ApiToken.objects.filter(id=client.token_id).update(
+            last_used_at=timezone.now())
+    return client
+
+
+@receiver(post_save, sender=ApiToken)
+@receiver(post_delete, sender=ApiToken)
+def invalidate_token(sender, instance, **kwargs):
+    cache.delete(cache_key(instance.key_hash))
+
+
+def api_view(*methods):
+    """Authenticate the request's token and turn ``ApiError`` into error
+    responses. The view may only be called with ``methods``."""
+
+    def decorator(view):
+        @csrf_exempt
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in methods:
+                response = error_response('Method not allowed.', 405)
+                response['Allow'] = ', '.join(methods)
+                return response
+            request.client = authenticate(request)
+            if request.client is None:
+                response = error_response('Invalid or missing token.', 401)
+                response['WWW-Authenticate'] = 'Bearer'
+                return response
+            try:
+                return view(request, *args, **kwargs)
+            except ApiError as error:
+                return error_response(str(error), error.status,
+                                      **error.extra)
+
+        return wrapper
+
+    return decorator
+
+
+def selected_fields(request, fields):
+    """Return the ``(name, lookup)`` pairs picked by the ``fields``
+    parameter, or all of ``fields``."""
+    names = [name for name in request.GET.get('fields', '').split(',')
+             if name]
+    if not names:
+        return list(fields.items())
+    unknown = [name for name in names if name not in fields]
+    if unknown:
+        raise ApiError('Unknown fields: {0}.'.format(', '.join(unknown)),
+                       fields=list(fields))
+    return [(name, fields[name]) for name in names]
+
+
+def rows_of(queryset, columns):
+    names = [name for name, _ in columns]
+    return [dict(zip(names, row)) for row in queryset.values_list(
+        *[lookup for _, lookup in columns])]
+
+
+def list_response(request, queryset, fields):
+    """Return one page of ``queryset`` in primary key order."""
+    columns = selected_fields(request, fields)
+    try:
+        limit = int(request.GET.get('limit', DEFAULT_LIMIT))
+    except ValueError:
+        raise ApiError('limit must be a number.')
+    limit = min(max(limit, 1), MAX_BATCH)
+    pk = queryset.model._meta.pk
+    queryset = queryset.order_by(pk.name)
+    if request.GET.get('after'):
+        try:
+            after = pk.to_python(request.GET['after'])
+        except ValidationError:
+            raise ApiError('Invalid after.')
+        queryset = queryset.filter(pk__gt=after)
+    names = [name for name, _ in columns]
+    rows = list(queryset.values_list(
+        pk.name, *[lookup for _, lookup in columns])[:limit + 1])
+    next_after = rows[limit - 1][0] if len(rows) > limit else None
+    return json_response({
+        'results': [dict(zip(names, row[1:])) for row in rows[:limit]],
+        'next': next_after,
+    })
+
+
+def detail_response(request, queryset, pk, fields):
+    rows = rows_of(queryset.filter(pk=pk), selected_fields(request, fields))
+    if not rows:
+        raise ApiError('Not found.', 404)
+    return json_response(rows[0])
+
+
+def read_batch(request, name):
+    """Return the list under ``name`` in the JSON body of the request."""
+    try:
+        body = json.loads(request.body.decode())
+    except ValueError:
+        raise ApiError('The body must be JSON.')
+    entries = body.get(name) if isinstance(body, dict) else None
+    if not isinstance(entries, list):
+        raise ApiError('The body must have a "{0}" list.'.format(name))
+    if len(entries) > MAX_BATCH:
+        raise ApiError('At most {0} {1} per call.'.format(MAX_BATCH, name),
+                       413)
+    return entries
+
+
+def check_entries(entries, *required):
+    """Raise an ``ApiError`` listing the entries that are not objects with
+    the ``required`` keys."""
+    errors = [{'index': index, 'error': 'Missing {0}.'.format(
+        ', '.join(key for key in required
+                  if not isinstance(entry, dict) or key not in entry))}
+        for index, entry in enumerate(entries)
+        if not isinstance(entry, dict) or
+        not all(key in entry for key in required)]
+    if errors:
+        raise ApiError('Invalid entries.', errors=errors)
+
+
+TYPE_NAMES = {str: 'a string', int: 'a whole number'}
+
+
+def check_types(entries, **types):
+    """Raise an ``ApiError`` listing the entries whose values are not of
+    the type given for their key. Missing keys are not checked."""
+    errors = [{'index': index,
+               'error': '{0} must be {1}.'.format(key, TYPE_NAMES[kind])}
+              for index, entry in enumerate(entries)
+              for key, kind in types.items()
+              if key in entry and (not isinstance(entry[key], kind) or
+                                   isinstance(entry[key], bool))]
+    if errors:
+        raise ApiError('Invalid entries.', errors=errors)
+
+
+def parse_time(value):
+    """Parse an ISO date or datetime. A date means the end of that day."""
+    try:
+        when = parse_datetime(value)
+        if when is None:
+            day = parse_date(value)
+            if day is None:
+                raise ValueError
+            when = datetime.datetime.combine(day, datetime.time.max)
+    except ValueError:
+        raise ApiError('Invalid date or time {0}.'.format(value))
+    if timezone.is_naive(when):
+        when = timezone.make_aware(when)
+    return when
+
+
+def company_items(request):
+    return Item.objects.filter(company_id=request.client.company_id)
+
+
+@read_only
+@api_view('GET')
+def items(request):
+    return list_response(request, company_items(request), ITEM_FIELDS)
+
+
+@read_only
+@api_view('GET')
+def item(request, sku):
+    return detail_response(request, company_items(request), sku, ITEM_FIELDS)
+
+
+@api_view('POST')
+def lookup_items(request):
+    """Return the items of up to ``MAX_BATCH`` SKUs, and the SKUs that
+    were not found."""
+    skus = read_batch(request, 'skus')
+    if not all(isinstance(sku, str) for sku in skus):
+        raise ApiError('SKUs must be strings.')
+    columns = selected_fields(request, ITEM_FIELDS)
+    if 'sku' not in dict(columns):
+        columns.insert(0, ('sku', 'SKU'))
+    results = rows_of(company_items(request).filter(SKU__in=set(skus)),
+                      columns)
+    found = {row['sku'] for row in results}
+    return json_response({
+        'results': results,
+        'missing': [sku for sku in dict.fromkeys(skus) if sku not in found],
+    })
+
+
+@api_view('POST')
+def update_stock(request):
+    """Set (``quantity_available``) or adjust (``delta``) the stock of up to
+    ``MAX_BATCH`` items at once. Nothing is changed if any entry fails."""
+    updates = read_batch(request, 'updates')
+    check_entries(updates, 'sku')
+    check_types(updates, sku=str)
+    errors = []
+    for index, update in enumerate(updates):
+        quantity = update.get('quantity_available', update.get('delta'))
+        if (('quantity_available' in update) == ('delta' in update) or
+                not isinstance(quantity, int) or isinstance(quantity, bool)):
+            errors.append({'index': index,
+                           'error': 'Give a whole quantity_available or '
+                                    'delta.'})
+    if errors:
+        raise ApiError('Invalid entries.', errors=errors)
+
+    with transaction.atomic():
+        items = company_items(request).select_for_update().only(
+            'SKU', 'price', 'quantity_available').in_bulk(
+            list({update['sku'] for update in updates}))
+        before = {sku: item.quantity_available for sku, item in items.items()}
+        for index, update in enumerate(updates):
+            item = items.get(update['sku'])
+            if item is None:
+                errors.append({'index': index, 'error': 'Unknown SKU.'})
+                continue
+            if 'delta' in update:
+                item.quantity_available += update['delta']
+            else:
+                item.quantity_available = update['quantity_available']
+            if item.quantity_available < 0:
+                errors.append({'index': index,
+                               'error': 'Stock cannot go below zero.'})
+        if errors:
+            raise ApiError('Invalid entries.', errors=errors)
+        changed = [item for sku, item in items.items()
+                   if item.quantity_available != before[sku]]
+        Item.objects.bulk_update(changed, ['quantity_available'])
+        # bulk_update() skips the Item receivers.
+        StockMovement.objects.bulk_create([
+            StockMovement(item=item, company_id=request.client.company_id,
+                          kind='A',
+                          quantity=item.quantity_available - before[item.SKU])
+            for item in changed])
+        CompanyMetrics.apply(
+            request.client.company_id,
+            quantity_available=sum(item.quantity_available - before[item.SKU]
+                                   for item in changed),
+            inventory_value=sum(
+                item.price * (item.quantity_available - before[item.SKU])
+                for item in changed))
+    return json_response({'results': [
+        {'sku': sku, 'quantity_available': item.quantity_available}
+        for sku, item in items.items()]})
+
+
+@read_only
+@api_view('GET', 'POST')
+def item_requests(request):
+    """List the company's item requests, or create up to ``MAX_BATCH`` of
+    them. Requests are made as the token's user unless they name another
+    employee of the company."""
+    queryset = ItemRequest.objects.filter(
+        item__company_id=request.client.company_id)
+    if request.method == 'GET':
+        if request.GET.get('status'):
+            queryset = queryset.filter(status=request.GET['status'])
+        if request.GET.get('sku'):
+            queryset = queryset.filter(item_id=request.GET['sku'])
+        return list_response(request, queryset, REQUEST_FIELDS)
+
+    entries = read_batch(request, 'requests')
+    check_entries(entries, 'sku')
+    check_types(entries, sku=str, user=int)
+    skus = set(company_items(request).filter(
+        SKU__in={entry['sku'] for entry in entries}).values_list(
+        'SKU', flat=True))
+    employees = set(Employee.objects.filter(
+        location__company_id=request.client.company_id,
+        user_id__in={entry.get('user', request.client.user_id)
+                     for entry in entries}).values_list('user_id', flat=True))
+    errors = []
+    for index, entry in enumerate(entries):
+        if entry['sku'] not in skus:
+            errors.append({'index': index, 'error': 'Unknown SKU.'})
+        elif entry.get('user', request.client.user_id) not in employees:
+            errors.append({'index': index, 'error': 'Unknown user.'})
+    if errors:
+        raise ApiError('Invalid entries.', errors=errors)
+    with transaction.atomic():
+        ItemRequest.objects.bulk_create([
+            ItemRequest(item_id=entry['sku'],
+                        user_id=entry.get('user', request.client.user_id))
+            for entry in entries])
+        # bulk_create() skips the ItemRequest receivers.
+        CompanyMetrics.apply(request.client.company_id,
+                             requests_count=len(entries),
+                             pending_count=len(entries))
+    return json_response({'created': len(entries)}, status=201)
+
+
+@read_only
+@api_view('GET')
+def item_request(request, pk):
+    return detail_response(request, ItemRequest.objects.filter(
+        item__company_id=request.client.company_id), pk, REQUEST_FIELDS)
+
+
+@read_only
+@api_view('GET')
+def purchase_orders(request):
+    queryset = PurchaseOrder.objects.filter(
+        item__company_id=request.client.company_id)
+    if request.GET.get('status'):
+        queryset = queryset.filter(status=request.GET['status'])
+    if request.GET.get('sku'):
+        queryset = queryset.filter(item_id=request.GET['sku'])
+    return list_response(request, queryset, ORDER_FIELDS)
+
+
+@read_only
+@api_view('GET')
+def purchase_order(request, pk):
+    return detail_response(request, PurchaseOrder.objects.filter(
+        item__company_id=request.client.company_id), pk, ORDER_FIELDS)
+
+
+@read_only
+@api_view('GET')
+def suppliers(request):
+    return list_response(request, Supplier.objects.filter(
+        company_id=request.client.company_id), SUPPLIER_FIELDS)
+
+
+@read_only
+@api_view('GET')
+def supplier(request, pk):
+    return detail_response(request, Supplier.objects.filter(
+        company_id=request.client.company_id), pk, SUPPLIER_FIELDS)
+
+
+@read_only
+@api_view('GET')
+def stock_levels(request):
+    """Return the stock of the company's items, or of one ``sku``, at the
+    time given as ``at`` (now by default)."""
+    at = request.GET.get('at')
+    when = parse_time(at) if at else timezone.now()
+    sku = request.GET.get('sku')
+    if sku:
+        if not company_items(request).filter(SKU=sku).exists():
+            raise ApiError('Not found.', 404)
+        quantities = {sku: stock.stock_at(sku, when)}
+    else:
+        quantities = stock.stock_on(request.client.company_id, when)
+    return json_response({'at': when, 'results': [
+        {'sku': sku, 'quantity': quantity}
+        for sku, quantity in sorted(quantities.items())]})
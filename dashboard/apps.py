@@ -3,3 +3,7 @@ from django.apps import AppConfig
 
 class DashboardConfig(AppConfig):
     name = 'dashboard'
+
+    def ready(self):
+        # Connect the cache invalidation and search index receivers.
+        from . import api, reference, roles, search, tenancy  # noqa: F401
@@ -0,0 +1,126 @@
+"""Resized variants of profile pictures.
+
+Uploads are stored as they are on ``Employee.image``, and the
+``process_avatar`` task makes square thumbnails of every size in ``SIZES``
+as WebP and as a JPEG fallback. Variants are named after the SHA-256 of
+the uploaded file, so a name always refers to the same bytes: they are
+stored with a far-future immutable ``Cache-Control`` where the storage
+supports it, identical uploads share one set of variants, and only the
+first of them is resized.
+
+Templates show the variants with ``{% avatar employee size %}`` from
+``profile_extras``, which falls back to the original until the task has
+run.
+"""
+import hashlib
+import io
+from functools import lru_cache
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import get_storage_class
+from PIL import Image, ImageOps
+
+from .models import Employee
+from .tasks import task
+
+SIZES = (64, 256)
+FORMATS = (
+    ('webp', 'WEBP', {'quality': 80}),
+    ('jpg', 'JPEG', {'quality': 85, 'optimize': True, 'progressive': True}),
+)
+CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+
+@lru_cache(maxsize=None)
+def storage():
+    """The default storage, configured for immutable files where it has
+    the settings for it."""
+    storage_class = get_storage_class()
+    options = {}
+    if hasattr(storage_class, 'cache_control'):
+        options['cache_control'] = CACHE_CONTROL
+    if hasattr(storage_class, 'file_overwrite'):
+        # Two senders racing on one name write the same bytes.
+        options['file_overwrite'] = True
+    return storage_class(**options)
+
+
+def variant_name(digest, size, extension):
+    return 'avatars/{0}/{1}.{2}'.format(digest, size, extension)
+
+
+def variant_names(digest):
+    return [variant_name(digest, size, extension)
+            for size in SIZES for extension, _, _ in FORMATS]
+
+
+def file_digest(file):
+    sha = hashlib.sha256()
+    file.seek(0)
+    for chunk in iter(lambda: file.read(65536), b''):
+        sha.update(chunk)
+    file.seek(0)
+    return sha.hexdigest()
+
+
+def thumbnails(file):
+    """Yield ``(size, extension, bytes)`` for every variant of the image in
+    ``file``."""
+    image = Image.open(file)
+    # JPEGs can be decoded at a fraction of their size, which is much
+    # faster for camera photos.
+    image.draft('RGB', (max(SIZES) * 2, max(SIZES) * 2))
+    image = ImageOps.exif_transpose(image)
+    if image.mode in ('RGBA', 'LA', 'P'):
+        image = image.convert('RGBA')
+        background = Image.new('RGB', image.size, 'white')
+        background.paste(image, mask=image.getchannel('A'))
+        image = background
+    else:
+        image = image.convert('RGB')
+    for size in sorted(SIZES, reverse=True):
+        image = ImageOps.fit(image, (size, size), Image.LANCZOS)
+        for extension, image_format, options in FORMATS:
+            output = io.BytesIO()
+            image.save(output, image_format, **options)
+            yield size, extension, output.getvalue()
+
+
+def make_variants(file):
+    """Store the variants of the image in ``file`` unless an identical
+    upload already has them. Returns the digest of the file."""
+    digest = file_digest(file)
+    names = variant_names(digest)
+    if all(storage().exists(name) for name in names):
+        return digest
+    for size, extension, data in thumbnails(file):
+        name = variant_name(digest, size, extension)
+        if not storage().exists(name):
+            storage().save(name, ContentFile(data))
+    return digest
+
+
+def delete_variants(digest):
+    """Delete the variants of ``digest`` unless another employee uses
+    them."""
+    if not digest or Employee.objects.filter(avatar=digest).exists():
+        return
+    for name in variant_names(digest):
+        storage().delete(name)
+
+
+@task(max_attempts=3)
+def process_avatar(employee_id):
+    employee = Employee.objects.get(id=employee_id)
+    if not employee.image:
+        return
+    with employee.image.open('rb') as file:
+        digest = make_variants(file)
+    old = employee.avatar
+    if old == digest:
+        return
+    employee.avatar = digest
+    # Saving, rather than updating, lets the receivers drop the cached
+    # employee of the user.
+    employee.save(update_fields=['avatar'])
+    delete_variants(old)
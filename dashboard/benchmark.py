@@ -0,0 +1,113 @@
+"""Latency and query count benchmark of the dashboard URLs.
+
+Every URL in ``dashboard/urls.py`` that is safe to request with ``GET`` is
+fetched ``iterations`` times as an admin of a company, after one warm-up
+request, with the test client. Streamed responses are read to the end.
+The results give the median and 95th percentile latency and the median
+query count of each URL, so runs against the same synthetic dataset (see
+``synthetic.py``) can be compared before and after a change.
+"""
+import statistics
+import time
+
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import URLPattern, reverse
+
+from . import urls
+from .models import Item, Message, Supplier, User
+from .querystats import QueryRecorder, percentile
+from .roles import ADMIN_GROUPS
+
+# URLs that change data when requested, or need a POST body.
+SKIPPED = {
+    'delete_item', 'edit_item', 'edit_user', 'fulfil_item_request',
+    'fulfil_item_requests', 'image_upload', 'place_order', 'reorder_items',
+    'request_item', 'return_item', 'send', 'verify',
+}
+QUERY_STRINGS = {
+    'export_items': '?format=csv',
+    'export_item_requests': '?format=csv',
+    'export_purchase_orders': '?format=csv',
+    'search_items': '?q=a',
+}
+
+
+def sample_arguments(user):
+    """Return the URL arguments of the pages to benchmark, keyed by URL
+    name, using objects of the user's company."""
+    company = user.employee.location.company
+    item = Item.objects.filter(company=company).order_by('SKU').first()
+    supplier = Supplier.objects.filter(company=company).order_by('id').first()
+    message = Message.objects.filter(from_user=user).order_by('id').first()
+    arguments = {'team_member': {'pk': user.pk}}
+    if item is not None:
+        arguments['item'] = {'pk': item.pk}
+        arguments['item_history'] = {'pk': item.pk, 'kind': 'requests'}
+    if supplier is not None:
+        arguments['supplier'] = {'pk': supplier.pk}
+    if message is not None:
+        arguments['message'] = {'pk': message.pk}
+    return arguments
+
+
+def benchmark_user(company_id=None):
+    users = User.objects.filter(groups__name__in=ADMIN_GROUPS).order_by('id')
+    if company_id is not None:
+        users = users.filter(employee__location__company_id=company_id)
+    return users.select_related('employee__location__company').first()
+
+
+def targets(user, names=None):
+    """Yield the ``(name, url)`` pairs to benchmark."""
+    arguments = sample_arguments(user)
+    seen = set()
+    for pattern in urls.urlpatterns:
+        if not isinstance(pattern, URLPattern) or pattern.name in seen:
+            continue
+        name = pattern.name
+        seen.add(name)
+        if name in SKIPPED or (names and name not in names):
+            continue
+        if pattern.pattern.converters:
+            if name not in arguments:
+                continue
+            url = reverse(name, kwargs=arguments[name])
+        else:
+            url = reverse(name)
+        yield name, url + QUERY_STRINGS.get(name, '')
+
+
+def fetch(client, url):
+    response = client.get(url)
+    if response.streaming:
+        for _ in response.streaming_content:
+            pass
+    return response
+
+
+def run(user, iterations=10, names=None):
+    """Benchmark the URLs as ``user``. Returns one result dict per URL."""
+    client = Client()
+    client.force_login(user)
+    results = []
+    with override_settings(ALLOWED_HOSTS=['testserver']):
+        for name, url in targets(user, names):
+            fetch(client, url)
+            timings, counts = [], []
+            for _ in range(iterations):
+                with QueryRecorder() as recorder:
+                    start = time.perf_counter()
+                    response = fetch(client, url)
+                    timings.append(time.perf_counter() - start)
+                counts.append(recorder.count)
+            timings.sort()
+            results.append({
+                'name': name,
+                'url': url,
+                'status': response.status_code,
+                'p50_ms': round(percentile(timings, 50) * 1000, 1),
+                'p95_ms': round(percentile(timings, 95) * 1000, 1),
+                'queries': int(statistics.median(counts)),
+            })
+    return results
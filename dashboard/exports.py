@@ -0,0 +1,77 @@
+"""Streaming CSV and NDJSON exports.
+
+Rows are fetched in primary key order, one batch at a time, and written to
+the response as they arrive. Memory use stays flat however many rows are
+exported and the first bytes go out before the whole table has been read.
+Batches are keyed on the primary key rather than relying on
+``QuerySet.iterator()`` because the MySQL driver buffers the full result set
+of a query client-side.
+"""
+import csv
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+
+FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+
+
+class Echo:
+    """A file-like object that hands back whatever is written to it."""
+
+    def write(self, value):
+        return value
+
+
+def iterate_in_batches(queryset, fields, batch_size=2000):
+    """Yield ``fields`` of every row of ``queryset`` as tuples, reading
+    ``batch_size`` rows per query."""
+    pk_name = queryset.model._meta.pk.name
+    queryset = queryset.order_by(pk_name).values_list(pk_name, *fields)
+    last_pk = None
+    while True:
+        batch = queryset
+        if last_pk is not None:
+            batch = batch.filter(pk__gt=last_pk)
+        rows = list(batch[:batch_size])
+        for row in rows:
+            yield row[1:]
+        if len(rows) < batch_size:
+            break
+        last_pk = rows[-1][0]
+
+
+def stream_csv(headers, rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(headers)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def stream_ndjson(headers, rows):
+    encoder = DjangoJSONEncoder(separators=(',', ':'))
+    for row in rows:
+        yield encoder.encode(dict(zip(headers, row))) + '\n'
+
+
+def export_response(queryset, columns, filename, export_format='csv'):
+    """Stream ``queryset`` as a download.
+
+    ``columns`` is a list of ``(header, lookup)`` pairs where ``lookup`` may
+    follow relations, e.g. ``('supplier', 'supplier__name')``.
+    """
+    if export_format not in FORMATS:
+        export_format = 'csv'
+    headers = [header for header, _ in columns]
+    rows = iterate_in_batches(queryset, [lookup for _, lookup in columns])
+    if export_format == 'ndjson':
+        content = stream_ndjson(headers, rows)
+    else:
+        content = stream_csv(headers, rows)
+    response = StreamingHttpResponse(content,
+                                     content_type=FORMATS[export_format])
+    response['Content-Disposition'] = 'attachment; filename="{0}.{1}"'.format(
+        filename, export_format)
+    return response
@@ -0,0 +1,116 @@
+"""Demand forecasting from item request history.
+
+Requests are counted per item and day with one ``GROUP BY`` query, and the
+daily series of all items of a company are smoothed together with NumPy
+using exponential smoothing of the mean and variance:
+
+    difference = count - level
+    level      = level + ALPHA * difference
+    variance   = (1 - ALPHA) * (variance + ALPHA * difference ** 2)
+
+The level becomes the item's average daily usage and the level plus
+``SPREAD`` standard deviations its maximum daily usage. Only whole days are
+counted. Each item's ``DemandForecast`` row keeps its state and the day it
+was computed up to, so later runs only read requests created since then.
+Items that have never been requested keep their hand-entered figures.
+"""
+import datetime
+
+import numpy as np
+
+from django.db import transaction
+from django.db.models import Count, Min
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import DemandForecast, Item, ItemRequest
+
+ALPHA = 0.2
+SPREAD = 2
+
+
+def midnight(day):
+    return timezone.make_aware(datetime.datetime.combine(day, datetime.time()))
+
+
+def daily_counts(company, start, end):
+    """Return ``(sku, day, count)`` rows for the company's requests made
+    from day ``start`` (or the beginning if None) up to day ``end``,
+    ordered by day."""
+    requests = ItemRequest.objects.filter(
+        item__company=company, created_at__lt=midnight(end)).exclude(
+        status='C')
+    if start is not None:
+        requests = requests.filter(created_at__gte=midnight(start))
+    return requests.annotate(day=TruncDate('created_at')).values_list(
+        'item_id', 'day').annotate(count=Count('id')).order_by('day')
+
+
+def run(company, full=False, today=None, batch_size=500):
+    """Update the demand forecasts and usage figures of the company's items.
+
+    Continues from the previous run unless ``full`` is set, in which case
+    the whole request history is read again. Returns the number of items
+    whose usage figures changed.
+    """
+    today = today or timezone.localdate()
+    items = list(Item.objects.filter(company=company).order_by(
+        'SKU').values_list('SKU', 'average_daily_usage',
+                           'maximum_daily_usage'))
+    if not items:
+        return 0
+    index = {item[0]: position for position, item in enumerate(items)}
+    level = np.zeros(len(items))
+    variance = np.zeros(len(items))
+    seen = np.zeros(len(items), dtype=bool)
+    start = None
+    if not full:
+        forecasts = DemandForecast.objects.filter(item__company=company)
+        start = forecasts.aggregate(start=Min('updated_through'))['start']
+        for sku, item_level, item_variance in forecasts.values_list(
+                'item_id', 'level', 'variance'):
+            level[index[sku]] = item_level
+            variance[index[sku]] = item_variance
+            seen[index[sku]] = True
+    if start is not None and start >= today:
+        return 0
+
+    rows = list(daily_counts(company, start, today))
+    if start is None:
+        start = rows[0][1] if rows else today
+    item_index = np.array([index[sku] for sku, _, _ in rows], dtype=np.int64)
+    day_index = np.array([(day - start).days for _, day, _ in rows],
+                         dtype=np.int64)
+    counts = np.array([count for _, _, count in rows], dtype=float)
+    seen[item_index] = True
+    days = (today - start).days
+    bounds = np.searchsorted(day_index, np.arange(days + 1))
+    for day in range(days):
+        demand = np.zeros(len(items))
+        chunk = slice(bounds[day], bounds[day + 1])
+        demand[item_index[chunk]] = counts[chunk]
+        difference = demand - level
+        level += ALPHA * difference
+        variance = (1 - ALPHA) * (variance + ALPHA * difference ** 2)
+
+    average = np.rint(level).astype(np.int64)
+    maximum = np.maximum(
+        np.ceil(level + SPREAD * np.sqrt(variance)), average).astype(np.int64)
+    changed = [Item(SKU=sku, average_daily_usage=int(average[position]),
+                    maximum_daily_usage=int(maximum[position]))
+               for position, (sku, current_average, current_maximum)
+               in enumerate(items)
+               if seen[position] and (current_average, current_maximum) != (
+                   average[position], maximum[position])]
+    with transaction.atomic():
+        DemandForecast.objects.filter(item__company=company).delete()
+        DemandForecast.objects.bulk_create([
+            DemandForecast(item_id=items[position][0],
+                           level=float(level[position]),
+                           variance=float(variance[position]),
+                           updated_through=today)
+            for position in np.flatnonzero(seen)])
+        Item.objects.bulk_update(changed, ['average_daily_usage',
+                                           'maximum_daily_usage'],
+                                 batch_size=batch_size)
+    return len(changed)
@@ -0,0 +1,58 @@
+"""Summary figures of an item's request and purchase order history.
+
+Both are single aggregate queries, so the item page shows them without
+loading any history rows. The rows themselves are paged in by the
+``item_history`` fragment view.
+"""
+import datetime
+
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+from .models import ItemRequest, PurchaseOrder
+from .reorder import OPEN_ORDER_STATUSES
+
+SUMMARY_MONTHS = 12
+
+
+def first_month(months, now=None):
+    """Return the start of the month ``months - 1`` months before now."""
+    now = timezone.localtime(now)
+    month = now.year * 12 + now.month - 1 - (months - 1)
+    return now.replace(year=month // 12, month=month % 12 + 1, day=1,
+                       hour=0, minute=0, second=0, microsecond=0)
+
+
+def monthly_requests(item, months=SUMMARY_MONTHS):
+    """Return ``(month, count)`` pairs of the item's requests in each of the
+    last ``months`` months, including months without any."""
+    start = first_month(months)
+    rows = ItemRequest.objects.filter(
+        item=item, created_at__gte=start).annotate(
+        month=TruncMonth('created_at')).values('month').annotate(
+        count=Count('id')).order_by()
+    counts = {}
+    for row in rows:
+        month = row['month']
+        if isinstance(month, datetime.datetime):
+            month = month.date()
+        counts[month] = row['count']
+    result = []
+    for offset in range(months):
+        month = start.year * 12 + start.month - 1 + offset
+        day = datetime.date(month // 12, month % 12 + 1, 1)
+        result.append((day, counts.get(day, 0)))
+    return result
+
+
+def order_totals(item):
+    """Return the quantity ever ordered of the item and the number and
+    quantity of its orders still outstanding."""
+    outstanding = Q(status__in=OPEN_ORDER_STATUSES)
+    totals = PurchaseOrder.objects.filter(item=item).exclude(
+        status='C').aggregate(
+        ordered=Sum('quantity'),
+        outstanding_orders=Count('id', filter=outstanding),
+        outstanding_quantity=Sum('quantity', filter=outstanding))
+    return {field: value or 0 for field, value in totals.items()}
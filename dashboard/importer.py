@@ -0,0 +1,237 @@
+"""Streaming bulk import of inventory items from CSV or XLSX files.
+
+Rows are read one at a time and processed in chunks: supplier and category
+names are resolved with one query per chunk, new items are written with
+``bulk_create`` and known SKUs with ``bulk_update``. Because bulk writes skip
+the ``Item`` signals, the valuation ledger, company metrics and stock
+movements are written once per chunk here instead. Each chunk is written in
+its own transaction, so one that fails leaves the chunks before it imported.
+
+Columns (header names are case-insensitive): ``SKU``, ``description``,
+``price``, ``quantity``, ``supplier``, ``category`` and optionally
+``returnable`` and ``reorder_point``. For SKUs that already exist the
+quantity is treated as newly received stock and added to what is on hand.
+"""
+import csv
+import io
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+from zipfile import BadZipFile
+
+from django.db import transaction
+
+from . import ledger, search
+from .models import (Category, CompanyMetrics, Item, StockMovement,
+                     Supplier)
+
+REQUIRED_COLUMNS = ('sku', 'description', 'price', 'quantity', 'supplier',
+                    'category')
+TRUE_VALUES = ('1', 'true', 'yes', 'y')
+# The largest value an IntegerField column holds on every supported database.
+MAX_INTEGER = 2 ** 31 - 1
+
+
+class ImportResult:
+    def __init__(self):
+        self.created = 0
+        self.updated = 0
+        self.errors = []
+
+    def add_error(self, row_number, message):
+        self.errors.append((row_number, message))
+
+    def __str__(self):
+        return "{0} created, {1} updated, {2} errors".format(
+            self.created, self.updated, len(self.errors))
+
+
+def read_rows(file, name):
+    """Yield ``(row_number, row)`` pairs from an uploaded CSV or XLSX file.
+
+    Header names are lower-cased and row numbers count the header as row 1,
+    matching what a spreadsheet shows.
+    """
+    if name.lower().endswith('.xlsx'):
+        rows = _read_xlsx(file)
+    else:
+        rows = _read_csv(file)
+    header = [str(column or '').strip().lower() for column in next(rows, [])]
+    missing = [column for column in REQUIRED_COLUMNS if column not in header]
+    if missing:
+        raise ValueError('Missing columns: {0}'.format(', '.join(missing)))
+    for row_number, values in enumerate(rows, start=2):
+        if not any(values):
+            continue
+        yield row_number, dict(zip(header, values))
+
+
+def _read_csv(file):
+    if isinstance(file, io.TextIOBase):
+        text = file
+    else:
+        text = io.TextIOWrapper(file, encoding='utf-8-sig', newline='')
+    yield from csv.reader(text)
+
+
+def _read_xlsx(file):
+    try:
+        from openpyxl import load_workbook
+        from openpyxl.utils.exceptions import InvalidFileException
+    except ImportError:
+        raise ValueError('openpyxl is required to import XLSX files')
+    try:
+        workbook = load_workbook(file, read_only=True, data_only=True)
+    except (BadZipFile, InvalidFileException, KeyError, OSError):
+        raise ValueError('The file is not a valid XLSX workbook')
+    try:
+        yield from workbook.active.iter_rows(values_only=True)
+    finally:
+        workbook.close()
+
+
+class ItemImporter:
+    UPDATE_FIELDS = ['description', 'price', 'supplier', 'category',
+                     'quantity_purchased', 'quantity_available',
+                     'is_returnable', 'reorder_point']
+
+    def __init__(self, company, chunk_size=1000):
+        self.company = company
+        self.chunk_size = chunk_size
+
+    def run(self, rows):
+        """Import ``(row_number, row)`` pairs and return an ImportResult."""
+        result = ImportResult()
+        rows = iter(rows)
+        while True:
+            chunk = list(islice(rows, self.chunk_size))
+            if not chunk:
+                break
+            self.import_chunk(chunk, result)
+        return result
+
+    def import_chunk(self, chunk, result):
+        suppliers = dict(Supplier.objects.filter(
+            company=self.company,
+            name__in={str(row.get('supplier') or '').strip()
+                      for _, row in chunk}).values_list('name', 'id'))
+        categories = dict(Category.objects.filter(
+            company=self.company,
+            name__in={str(row.get('category') or '').strip()
+                      for _, row in chunk}).values_list('name', 'id'))
+
+        parsed = {}
+        for row_number, row in chunk:
+            try:
+                values = self.parse_row(row, suppliers, categories)
+            except ValueError as error:
+                result.add_error(row_number, str(error))
+                continue
+            if values['SKU'] in parsed:
+                result.add_error(row_number, 'Duplicate SKU {0}'.format(
+                    values['SKU']))
+                continue
+            parsed[values['SKU']] = (row_number, values)
+
+        # Each chunk commits on its own, so its ledger deltas are flushed in
+        # its transaction and the known items it adds stock to are locked
+        # until then, keeping concurrent fulfilments from being overwritten.
+        with transaction.atomic(), ledger.buffered():
+            created, updated = self.write_chunk(parsed, result)
+        result.created += created
+        result.updated += updated
+
+    def write_chunk(self, parsed, result):
+        existing = Item.objects.select_for_update().in_bulk(list(parsed))
+        new_items, changed_items, movements = [], [], []
+        metrics = {'inventory_value': 0, 'quantity_purchased': 0,
+                   'quantity_available': 0, 'items_count': 0}
+        for sku, (row_number, values) in parsed.items():
+            quantity = values.pop('quantity')
+            item = existing.get(sku)
+            if item is None:
+                item = Item(company=self.company, quantity_purchased=quantity,
+                            quantity_available=quantity, **values)
+                new_items.append(item)
+                metrics['items_count'] += 1
+                old_value = old_stock = 0
+            elif item.company_id != self.company.id:
+                result.add_error(row_number,
+                                 'SKU {0} belongs to another company'.format(
+                                     sku))
+                continue
+            elif item.quantity_purchased + quantity > MAX_INTEGER:
+                result.add_error(row_number,
+                                 'quantity of SKU {0} is too large'.format(
+                                     sku))
+                continue
+            else:
+                old_value = item.price * item.quantity_purchased
+                old_stock = item.price * item.quantity_available
+                for field, value in values.items():
+                    setattr(item, field, value)
+                item.quantity_purchased += quantity
+                item.quantity_available += quantity
+                changed_items.append(item)
+            metrics['inventory_value'] += \
+                item.price * item.quantity_available - old_stock
+            metrics['quantity_purchased'] += quantity
+            metrics['quantity_available'] += quantity
+            if quantity:
+                movements.append(StockMovement(
+                    item_id=sku, company=self.company, kind='R',
+                    quantity=quantity))
+            ledger.record(self.company.id,
+                          item.price * item.quantity_purchased - old_value)
+
+        Item.objects.bulk_create(new_items)
+        Item.objects.bulk_update(changed_items, self.UPDATE_FIELDS)
+        StockMovement.objects.bulk_create(movements)
+        CompanyMetrics.apply(self.company.id, **metrics)
+        search.index_items(Item.objects.select_related(
+            'category', 'supplier').filter(SKU__in=list(parsed)))
+        return len(new_items), len(changed_items)
+
+    @staticmethod
+    def parse_row(row, suppliers, categories):
+        sku = str(row.get('sku') or '').strip()
+        if not sku:
+            raise ValueError('SKU is required')
+        if len(sku) > Item._meta.get_field('SKU').max_length:
+            raise ValueError('SKU {0} is too long'.format(sku))
+        supplier = str(row.get('supplier') or '').strip()
+        if supplier not in suppliers:
+            raise ValueError('Unknown supplier "{0}"'.format(supplier))
+        category = str(row.get('category') or '').strip()
+        if category not in categories:
+            raise ValueError('Unknown category "{0}"'.format(category))
+        values = {
+            'SKU': sku,
+            'description': str(row.get('description') or '').strip(),
+            'price': _parse_int(row, 'price'),
+            'quantity': _parse_int(row, 'quantity'),
+            'supplier_id': suppliers[supplier],
+            'category_id': categories[category],
+            'is_returnable': str(row.get('returnable') or '').strip().lower()
+                             in TRUE_VALUES,
+        }
+        if row.get('reorder_point') not in (None, ''):
+            values['reorder_point'] = _parse_int(row, 'reorder_point')
+        return values
+
+
+def _parse_int(row, column):
+    value = row.get(column)
+    try:
+        number = Decimal(str(value).strip())
+    except InvalidOperation:
+        number = None
+    if value is None or number is None or not number.is_finite():
+        raise ValueError('{0} must be a number, got "{1}"'.format(
+            column, value if value is not None else ''))
+    number = int(number)
+    if number < 0:
+        raise ValueError('{0} cannot be negative'.format(column))
+    if number > MAX_INTEGER:
+        raise ValueError('{0} cannot be more than {1}'.format(
+            column, MAX_INTEGER))
+    return number
@@ -0,0 +1,132 @@
+"""Monthly inventory valuation ledger.
+
+Changes to the value of purchased inventory are recorded as deltas against
+the company and month they happened in. Inside a ``buffered()`` block the
+deltas are summed in memory and written out once per company/month when the
+block exits, so a batch touching thousands of items costs a handful of
+queries instead of one ``ItemLog`` write per item.
+"""
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+
+from django.db import transaction
+from django.db.models import F, Sum
+from django.db.models.functions import ExtractMonth
+from django.utils import timezone
+
+_state = threading.local()
+
+
+def _buffer():
+    if not hasattr(_state, 'deltas'):
+        _state.deltas = defaultdict(float)
+        _state.depth = 0
+    return _state.deltas
+
+
+def month_code(month):
+    """Return the ``ItemLog.MONTHS`` code for a month number (1-12)."""
+    from .models import ItemLog
+    return ItemLog.MONTHS[month - 1][0]
+
+
+def record(company_id, value, when=None):
+    """Add ``value`` to the company's ledger for the month of ``when``."""
+    if not value or company_id is None:
+        return
+    when = when or timezone.now()
+    deltas = _buffer()
+    deltas[(company_id, when.year, month_code(when.month))] += value
+    if not _state.depth:
+        flush()
+
+
+@contextmanager
+def buffered():
+    """Collect every delta recorded in the block and flush them together.
+
+    Blocks can be nested; only the outermost one flushes. If the block
+    raises, the deltas collected so far are discarded along with it.
+    """
+    _buffer()
+    _state.depth += 1
+    try:
+        yield
+    except BaseException:
+        if _state.depth == 1:
+            _state.deltas = defaultdict(float)
+        raise
+    finally:
+        _state.depth -= 1
+    if not _state.depth:
+        flush()
+
+
+def flush():
+    """Write the buffered deltas with one update per company/month."""
+    from .models import ItemLog
+
+    deltas = {key: value for key, value in _buffer().items() if value}
+    _state.deltas = defaultdict(float)
+    if not deltas:
+        return
+    with transaction.atomic():
+        companies = {company_id for company_id, _, _ in deltas}
+        years = {year for _, year, _ in deltas}
+        existing = set(ItemLog.objects.filter(
+            company_id__in=companies, year__in=years).values_list(
+            'company_id', 'year', 'month'))
+        ItemLog.objects.bulk_create(
+            ItemLog(company_id=company_id, year=year, month=month)
+            for company_id, year, month in deltas
+            if (company_id, year, month) not in existing)
+        for (company_id, year, month), value in deltas.items():
+            ItemLog.objects.filter(company_id=company_id, year=year,
+                                   month=month).update(
+                inventory_value=F('inventory_value') + value)
+
+
+def undated_companies():
+    """Return the ids of companies with items whose creation time is
+    unknown because they were added before ``Item.created_at`` existed."""
+    from .models import Item
+
+    return Item.objects.filter(created_at__isnull=True).values_list(
+        'company_id', flat=True).distinct()
+
+
+def rebuild(year, companies=None):
+    """Recompute the ledger of ``year`` from the items created in it.
+
+    Each item's current price times quantity purchased is counted in the
+    month it was created. This differs from the deltas recorded as items
+    change, which put restocks and price edits in the month they happen
+    and keep the value of items deleted since: a rebuild moves the former
+    into the creation month and drops the latter.
+
+    Companies with undated items are skipped and their rows left as they
+    are, since those items' history cannot be recomputed. Existing rows of
+    the year are replaced for every other company. Returns the number of
+    monthly rows written.
+    """
+    from .models import Item, ItemLog
+
+    undated = undated_companies()
+    items = Item.objects.filter(created_at__year=year).exclude(
+        company__in=undated)
+    logs = ItemLog.objects.filter(year=year).exclude(company__in=undated)
+    if companies is not None:
+        items = items.filter(company__in=companies)
+        logs = logs.filter(company__in=companies)
+    totals = items.annotate(month=ExtractMonth('created_at')).values(
+        'company_id', 'month').annotate(
+        value=Sum(F('price') * F('quantity_purchased'))).order_by()
+    with transaction.atomic():
+        logs.delete()
+        created = ItemLog.objects.bulk_create(
+            ItemLog(company_id=total['company_id'], year=year,
+                    month=month_code(total['month']),
+                    inventory_value=total['value'] or 0)
+            for total in totals)
+    return len(created)
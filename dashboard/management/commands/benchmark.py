@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from dashboard import benchmark
+
+
+class Command(BaseCommand):
+    help = ('Time the dashboard pages as a company admin and report p50/p95 '
+            'latency and query counts')
+
+    def add_arguments(self, parser):
+        parser.add_argument('names', nargs='*',
+                            help='Only benchmark the URLs with these names')
+        parser.add_argument('--company', type=int,
+                            help='Benchmark as an admin of this company')
+        parser.add_argument('--iterations', type=int, default=10)
+
+    def handle(self, *args, **options):
+        user = benchmark.benchmark_user(options['company'])
+        if user is None:
+            raise CommandError('No company admin found to benchmark as.')
+        self.stdout.write('Benchmarking as {0} of {1}'.format(
+            user.email, user.employee.location.company))
+        self.stdout.write('{0:<28} {1:>6} {2:>10} {3:>10} {4:>8}'.format(
+            'url', 'status', 'p50 ms', 'p95 ms', 'queries'))
+        for result in benchmark.run(user, options['iterations'],
+                                    options['names']):
+            self.stdout.write(
+                '{name:<28} {status:>6} {p50_ms:>10} {p95_ms:>10} '
+                '{queries:>8}'.format(**result))
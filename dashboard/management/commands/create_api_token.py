@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from dashboard.models import ApiToken, User
+
+
+class Command(BaseCommand):
+    help = 'Issue a JSON API token acting as a user for their company'
+
+    def add_arguments(self, parser):
+        parser.add_argument('email', help='User the token acts as')
+        parser.add_argument('name', help='What the token is used for')
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(email=options['email'])
+        except User.DoesNotExist:
+            raise CommandError('No user {0}'.format(options['email']))
+        token, key = ApiToken.issue(user, options['name'])
+        self.stdout.write('Token {0} for {1}. Keep the key, it is not '
+                          'stored:'.format(token.name, token.company))
+        self.stdout.write(key)
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from dashboard import forecast
+from dashboard.models import Company
+
+
+class Command(BaseCommand):
+    help = 'Forecast daily item usage from the request history'
+
+    def add_arguments(self, parser):
+        parser.add_argument('company', type=int, nargs='*',
+                            help='Only forecast for these companies')
+        parser.add_argument('--full', action='store_true',
+                            help='Read the whole history instead of '
+                                 'continuing from the last run')
+
+    def handle(self, *args, **options):
+        companies = Company.objects.order_by('id')
+        if options['company']:
+            companies = companies.filter(id__in=options['company'])
+        for company in companies:
+            changed = forecast.run(company, full=options['full'])
+            self.stdout.write('Updated usage of {0} items for {1}'.format(
+                changed, company))
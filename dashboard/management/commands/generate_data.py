@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from dashboard import synthetic
+
+
+class Command(BaseCommand):
+    help = 'Generate synthetic companies for load testing'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--companies', type=int, default=1)
+        parser.add_argument('--items', type=int, default=1000,
+                            help='Items per company')
+        parser.add_argument('--requests', type=int, default=10000,
+                            help='Item requests per company')
+        parser.add_argument('--messages', type=int, default=1000,
+                            help='Messages per company')
+        parser.add_argument('--employees', type=int,
+                            help='Employees per company (default: one per '
+                                 '1000 items, at least 10)')
+        parser.add_argument('--seed', type=int)
+
+    def handle(self, *args, **options):
+        companies = synthetic.generate(
+            companies=options['companies'], items=options['items'],
+            requests=options['requests'], messages=options['messages'],
+            employees=options['employees'], seed=options['seed'],
+            log=self.stdout.write)
+        self.stdout.write('Generated {0}'.format(
+            ', '.join('{0} (id {1})'.format(company, company.id)
+                      for company in companies)))
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from dashboard.importer import ItemImporter, read_rows
+from dashboard.models import Company
+
+
+class Command(BaseCommand):
+    help = 'Import inventory items for a company from a CSV or XLSX file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('company', type=int)
+        parser.add_argument('path')
+        parser.add_argument('--chunk-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        try:
+            company = Company.objects.get(id=options['company'])
+        except Company.DoesNotExist:
+            raise CommandError('Company {0} does not exist'.format(
+                options['company']))
+        importer = ItemImporter(company, chunk_size=options['chunk_size'])
+        with open(options['path'], 'rb') as file:
+            try:
+                result = importer.run(read_rows(file, options['path']))
+            except ValueError as error:
+                raise CommandError(error)
+        for row_number, message in result.errors:
+            self.stderr.write('Row {0}: {1}'.format(row_number, message))
+        self.stdout.write(str(result))
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from dashboard import ledger
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the monthly inventory value log of a year from scratch'
+
+    def add_arguments(self, parser):
+        parser.add_argument('year', type=int, nargs='?',
+                            default=timezone.now().year)
+        parser.add_argument('--company', type=int, action='append',
+                            help='Only rebuild the log of this company')
+
+    def handle(self, *args, **options):
+        written = ledger.rebuild(options['year'], options['company'])
+        self.stdout.write('Wrote {0} monthly rows for {1}'.format(
+            written, options['year']))
+        skipped = set(ledger.undated_companies())
+        if options['company'] is not None:
+            skipped &= set(options['company'])
+        if skipped:
+            self.stdout.write(
+                'Skipped companies with undated items: {0}'.format(
+                    ', '.join(str(company) for company in sorted(skipped))))
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from dashboard.models import Company, CompanyMetrics
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the precomputed dashboard metrics of every company'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--company', type=int,
+                            help='Only rebuild the metrics of this company')
+
+    def handle(self, *args, **options):
+        companies = Company.objects.all()
+        if options['company']:
+            companies = companies.filter(id=options['company'])
+        for company in companies.iterator():
+            metrics = CompanyMetrics.objects.get_or_create(company=company)[0]
+            metrics.rebuild()
+            self.stdout.write('Rebuilt metrics for {0}'.format(company))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from dashboard import search
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text search index of every item'
+
+    def handle(self, *args, **options):
+        search.rebuild()
+        self.stdout.write('Search index rebuilt')
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from dashboard import reorder
+from dashboard.models import Company
+
+
+class Command(BaseCommand):
+    help = 'Queue purchase orders for items at or below their reorder point'
+
+    def add_arguments(self, parser):
+        parser.add_argument('company', type=int, nargs='*',
+                            help='Only reorder for these companies')
+        parser.add_argument('--keep-reorder-points', action='store_true',
+                            help='Do not save the computed reorder points')
+
+    def handle(self, *args, **options):
+        companies = Company.objects.order_by('id')
+        if options['company']:
+            companies = companies.filter(id__in=options['company'])
+        for company in companies:
+            orders = reorder.run(
+                company,
+                update_reorder_points=not options['keep_reorder_points'])
+            self.stdout.write('Queued {0} purchase orders for {1}'.format(
+                len(orders), company))
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from dashboard.tasks import run_worker
+
+
+class Command(BaseCommand):
+    help = 'Run queued background tasks'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=1,
+                            help='Number of tasks to run in parallel')
+        parser.add_argument('--poll-interval', type=float, default=1.0,
+                            help='Seconds to wait when the queue is empty')
+        parser.add_argument('--visibility-timeout', type=int, default=300,
+                            help='Seconds before an unfinished task is '
+                                 'handed to another worker')
+        parser.add_argument('--once', action='store_true',
+                            help='Exit once the queue is empty')
+
+    def handle(self, *args, **options):
+        run_worker(concurrency=options['concurrency'],
+                   poll_interval=options['poll_interval'],
+                   visibility_timeout=options['visibility_timeout'],
+                   once=options['once'])
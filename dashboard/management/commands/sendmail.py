@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from dashboard.outbox import BATCH_SIZE, run_sender
+
+
+class Command(BaseCommand):
+    help = 'Send the emails waiting in the outbox'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE,
+                            help='Emails to send over one connection')
+        parser.add_argument('--poll-interval', type=float, default=5.0,
+                            help='Seconds to wait when no email is due')
+        parser.add_argument('--visibility-timeout', type=int, default=300,
+                            help='Seconds before an unsent batch is handed '
+                                 'to another sender')
+        parser.add_argument('--once', action='store_true',
+                            help='Exit once no email is due')
+
+    def handle(self, *args, **options):
+        run_sender(batch_size=options['batch_size'],
+                   poll_interval=options['poll_interval'],
+                   visibility_timeout=options['visibility_timeout'],
+                   once=options['once'])
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from dashboard import stock
+from dashboard.models import Company
+
+
+class Command(BaseCommand):
+    help = ('Snapshot the stock of every item, so historical stock reads '
+            'only the movements since the last snapshot')
+
+    def add_arguments(self, parser):
+        parser.add_argument('company', type=int, nargs='*',
+                            help='Only snapshot these companies')
+
+    def handle(self, *args, **options):
+        companies = Company.objects.order_by('id')
+        if options['company']:
+            companies = companies.filter(id__in=options['company'])
+        for company in companies:
+            count = stock.take_snapshot(company.id)
+            self.stdout.write('Snapshotted {0} items for {1}'.format(
+                count, company))
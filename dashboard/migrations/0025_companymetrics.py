@@ -0,0 +1,34 @@
+# Generated by Django 2.2.7 on 2026-10-17 18:46
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0024_auto_20200901_1022'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CompanyMetrics',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('inventory_value', models.FloatField(default=0)),
+                ('quantity_purchased', models.IntegerField(default=0)),
+                ('quantity_available', models.IntegerField(default=0)),
+                ('items_count', models.IntegerField(default=0)),
+                ('categories_count', models.IntegerField(default=0)),
+                ('requests_count', models.IntegerField(default=0)),
+                ('pending_count', models.IntegerField(default=0)),
+                ('fulfilled_count', models.IntegerField(default=0)),
+                ('stockout_count', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('company', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='metrics', to='dashboard.Company')),
+            ],
+            options={
+                'verbose_name_plural': 'Company metrics',
+            },
+        ),
+    ]
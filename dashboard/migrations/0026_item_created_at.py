@@ -0,0 +1,27 @@
+# Generated by Django 2.2.7 on 2026-10-17 18:48
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0025_companymetrics'),
+    ]
+
+    # The column is added without a default first so that existing items
+    # are left NULL instead of all being dated to the migration.
+    operations = [
+        migrations.AddField(
+            model_name='item',
+            name='created_at',
+            field=models.DateTimeField(null=True),
+        ),
+        migrations.AlterField(
+            model_name='item',
+            name='created_at',
+            field=models.DateTimeField(default=django.utils.timezone.now,
+                                       null=True),
+        ),
+    ]
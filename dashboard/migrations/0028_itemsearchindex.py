@@ -0,0 +1,91 @@
+# Generated by Django 2.2.7 on 2026-10-17 18:53
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+SQLITE_FORWARDS = [
+    "CREATE VIRTUAL TABLE dashboard_itemsearchindex_fts USING fts5("
+    "body, company_id UNINDEXED, content='dashboard_itemsearchindex', "
+    "content_rowid='id', prefix='2 3')",
+    "CREATE TRIGGER dashboard_itemsearchindex_ai AFTER INSERT ON "
+    "dashboard_itemsearchindex BEGIN INSERT INTO "
+    "dashboard_itemsearchindex_fts(rowid, body, company_id) VALUES "
+    "(new.id, new.body, new.company_id); END",
+    "CREATE TRIGGER dashboard_itemsearchindex_ad AFTER DELETE ON "
+    "dashboard_itemsearchindex BEGIN INSERT INTO "
+    "dashboard_itemsearchindex_fts(dashboard_itemsearchindex_fts, rowid, "
+    "body, company_id) VALUES ('delete', old.id, old.body, old.company_id); "
+    "END",
+    "CREATE TRIGGER dashboard_itemsearchindex_au AFTER UPDATE ON "
+    "dashboard_itemsearchindex BEGIN INSERT INTO "
+    "dashboard_itemsearchindex_fts(dashboard_itemsearchindex_fts, rowid, "
+    "body, company_id) VALUES ('delete', old.id, old.body, old.company_id); "
+    "INSERT INTO dashboard_itemsearchindex_fts(rowid, body, company_id) "
+    "VALUES (new.id, new.body, new.company_id); END",
+]
+SQLITE_BACKWARDS = [
+    "DROP TRIGGER IF EXISTS dashboard_itemsearchindex_au",
+    "DROP TRIGGER IF EXISTS dashboard_itemsearchindex_ad",
+    "DROP TRIGGER IF EXISTS dashboard_itemsearchindex_ai",
+    "DROP TABLE IF EXISTS dashboard_itemsearchindex_fts",
+]
+MYSQL_FORWARDS = [
+    "ALTER TABLE dashboard_itemsearchindex "
+    "ADD FULLTEXT INDEX dashboard_itemsearchindex_body_ft (body)",
+]
+MYSQL_BACKWARDS = [
+    "ALTER TABLE dashboard_itemsearchindex "
+    "DROP INDEX dashboard_itemsearchindex_body_ft",
+]
+
+
+def run_for_vendor(statements):
+    def run(apps, schema_editor):
+        for statement in statements.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(statement)
+
+    return run
+
+
+def build_index(apps, schema_editor):
+    Item = apps.get_model('dashboard', 'Item')
+    ItemSearchIndex = apps.get_model('dashboard', 'ItemSearchIndex')
+    items = Item.objects.select_related('category', 'supplier').iterator()
+    batch = []
+    for item in items:
+        batch.append(ItemSearchIndex(
+            item_id=item.SKU, company_id=item.company_id,
+            body=' '.join([item.SKU, item.description, item.category.name,
+                           item.supplier.name])))
+        if len(batch) >= 1000:
+            ItemSearchIndex.objects.bulk_create(batch)
+            batch = []
+    ItemSearchIndex.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0027_auto_20261017_1850'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ItemSearchIndex',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('body', models.TextField()),
+                ('company', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='dashboard.Company')),
+                ('item', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='search_index', to='dashboard.Item')),
+            ],
+            options={
+                'verbose_name_plural': 'Item search index',
+            },
+        ),
+        migrations.RunPython(
+            run_for_vendor({'sqlite': SQLITE_FORWARDS,
+                            'mysql': MYSQL_FORWARDS}),
+            run_for_vendor({'sqlite': SQLITE_BACKWARDS,
+                            'mysql': MYSQL_BACKWARDS})),
+        migrations.RunPython(build_index, migrations.RunPython.noop),
+    ]
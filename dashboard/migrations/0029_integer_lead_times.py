@@ -0,0 +1,37 @@
+# Generated by Django 2.2.7 on 2026-10-17 18:58
+
+from django.db import migrations, models
+
+
+def clean_lead_times(apps, schema_editor):
+    """Replace lead times that are not whole numbers of days with 1 so the
+    columns can be converted to integers."""
+    Item = apps.get_model('dashboard', 'Item')
+    for field in ['average_lead_time', 'maximum_lead_time']:
+        for value in Item.objects.values_list(field, flat=True).distinct():
+            if not str(value).strip().isdigit():
+                Item.objects.filter(**{field: value}).update(**{field: '1'})
+            elif str(value) != str(value).strip():
+                Item.objects.filter(**{field: value}).update(
+                    **{field: str(value).strip()})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0028_itemsearchindex'),
+    ]
+
+    operations = [
+        migrations.RunPython(clean_lead_times, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='item',
+            name='average_lead_time',
+            field=models.IntegerField(default=1),
+        ),
+        migrations.AlterField(
+            model_name='item',
+            name='maximum_lead_time',
+            field=models.IntegerField(default=1),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 2.2.7 on 2026-10-17 19:06
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0029_integer_lead_times'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DemandForecast',
+            fields=[
+                ('item', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='forecast', serialize=False, to='dashboard.Item')),
+                ('level', models.FloatField(default=0)),
+                ('variance', models.FloatField(default=0)),
+                ('updated_through', models.DateField()),
+            ],
+        ),
+    ]
@@ -0,0 +1,62 @@
+# Generated by Django 2.2.7 on 2026-10-17 19:36
+
+from django.db import migrations, models
+
+# Item.description is a TEXT column, which MySQL can only index by prefix,
+# so this index is created per vendor rather than declared on the model.
+ITEM_DESCRIPTION_INDEX = 'dashboard_item_company_description_idx'
+FORWARDS = {
+    'mysql': 'CREATE INDEX {0} ON dashboard_item '
+             '(company_id, description(100), SKU)',
+    'default': 'CREATE INDEX {0} ON dashboard_item '
+               '(company_id, description, SKU)',
+}
+BACKWARDS = {
+    'mysql': 'DROP INDEX {0} ON dashboard_item',
+    'default': 'DROP INDEX {0}',
+}
+
+
+def run_for_vendor(statements):
+    def run(apps, schema_editor):
+        vendor = schema_editor.connection.vendor
+        statement = statements.get(vendor, statements['default'])
+        schema_editor.execute(statement.format(ITEM_DESCRIPTION_INDEX))
+
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0030_demandforecast'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='employee',
+            index=models.Index(fields=['location', 'user'], name='dashboard_e_locatio_f80087_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='itemrequest',
+            index=models.Index(fields=['item', 'status'], name='dashboard_i_item_id_6c86f0_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='itemrequest',
+            index=models.Index(fields=['item', 'created_at'], name='dashboard_i_item_id_10a707_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(fields=['to_user', 'read', 'from_user', 'date_sent'], name='dashboard_m_to_user_98f224_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(fields=['to_user', 'date_sent'], name='dashboard_m_to_user_cebca4_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='purchaseorder',
+            index=models.Index(fields=['item', 'created_at'], name='dashboard_p_item_id_246d1d_idx'),
+        ),
+        migrations.RunPython(run_for_vendor(FORWARDS),
+                             run_for_vendor(BACKWARDS)),
+    ]
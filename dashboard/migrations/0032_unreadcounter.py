@@ -0,0 +1,24 @@
+# Generated by Django 2.2.7 on 2026-10-17 19:39
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0031_composite_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UnreadCounter',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='unread_counter', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('messages', models.IntegerField(default=0)),
+                ('alerts', models.IntegerField(default=0)),
+                ('last_message_id', models.IntegerField(default=0)),
+            ],
+        ),
+    ]
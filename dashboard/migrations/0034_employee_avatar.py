@@ -0,0 +1,18 @@
+# Generated by Django 2.2.7 on 2026-10-17 19:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0033_outgoingemail'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='employee',
+            name='avatar',
+            field=models.CharField(blank=True, help_text='SHA-256 of the image, which names its resized variants', max_length=64),
+        ),
+    ]
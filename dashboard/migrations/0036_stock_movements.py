@@ -0,0 +1,72 @@
+# Generated by Django 2.2.7 on 2026-10-17 19:59
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+def open_ledger(apps, schema_editor):
+    """Carry the stock on hand forward as the first snapshot, since the
+    movements that led to it were never recorded."""
+    Item = apps.get_model('dashboard', 'Item')
+    StockSnapshot = apps.get_model('dashboard', 'StockSnapshot')
+    now = django.utils.timezone.now()
+    items = Item.objects.filter(quantity_available__gt=0).values_list(
+        'SKU', 'company_id', 'quantity_available').iterator()
+    batch = []
+    for sku, company_id, quantity in items:
+        batch.append(StockSnapshot(item_id=sku, company_id=company_id,
+                                   taken_at=now, quantity=quantity))
+        if len(batch) >= 1000:
+            StockSnapshot.objects.bulk_create(batch)
+            batch = []
+    StockSnapshot.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0035_apitoken'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockSnapshot',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('taken_at', models.DateTimeField()),
+                ('quantity', models.IntegerField()),
+                ('company', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='dashboard.Company')),
+                ('item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='dashboard.Item')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='StockMovement',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('R', 'Receipt'), ('I', 'Issue'), ('RT', 'Return'), ('A', 'Adjustment')], max_length=2)),
+                ('quantity', models.IntegerField(help_text='Negative for stock going out')),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('company', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='dashboard.Company')),
+                ('item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='movements', to='dashboard.Item')),
+                ('item_request', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='dashboard.ItemRequest')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='stocksnapshot',
+            index=models.Index(fields=['company', 'taken_at'], name='dashboard_s_company_8ff948_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='stocksnapshot',
+            index=models.Index(fields=['item', 'taken_at'], name='dashboard_s_item_id_4c2986_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='stockmovement',
+            index=models.Index(fields=['item', 'created_at'], name='dashboard_s_item_id_58f8b7_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='stockmovement',
+            index=models.Index(fields=['company', 'created_at'], name='dashboard_s_company_b15959_idx'),
+        ),
+        migrations.RunPython(open_ledger, migrations.RunPython.noop),
+    ]
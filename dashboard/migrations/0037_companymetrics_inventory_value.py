@@ -0,0 +1,18 @@
+# Generated by Django 2.2.7 on 2026-10-17 20:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0036_stock_movements'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='companymetrics',
+            name='inventory_value',
+            field=models.BigIntegerField(default=0),
+        ),
+    ]
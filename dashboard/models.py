@@ -1,12 +1,19 @@
+import hashlib
+import secrets
+
 import factory.django
 from django.contrib.auth.models import AbstractUser, BaseUserManager
 from django.db import models
 from django.db.models import F
-from django.db.models.signals import post_save
+from django.db.models.functions import Greatest
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 from django.utils import timezone
 from django.utils.translation import ugettext_lazy as _
 
+from . import ledger
+from .replicas import use_primary
+
 
 class UserManager(BaseUserManager):
     """Define a model manager for User model with no username field."""
@@ -94,13 +101,35 @@ class Employee(models.Model):
     user = models.OneToOneField(User, models.CASCADE)
     username = models.CharField(max_length=20)
     image = models.ImageField(upload_to=user_directory_path)
+    avatar = models.CharField(max_length=64, blank=True,
+                              help_text='SHA-256 of the image, which names '
+                                        'its resized variants')
     location = models.ForeignKey(Location, on_delete=models.CASCADE, default=1)
 
+    class Meta:
+        indexes = [models.Index(fields=['location', 'user'])]
+
     def __str__(self):
         return self.user.email
 
 
-class Category(models.Model):
+class LoadedValuesMixin:
+    """Remember the field values a row had when it was read from the
+    database so that post_save receivers can work out what changed."""
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        self._loaded_values = {field.attname: getattr(self, field.attname)
+                               for field in self._meta.concrete_fields}
+
+
+class Category(LoadedValuesMixin, models.Model):
     """This represents an equipment category in our system."""
     name = models.CharField(max_length=20, help_text='New category')
     company = models.ForeignKey(Company, on_delete=models.CASCADE)
@@ -112,7 +141,7 @@ class Category(models.Model):
         return self.name + " - " + self.company.name
 
 
-class Supplier(models.Model):
+class Supplier(LoadedValuesMixin, models.Model):
     name = models.CharField(max_length=100)
     company = models.ForeignKey(Company, on_delete=models.CASCADE)
     description = models.TextField()
@@ -122,7 +151,7 @@ class Supplier(models.Model):
         return "{0} ({1})".format(self.name, self.company)
 
 
-class Item(models.Model):
+class Item(LoadedValuesMixin, models.Model):
     """This represents an equipment in our system."""
     SKU = models.CharField(max_length=20, primary_key=True)
     company = models.ForeignKey(Company, on_delete=models.CASCADE)
@@ -133,16 +162,33 @@ class Item(models.Model):
     quantity_purchased = models.IntegerField(default=1)
     quantity_available = models.IntegerField(default=0)
     maximum_daily_usage = models.IntegerField(default=0)
-    maximum_lead_time = models.TextField(default=1)
+    maximum_lead_time = models.IntegerField(default=1)
     average_daily_usage = models.IntegerField(default=0)
-    average_lead_time = models.TextField(default=1)
+    average_lead_time = models.IntegerField(default=1)
     reorder_point = models.IntegerField(default=1)
     is_returnable = models.BooleanField(default=False)
+    # Unknown for items added before the column was, see ledger.rebuild().
+    created_at = models.DateTimeField(default=timezone.now, null=True)
 
     def __str__(self):
         return self.description
 
 
+class ItemSearchIndex(models.Model):
+    """This represents the searchable text of an item, denormalized with its
+    category and supplier names so one full-text index can cover them."""
+    item = models.OneToOneField(Item, models.CASCADE,
+                                related_name='search_index')
+    company = models.ForeignKey(Company, models.CASCADE)
+    body = models.TextField()
+
+    class Meta:
+        verbose_name_plural = 'Item search index'
+
+    def __str__(self):
+        return self.item_id
+
+
 class PurchaseOrder(models.Model):
     ORDER_STATUS = [
         ('Q', 'Queued'),
@@ -155,11 +201,14 @@ class PurchaseOrder(models.Model):
     quantity = models.IntegerField(default=1)
     status = models.CharField(max_length=20, choices=ORDER_STATUS)
 
+    class Meta:
+        indexes = [models.Index(fields=['item', 'created_at'])]
+
     def __str__(self):
         return "{0} ({1})".format(self.status, self.item)
 
 
-class ItemRequest(models.Model):
+class ItemRequest(LoadedValuesMixin, models.Model):
     """This represents an item allocation to a user in our system."""
     REQUEST_STATUS = [
         ('P', 'Pending'),
@@ -175,6 +224,10 @@ class ItemRequest(models.Model):
     status = models.CharField(max_length=20, choices=REQUEST_STATUS,
                               default='P')
 
+    class Meta:
+        indexes = [models.Index(fields=['item', 'status']),
+                   models.Index(fields=['item', 'created_at'])]
+
     def __str__(self):
         return self.status + " - " + self.item.SKU + " - " + self.user.email
 
@@ -187,6 +240,50 @@ class ItemReturn(models.Model):
     fulfil_date = models.DateTimeField(auto_now_add=True)
 
 
+class StockMovement(models.Model):
+    """This represents one change to an item's stock. Movements are only
+    ever added, written in the same transaction as the change to
+    ``Item.quantity_available``."""
+    MOVEMENT_KIND = [
+        ('R', 'Receipt'),
+        ('I', 'Issue'),
+        ('RT', 'Return'),
+        ('A', 'Adjustment')
+    ]
+    item = models.ForeignKey(Item, models.CASCADE, related_name='movements')
+    company = models.ForeignKey(Company, models.CASCADE)
+    kind = models.CharField(max_length=2, choices=MOVEMENT_KIND)
+    quantity = models.IntegerField(help_text='Negative for stock going out')
+    item_request = models.ForeignKey(ItemRequest, models.SET_NULL,
+                                     null=True, blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [models.Index(fields=['item', 'created_at']),
+                   models.Index(fields=['company', 'created_at'])]
+
+    def __str__(self):
+        return "{0} {1:+d} ({2})".format(self.get_kind_display(),
+                                         self.quantity, self.item_id)
+
+
+class StockSnapshot(models.Model):
+    """This represents the stock of an item at the time a company's stock
+    was last snapshotted. Items without stock have no row."""
+    item = models.ForeignKey(Item, models.CASCADE)
+    company = models.ForeignKey(Company, models.CASCADE)
+    taken_at = models.DateTimeField()
+    quantity = models.IntegerField()
+
+    class Meta:
+        indexes = [models.Index(fields=['company', 'taken_at']),
+                   models.Index(fields=['item', 'taken_at'])]
+
+    def __str__(self):
+        return "{0} at {1}: {2}".format(self.item_id, self.taken_at,
+                                        self.quantity)
+
+
 class ItemLog(models.Model):
     """This represents the total assets value for a month in our system."""
     MONTHS = [
@@ -212,7 +309,112 @@ class ItemLog(models.Model):
         return self.company.name + " " + self.month + " " + str(self.year)
 
 
-class Message(models.Model):
+class CompanyMetrics(models.Model):
+    """This represents a precomputed snapshot of a company's dashboard
+    figures, kept up to date incrementally as items, requests and
+    categories change."""
+    STATUS_FIELDS = {
+        'P': 'pending_count',
+        'F': 'fulfilled_count',
+        'SO': 'stockout_count',
+    }
+    company = models.OneToOneField(Company, models.CASCADE,
+                                   related_name='metrics')
+    inventory_value = models.BigIntegerField(default=0)
+    quantity_purchased = models.IntegerField(default=0)
+    quantity_available = models.IntegerField(default=0)
+    items_count = models.IntegerField(default=0)
+    categories_count = models.IntegerField(default=0)
+    requests_count = models.IntegerField(default=0)
+    pending_count = models.IntegerField(default=0)
+    fulfilled_count = models.IntegerField(default=0)
+    stockout_count = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name_plural = 'Company metrics'
+
+    def __str__(self):
+        return "Metrics for {0}".format(self.company_id)
+
+    @property
+    def inventory_turns(self):
+        if self.quantity_available > 0:
+            return round(self.quantity_purchased / self.quantity_available, 2)
+        return 0
+
+    @property
+    def percent_stockouts(self):
+        if self.requests_count > 0:
+            return (self.stockout_count / self.requests_count) * 100
+        return 0
+
+    @classmethod
+    @use_primary()
+    def for_company(cls, company):
+        """Return the snapshot for a company, building it from scratch the
+        first time it is requested."""
+        metrics, created = cls.objects.get_or_create(company=company)
+        if created:
+            metrics.rebuild()
+        return metrics
+
+    @classmethod
+    def apply(cls, company_id, **deltas):
+        """Atomically add the given deltas to a company's snapshot."""
+        deltas = {field: delta for field, delta in deltas.items() if delta}
+        if not deltas or company_id is None:
+            return
+        metrics, created = cls.objects.get_or_create(company_id=company_id)
+        if created:
+            # A new snapshot is built from the source tables, which already
+            # include this change.
+            metrics.rebuild()
+        else:
+            cls.objects.filter(company_id=company_id).update(
+                updated_at=timezone.now(),
+                **{field: F(field) + delta for field, delta in deltas.items()})
+
+    @use_primary()
+    def rebuild(self):
+        """Recompute every figure in the snapshot from the source tables."""
+        items = Item.objects.filter(company_id=self.company_id).aggregate(
+            value=models.Sum(F('price') * F('quantity_available')),
+            purchased=models.Sum('quantity_purchased'),
+            available=models.Sum('quantity_available'),
+            count=models.Count('SKU'))
+        statuses = dict(ItemRequest.objects.filter(
+            item__company_id=self.company_id).values_list(
+            'status').annotate(models.Count('id')).order_by())
+        self.inventory_value = items['value'] or 0
+        self.quantity_purchased = items['purchased'] or 0
+        self.quantity_available = items['available'] or 0
+        self.items_count = items['count']
+        self.categories_count = Category.objects.filter(
+            company_id=self.company_id).count()
+        self.requests_count = sum(statuses.values())
+        for status, field in self.STATUS_FIELDS.items():
+            setattr(self, field, statuses.get(status, 0))
+        self.save()
+
+
+class DemandForecast(models.Model):
+    """This represents the smoothed daily demand of an item, computed from
+    its request history up to (but excluding) ``updated_through``."""
+    item = models.OneToOneField(Item, models.CASCADE, primary_key=True,
+                                related_name='forecast')
+    level = models.FloatField(default=0)
+    variance = models.FloatField(default=0)
+    updated_through = models.DateField()
+
+    def __str__(self):
+        return "{0} ({1:.2f}/day)".format(self.item_id, self.level)
+
+
+SYSTEM_USER_ID = 1
+
+
+class Message(LoadedValuesMixin, models.Model):
     from_user = models.ForeignKey(User, models.DO_NOTHING,
                                   related_name="sent_messages")
     to_user = models.ForeignKey(User, models.DO_NOTHING,
@@ -221,10 +423,180 @@ class Message(models.Model):
     date_sent = models.DateTimeField(auto_now_add=True)
     read = models.BooleanField(default=False)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['to_user', 'read', 'from_user', 'date_sent']),
+            models.Index(fields=['to_user', 'date_sent']),
+        ]
+
     def __str__(self):
         return str(
             self.date_sent) + " " + self.from_user.get_full_name() + ">" + self.to_user.get_full_name()
 
+    @property
+    def is_alert(self):
+        return self.from_user_id == SYSTEM_USER_ID
+
+
+class UnreadCounter(models.Model):
+    """This represents a user's unread message and alert counts and the
+    id of the newest message they received, kept up to date as messages
+    are sent, read and deleted."""
+    user = models.OneToOneField(User, models.CASCADE, primary_key=True,
+                                related_name='unread_counter')
+    messages = models.IntegerField(default=0)
+    alerts = models.IntegerField(default=0)
+    last_message_id = models.IntegerField(default=0)
+
+    def __str__(self):
+        return "Unread for {0}".format(self.user_id)
+
+    @classmethod
+    @use_primary()
+    def for_user(cls, user_id):
+        """Return the counter of a user, counting their inbox the first
+        time it is requested."""
+        counter, created = cls.objects.get_or_create(user_id=user_id)
+        if created:
+            cls.rebuild([user_id])
+            counter.refresh_from_db()
+        return counter
+
+    @classmethod
+    def apply(cls, user_id, last_message_id=None, **deltas):
+        """Atomically add the given deltas to a user's counter and raise
+        its newest message id to ``last_message_id``."""
+        updates = {field: F(field) + delta
+                   for field, delta in deltas.items() if delta}
+        if last_message_id is not None:
+            updates['last_message_id'] = Greatest('last_message_id',
+                                                  last_message_id)
+        if not updates or user_id is None:
+            return
+        if cls.objects.get_or_create(user_id=user_id)[1]:
+            # A new counter is counted from the inbox, which already
+            # includes this change.
+            cls.rebuild([user_id])
+        else:
+            cls.objects.filter(user_id=user_id).update(**updates)
+
+    @classmethod
+    @use_primary()
+    def rebuild(cls, user_ids):
+        """Recount the counters of the given users from their inboxes."""
+        user_ids = list(user_ids)
+        counts = {user_id: {'messages': 0, 'alerts': 0, 'last_message_id': 0}
+                  for user_id in user_ids}
+        rows = Message.objects.filter(to_user_id__in=user_ids).values(
+            'to_user_id').annotate(
+            alerts=models.Count('id', filter=models.Q(
+                read=False, from_user_id=SYSTEM_USER_ID)),
+            messages=models.Count('id', filter=models.Q(
+                read=False, from_user_id__gt=SYSTEM_USER_ID)),
+            last_message_id=models.Max('id')).order_by()
+        for row in rows:
+            counts[row.pop('to_user_id')] = row
+        existing = set(cls.objects.filter(user_id__in=user_ids).values_list(
+            'user_id', flat=True))
+        cls.objects.bulk_create([cls(user_id=user_id)
+                                 for user_id in user_ids
+                                 if user_id not in existing])
+        for user_id, figures in counts.items():
+            cls.objects.filter(user_id=user_id).update(**figures)
+
+
+class Task(models.Model):
+    """This represents a unit of background work queued for the worker."""
+    TASK_STATUS = [
+        ('Q', 'Queued'),
+        ('R', 'Running'),
+        ('D', 'Done'),
+        ('F', 'Failed')
+    ]
+    name = models.CharField(max_length=200)
+    arguments = models.TextField(default='{}')
+    status = models.CharField(max_length=1, choices=TASK_STATUS,
+                              default='Q')
+    attempts = models.IntegerField(default=0)
+    max_attempts = models.IntegerField(default=5)
+    run_at = models.DateTimeField(default=timezone.now)
+    locked_until = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['status', 'run_at'])]
+
+    def __str__(self):
+        return "{0} ({1})".format(self.name, self.get_status_display())
+
+
+class OutgoingEmail(models.Model):
+    """This represents an email waiting in the outbox for the sender."""
+    EMAIL_STATUS = [
+        ('Q', 'Queued'),
+        ('S', 'Sent'),
+        ('D', 'Dead')
+    ]
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    from_email = models.CharField(max_length=254)
+    recipients = models.TextField(help_text='One address per line')
+    status = models.CharField(max_length=1, choices=EMAIL_STATUS,
+                              default='Q')
+    attempts = models.IntegerField(default=0)
+    max_attempts = models.IntegerField(default=5)
+    send_after = models.DateTimeField(default=timezone.now)
+    claimed_by = models.CharField(max_length=32, blank=True)
+    locked_until = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['status', 'send_after'])]
+
+    def __str__(self):
+        return "{0} ({1})".format(self.subject, self.get_status_display())
+
+    @property
+    def recipient_list(self):
+        return self.recipients.split()
+
+
+class ApiToken(models.Model):
+    """This represents a key a machine client uses to call the JSON API
+    for a company. Only a hash of the key is stored."""
+    name = models.CharField(max_length=100)
+    company = models.ForeignKey(Company, models.CASCADE)
+    user = models.ForeignKey(User, models.CASCADE, related_name='api_tokens',
+                             help_text='Requests are made as this user')
+    prefix = models.CharField(max_length=8,
+                              help_text='First characters of the key')
+    key_hash = models.CharField(max_length=64, unique=True)
+    is_active = models.BooleanField(default=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_used_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return "{0} ({1}...)".format(self.name, self.prefix)
+
+    @staticmethod
+    def hash_key(key):
+        return hashlib.sha256(key.encode()).hexdigest()
+
+    @classmethod
+    def issue(cls, user, name):
+        """Create a token acting as ``user`` for their company. Returns the
+        token and its key, which cannot be recovered later."""
+        key = secrets.token_urlsafe(32)
+        token = cls.objects.create(
+            name=name, user=user,
+            company_id=user.employee.location.company_id,
+            prefix=key[:8], key_hash=cls.hash_key(key))
+        return token, key
+
 
 @receiver(post_save, sender=User)
 def create_employee(sender, instance, created, **kwargs):
@@ -238,17 +610,143 @@ def save_employee(sender, instance, **kwargs):
 
 
 @receiver(post_save, sender=Item)
-def log_item(sender, instance, **kwargs):
-    months = ['Jan', 'Feb', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep',
-              'Oct', 'Nov', 'Dec']
-    year = timezone.now().year
-    month = months[timezone.now().month - 2]
-    month_asset = \
-        ItemLog.objects.get_or_create(company=instance.company,
-                                      year=year, month=month)[0]
-    month_asset.inventory_value = F('inventory_value') + (
-            float(instance.price) * float(instance.quantity_purchased))
-    month_asset.save()
+def log_item(sender, instance, created, **kwargs):
+    value = float(instance.price) * float(instance.quantity_purchased)
+    loaded = getattr(instance, '_loaded_values', None)
+    if not created and loaded is not None:
+        value -= float(loaded.get('price', instance.price)) * float(
+            loaded.get('quantity_purchased', instance.quantity_purchased))
+    ledger.record(instance.company_id, value)
+
+
+def _item_figures(company_id, price, quantity_purchased, quantity_available):
+    return {
+        'company_id': company_id,
+        'inventory_value': int(price) * int(quantity_available),
+        'quantity_purchased': int(quantity_purchased),
+        'quantity_available': int(quantity_available),
+    }
+
+
+@receiver(post_save, sender=Item)
+def update_item_metrics(sender, instance, created, **kwargs):
+    new = _item_figures(instance.company_id, instance.price,
+                        instance.quantity_purchased,
+                        instance.quantity_available)
+    loaded = getattr(instance, '_loaded_values', None)
+    if created or loaded is None:
+        old = None
+    else:
+        old = _item_figures(
+            *[loaded.get(field, getattr(instance, field)) for field in (
+                'company_id', 'price', 'quantity_purchased',
+                'quantity_available')])
+    if old is None or old['company_id'] != new['company_id']:
+        if old is not None:
+            CompanyMetrics.apply(old.pop('company_id'), items_count=-1,
+                                 **{k: -v for k, v in old.items()})
+        CompanyMetrics.apply(new.pop('company_id'), items_count=1, **new)
+    else:
+        CompanyMetrics.apply(new.pop('company_id'),
+                             **{k: v - old[k] for k, v in new.items()})
+
+
+@receiver(post_save, sender=Item)
+def record_stock_movement(sender, instance, created, **kwargs):
+    loaded = getattr(instance, '_loaded_values', None)
+    if created:
+        kind, old = 'R', 0
+    elif loaded is not None:
+        kind = 'A'
+        old = loaded.get('quantity_available', instance.quantity_available)
+    else:
+        return
+    quantity = int(instance.quantity_available) - int(old)
+    if quantity:
+        StockMovement.objects.create(item=instance,
+                                     company_id=instance.company_id,
+                                     kind=kind, quantity=quantity)
+
+
+@receiver(post_delete, sender=Item)
+def remove_item_metrics(sender, instance, **kwargs):
+    old = _item_figures(instance.company_id, instance.price,
+                        instance.quantity_purchased,
+                        instance.quantity_available)
+    CompanyMetrics.apply(old.pop('company_id'), items_count=-1,
+                         **{k: -v for k, v in old.items()})
+
+
+def _request_figures(status, sign):
+    figures = {'requests_count': sign}
+    field = CompanyMetrics.STATUS_FIELDS.get(status)
+    if field:
+        figures[field] = sign
+    return figures
+
+
+@receiver(post_save, sender=ItemRequest)
+def update_item_request_metrics(sender, instance, created, **kwargs):
+    loaded = getattr(instance, '_loaded_values', None)
+    company_id = Item.objects.filter(SKU=instance.item_id).values_list(
+        'company_id', flat=True).first()
+    if created or loaded is None:
+        CompanyMetrics.apply(company_id, **_request_figures(
+            instance.status, 1))
+    elif loaded.get('status', instance.status) != instance.status:
+        deltas = _request_figures(instance.status, 1)
+        for field, delta in _request_figures(loaded['status'], -1).items():
+            deltas[field] = deltas.get(field, 0) + delta
+        CompanyMetrics.apply(company_id, **deltas)
+
+
+@receiver(post_delete, sender=ItemRequest)
+def remove_item_request_metrics(sender, instance, **kwargs):
+    company_id = Item.objects.filter(SKU=instance.item_id).values_list(
+        'company_id', flat=True).first()
+    CompanyMetrics.apply(company_id, **_request_figures(instance.status, -1))
+
+
+def _unread_figures(message, sign):
+    if message.read:
+        return {}
+    return {'alerts' if message.is_alert else 'messages': sign}
+
+
+@receiver(post_save, sender=Message)
+def update_unread_counter(sender, instance, created, **kwargs):
+    loaded = getattr(instance, '_loaded_values', None)
+    if created or loaded is None:
+        UnreadCounter.apply(instance.to_user_id, last_message_id=instance.id,
+                            **_unread_figures(instance, 1))
+        return
+    old = Message(from_user_id=loaded['from_user_id'],
+                  to_user_id=loaded['to_user_id'], read=loaded['read'])
+    if old.to_user_id == instance.to_user_id:
+        deltas = _unread_figures(instance, 1)
+        for field, delta in _unread_figures(old, -1).items():
+            deltas[field] = deltas.get(field, 0) + delta
+        UnreadCounter.apply(instance.to_user_id, **deltas)
+    else:
+        UnreadCounter.apply(old.to_user_id, **_unread_figures(old, -1))
+        UnreadCounter.apply(instance.to_user_id, last_message_id=instance.id,
+                            **_unread_figures(instance, 1))
+
+
+@receiver(post_delete, sender=Message)
+def remove_unread_counter(sender, instance, **kwargs):
+    UnreadCounter.apply(instance.to_user_id, **_unread_figures(instance, -1))
+
+
+@receiver(post_save, sender=Category)
+def add_category_metrics(sender, instance, created, **kwargs):
+    if created:
+        CompanyMetrics.apply(instance.company_id, categories_count=1)
+
+
+@receiver(post_delete, sender=Category)
+def remove_category_metrics(sender, instance, **kwargs):
+    CompanyMetrics.apply(instance.company_id, categories_count=-1)
 
 
 class UserFactory(factory.django.DjangoModelFactory):
@@ -257,7 +755,7 @@ class UserFactory(factory.django.DjangoModelFactory):
 
     first_name = factory.Faker('first_name')
     last_name = factory.Faker('last_name')
-    email = factory.Faker('email')
+    email = factory.Sequence(lambda n: 'user{0}@example.com'.format(n))
 
 
 class CompanyFactory(factory.django.DjangoModelFactory):
@@ -271,10 +769,15 @@ class LocationFactory(factory.django.DjangoModelFactory):
     class Meta:
         model = Location
 
-    name = factory.Faker('city')
+    class Params:
+        city_name = factory.Faker('city')
+        country_name = factory.Faker('country')
+
+    name = factory.LazyAttribute(lambda location: location.city_name[:20])
     address = factory.Faker('address')
-    city = factory.Faker('city')
-    country = factory.Faker('country')
+    city = factory.LazyAttribute(lambda location: location.city_name[:20])
+    country = factory.LazyAttribute(
+        lambda location: location.country_name[:20])
     company = factory.SubFactory(CompanyFactory)
 
 
@@ -282,15 +785,27 @@ class SupplierFactory(factory.django.DjangoModelFactory):
     class Meta:
         model = Supplier
 
+    name = factory.Faker('company')
+    description = factory.Faker('sentence')
+    email = factory.Faker('company_email')
     company = factory.SubFactory(CompanyFactory)
 
 
 class EmployeeFactory(factory.django.DjangoModelFactory):
+    """Employees are created with their user, so this creates a user and
+    updates the employee made for it."""
     class Meta:
         model = Employee
 
+    user = factory.SubFactory(UserFactory)
+    username = factory.Faker('user_name')
     location = factory.SubFactory(LocationFactory)
 
+    @classmethod
+    def _create(cls, model_class, user, **kwargs):
+        model_class.objects.filter(user=user).update(**kwargs)
+        return model_class.objects.get(user=user)
+
 
 class CategoryFactory(factory.django.DjangoModelFactory):
     class Meta:
@@ -304,13 +819,19 @@ class ItemFactory(factory.django.DjangoModelFactory):
     class Meta:
         model = Item
 
-    SKU = factory.Faker('ean')
-    description = factory.Faker('sentence')
-    condition = factory.Faker('word', ext_word_list=['E', 'VP', 'G', 'F'])
-    price = factory.Faker('pyint', min_value=10000, max_value=10000000,
+    SKU = factory.Sequence(lambda n: 'SKU{0:07d}'.format(n))
+    company = factory.SubFactory(CompanyFactory)
+    description = factory.Faker('sentence', nb_words=4)
+    price = factory.Faker('pyint', min_value=100, max_value=100000,
                           step=100)
-    location = factory.SubFactory(LocationFactory)
-    category = factory.SubFactory(CategoryFactory)
+    supplier = factory.SubFactory(SupplierFactory,
+                                  company=factory.SelfAttribute('..company'))
+    category = factory.SubFactory(CategoryFactory,
+                                  company=factory.SelfAttribute('..company'))
+    quantity_purchased = factory.Faker('pyint', min_value=1, max_value=100)
+    quantity_available = factory.LazyAttribute(
+        lambda item: item.quantity_purchased)
+    is_returnable = factory.Faker('boolean', chance_of_getting_true=30)
 
 
 class ItemRequestFactory(factory.django.DjangoModelFactory):
@@ -319,12 +840,15 @@ class ItemRequestFactory(factory.django.DjangoModelFactory):
 
     item = factory.SubFactory(ItemFactory)
     user = factory.SubFactory(UserFactory)
-    approver = factory.SubFactory(UserFactory)
-    start_date = factory.Faker('date')
-    end_date = factory.Faker('date')
-    checked_in = factory.Faker('boolean', chance_of_getting_true=500)
-    approved = factory.Faker('boolean', chance_of_getting_true=70)
-
-# class AssetLogFactory(factory.django.DjangoModelFactory):
-#     class Meta:
-#         model = AssetLog
+    status = factory.Faker('random_element',
+                           elements=[status for status, _ in
+                                     ItemRequest.REQUEST_STATUS])
+
+
+class MessageFactory(factory.django.DjangoModelFactory):
+    class Meta:
+        model = Message
+
+    from_user = factory.SubFactory(UserFactory)
+    to_user = factory.SubFactory(UserFactory)
+    text = factory.Faker('paragraph')
@@ -0,0 +1,127 @@
+"""Unread message and alert badges for the top navigation bar.
+
+Counts are read from the user's ``UnreadCounter`` row, which the
+``Message`` signals keep up to date, and only the few newest unread rows
+are loaded for the dropdown previews. Nothing is queried until a template
+actually reads a value, so pages without the navigation bar pay nothing.
+
+``updates()`` serves the endpoint the navigation bar polls: it answers at
+once from the counter, and only reads the messages newer than the one the
+client last saw when there are any. The page polls it every
+``MESSAGE_POLL_INTERVAL`` seconds and backs off while nothing arrives, so
+no request holds a worker waiting for news.
+"""
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.urls import reverse
+from django.utils.functional import cached_property
+
+from .models import SYSTEM_USER_ID, Message, UnreadCounter
+
+PREVIEW_SIZE = 5
+UPDATES_LIMIT = 50
+
+
+def alerts_filter():
+    return Q(from_user_id=SYSTEM_USER_ID)
+
+
+def messages_filter():
+    return Q(from_user_id__gt=SYSTEM_USER_ID)
+
+
+class Notifications:
+    def __init__(self, user):
+        self.user = user
+
+    @cached_property
+    def counter(self):
+        return UnreadCounter.for_user(self.user.pk)
+
+    @property
+    def alerts_count(self):
+        return self.counter.alerts
+
+    @property
+    def messages_count(self):
+        return self.counter.messages
+
+    @property
+    def last_message_id(self):
+        return self.counter.last_message_id
+
+    @property
+    def poll_interval(self):
+        return settings.MESSAGE_POLL_INTERVAL
+
+    @property
+    def max_poll_interval(self):
+        return settings.MESSAGE_POLL_MAX_INTERVAL
+
+    @cached_property
+    def alerts(self):
+        if not self.alerts_count:
+            return []
+        return list(Message.objects.filter(
+            alerts_filter(), to_user_id=self.user.pk, read=False).order_by(
+            '-date_sent')[:PREVIEW_SIZE])
+
+    @cached_property
+    def messages(self):
+        if not self.messages_count:
+            return []
+        return list(Message.objects.filter(
+            messages_filter(), to_user_id=self.user.pk,
+            read=False).select_related('from_user__employee').order_by(
+            '-date_sent')[:PREVIEW_SIZE])
+
+
+def mark_read(message):
+    """Mark a message as read and take it off its recipient's unread
+    count. Returns whether this call was the one that marked it."""
+    with transaction.atomic():
+        marked = Message.objects.filter(pk=message.pk, read=False).update(
+            read=True)
+        if marked:
+            field = 'alerts' if message.is_alert else 'messages'
+            UnreadCounter.apply(message.to_user_id, **{field: -1})
+    message.read = True
+    return bool(marked)
+
+
+def updates(user, since):
+    """Return the unread counts of ``user`` with their messages newer than
+    the message with id ``since``, oldest first."""
+    counter = UnreadCounter.for_user(user.pk)
+    new, last_message_id = [], max(since, counter.last_message_id)
+    if counter.last_message_id > since:
+        new = list(Message.objects.filter(
+            to_user_id=user.pk, id__gt=since).select_related(
+            'from_user').order_by('id')[:UPDATES_LIMIT])
+        if len(new) == UPDATES_LIMIT:
+            # The client asks again from here for the rest.
+            last_message_id = new[-1].id
+    return {
+        'last_message_id': last_message_id,
+        'alerts_count': counter.alerts,
+        'messages_count': counter.messages,
+        'messages': [{
+            'id': message.id,
+            'from': message.from_user.get_full_name(),
+            'text': message.text,
+            'date_sent': message.date_sent.isoformat(),
+            'read': message.read,
+            'alert': message.is_alert,
+            'url': reverse('message', args=[message.id]),
+        } for message in new],
+    }
+
+
+def notifications(request):
+    """Template context processor exposing the current user's unread
+    message and alert counts with a few previews of each."""
+    user = getattr(request, 'user', None)
+    if user is None or not user.is_authenticated:
+        return {}
+    return {'notifications': Notifications(user)}
@@ -0,0 +1,125 @@
+"""A database outbox for outgoing email.
+
+Views call ``queue()``, which only inserts an ``OutgoingEmail`` row, so a
+slow or unreachable SMTP server never holds up a request. ``manage.py
+sendmail`` drains the outbox: each batch of up to ``BATCH_SIZE`` emails is
+sent over one connection from ``get_connection()``, which the SMTP backend
+keeps open between ``send_messages`` calls.
+
+A sender claims a batch by stamping it with a random ``claimed_by`` token
+and a ``locked_until`` deadline in one conditional UPDATE, so several
+senders can drain the same outbox. A failed email is retried with
+exponential backoff and moved to Dead once it has used up its attempts.
+Emails locked by a sender that died are claimable again once their lock
+expires.
+"""
+import logging
+import time
+import traceback
+import uuid
+from datetime import timedelta
+
+from django.core.mail import EmailMessage, get_connection
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import OutgoingEmail
+
+logger = logging.getLogger(__name__)
+
+FROM_EMAIL = 'no-reply@crystalims.com'
+BATCH_SIZE = 100
+BACKOFF = 60
+
+
+def queue(subject, body, recipient_list, from_email=FROM_EMAIL,
+          max_attempts=5):
+    return OutgoingEmail.objects.create(
+        subject=subject, body=body, from_email=from_email,
+        recipients='\n'.join(recipient_list), max_attempts=max_attempts)
+
+
+def claimable(now):
+    return Q(status='Q', send_after__lte=now) & (
+            Q(locked_until__isnull=True) | Q(locked_until__lt=now))
+
+
+def claim(batch_size, visibility_timeout):
+    """Claim up to ``batch_size`` emails that are due for this sender."""
+    now = timezone.now()
+    token = uuid.uuid4().hex
+    candidates = list(OutgoingEmail.objects.filter(claimable(now)).order_by(
+        'send_after').values_list('id', flat=True)[:batch_size])
+    if not candidates:
+        return []
+    OutgoingEmail.objects.filter(claimable(now), id__in=candidates).update(
+        claimed_by=token, attempts=F('attempts') + 1,
+        locked_until=now + timedelta(seconds=visibility_timeout))
+    return list(OutgoingEmail.objects.filter(
+        id__in=candidates, claimed_by=token).order_by('send_after'))
+
+
+def failed(email, error):
+    """Schedule a retry of a claimed email, or give up on it."""
+    emails = OutgoingEmail.objects.filter(id=email.id,
+                                          claimed_by=email.claimed_by)
+    if email.attempts < email.max_attempts:
+        emails.update(locked_until=None, last_error=error,
+                      send_after=timezone.now() + timedelta(
+                          seconds=BACKOFF * 2 ** (email.attempts - 1)))
+    else:
+        logger.error('Giving up on email %s to %s after %s attempts',
+                     email.id, ', '.join(email.recipient_list),
+                     email.attempts)
+        emails.update(status='D', locked_until=None, last_error=error)
+
+
+def send_batch(batch_size=BATCH_SIZE, visibility_timeout=300):
+    """Send one batch of due emails over a single connection. Returns the
+    number of emails claimed."""
+    emails = claim(batch_size, visibility_timeout)
+    if not emails:
+        return 0
+    connection = get_connection(fail_silently=False)
+    try:
+        connection.open()
+    except Exception:
+        logger.exception('Could not connect to send %s emails', len(emails))
+        error = traceback.format_exc()
+        for email in emails:
+            failed(email, error)
+        return len(emails)
+    sent = []
+    try:
+        for email in emails:
+            message = EmailMessage(email.subject, email.body,
+                                   email.from_email, email.recipient_list,
+                                   connection=connection)
+            try:
+                # One message per call, so a rejected recipient only
+                # fails its own email.
+                if connection.send_messages([message]):
+                    sent.append(email.id)
+                else:
+                    failed(email, 'The backend did not send the message.')
+            except Exception:
+                logger.exception('Email %s failed', email.id)
+                failed(email, traceback.format_exc())
+    finally:
+        OutgoingEmail.objects.filter(id__in=sent).update(
+            status='S', locked_until=None, sent_at=timezone.now())
+        connection.close()
+    return len(emails)
+
+
+def run_sender(batch_size=BATCH_SIZE, poll_interval=5.0,
+               visibility_timeout=300, once=False):
+    """Send batches of due emails until stopped.
+
+    With ``once`` the sender stops as soon as no email is due.
+    """
+    while True:
+        if not send_batch(batch_size, visibility_timeout):
+            if once:
+                return
+            time.sleep(poll_interval)
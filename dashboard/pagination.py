@@ -0,0 +1,213 @@
+"""Keyset (cursor) pagination for list views.
+
+Instead of ``OFFSET`` and a ``COUNT(*)`` per page, each page is fetched
+with a ``WHERE`` clause that continues from the last row shown, so deep
+pages cost the same as the first. A page links to its neighbours through
+opaque ``after``/``before`` cursors that encode the ordering values of its
+last/first row.
+
+Orderings must end in a unique column (usually the primary key) so the
+position of every row is unambiguous. Nullable columns follow MySQL and
+SQLite: NULLs sort first ascending and last descending.
+"""
+import base64
+import datetime
+import hashlib
+import json
+
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+
+DEFAULT_PAGE_SIZE = 10
+MAX_PAGE_SIZE = 100
+COUNT_CACHE_TIMEOUT = 5 * 60
+
+
+class CursorEncoder(DjangoJSONEncoder):
+    """Keep full microsecond precision, which DjangoJSONEncoder drops."""
+
+    def default(self, o):
+        if isinstance(o, datetime.datetime):
+            return o.isoformat()
+        return super().default(o)
+
+
+def encode_cursor(values):
+    data = json.dumps(values, cls=CursorEncoder, separators=(',', ':'))
+    return base64.urlsafe_b64encode(data.encode()).decode()
+
+
+def decode_cursor(cursor):
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (TypeError, ValueError):
+        return None
+    return values if isinstance(values, list) else None
+
+
+def cursor_values(model, fields, cursor):
+    """Return the values of ``cursor`` for the ordering ``fields``, or None
+    if it was not made for them or has been tampered with."""
+    values = decode_cursor(cursor)
+    if values is None or len(values) != len(fields):
+        return None
+    try:
+        return [None if value is None else
+                field_of(model, name).to_python(value)
+                for (name, _), value in zip(fields, values)]
+    except (TypeError, ValueError, ValidationError):
+        return None
+
+
+def field_of(model, name):
+    *relations, name = name.split('__')
+    for relation in relations:
+        model = model._meta.get_field(relation).related_model
+    return model._meta.get_field(name)
+
+
+def page_size(request):
+    try:
+        size = int(request.GET.get('num', DEFAULT_PAGE_SIZE))
+    except ValueError:
+        size = DEFAULT_PAGE_SIZE
+    return min(max(size, 1), MAX_PAGE_SIZE)
+
+
+def parse_ordering(ordering):
+    return [(field.lstrip('-'), field.startswith('-')) for field in ordering]
+
+
+def value_of(obj, field):
+    for part in field.split('__'):
+        obj = getattr(obj, part) if obj is not None else None
+    return obj
+
+
+def seek(ordering, values, forward):
+    """Build the filter selecting the rows that come after ``values`` when
+    reading in ``ordering`` order (or before them if not ``forward``)."""
+    condition = Q(pk__in=[])
+    for index, (field, descending) in enumerate(ordering):
+        value = values[index]
+        greater = descending != forward
+        if value is None:
+            # NULL sorts lowest, so only non-NULL values are greater.
+            if not greater:
+                continue
+            step = Q(**{field + '__isnull': False})
+        elif greater:
+            step = Q(**{field + '__gt': value})
+        else:
+            step = Q(**{field + '__lt': value}) | Q(
+                **{field + '__isnull': True})
+        for previous_field, previous in zip(
+                [name for name, _ in ordering[:index]], values[:index]):
+            if previous is None:
+                step &= Q(**{previous_field + '__isnull': True})
+            else:
+                step &= Q(**{previous_field: previous})
+        condition |= step
+    return condition
+
+
+class CursorPage:
+    """One page of results with cursors pointing at its neighbours."""
+
+    def __init__(self, object_list, request, has_next=False,
+                 has_previous=False, next_cursor=None, previous_cursor=None,
+                 count=None):
+        self.object_list = object_list
+        self.has_next = has_next
+        self.has_previous = has_previous
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+        self.params = request.GET.copy()
+        self._count = count
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    @property
+    def count(self):
+        return self._count() if callable(self._count) else self._count
+
+    def query_for(self, cursor_name, cursor):
+        params = self.params.copy()
+        params.pop('after', None)
+        params.pop('before', None)
+        params[cursor_name] = cursor
+        return params.urlencode()
+
+    @property
+    def next_query(self):
+        return self.query_for('after', self.next_cursor)
+
+    @property
+    def previous_query(self):
+        return self.query_for('before', self.previous_cursor)
+
+
+def cached_count(queryset):
+    """Return a callable giving the row count of ``queryset``, cached for a
+    few minutes so repeated page views do not each run ``COUNT(*)``."""
+
+    def count():
+        key = 'count:' + hashlib.md5(
+            str(queryset.query).encode()).hexdigest()
+        return cache.get_or_set(key, queryset.count, COUNT_CACHE_TIMEOUT)
+
+    return count
+
+
+def paginate(queryset, request, ordering):
+    """Return the page of ``queryset`` selected by the request's cursor.
+
+    ``ordering`` lists the fields to order by, as for ``order_by()``.
+    """
+    size = page_size(request)
+    fields = parse_ordering(ordering)
+    after = cursor_values(queryset.model, fields, request.GET.get('after', ''))
+    before = cursor_values(queryset.model, fields,
+                           request.GET.get('before', ''))
+    count = cached_count(queryset)
+    if before is not None:
+        reverse = [name if descending else '-' + name
+                   for name, descending in fields]
+        rows = list(queryset.filter(seek(fields, before, False)).order_by(
+            *reverse)[:size + 1])
+        has_previous = len(rows) > size
+        rows = rows[:size][::-1]
+        has_next = True
+    else:
+        if after is not None:
+            queryset = queryset.filter(seek(fields, after, True))
+        rows = list(queryset.order_by(*ordering)[:size + 1])
+        has_next = len(rows) > size
+        rows = rows[:size]
+        has_previous = after is not None
+
+    def key(row):
+        return [value_of(row, name) for name, _ in fields]
+
+    return CursorPage(
+        rows, request,
+        has_next=has_next and bool(rows),
+        has_previous=has_previous and bool(rows),
+        next_cursor=encode_cursor(key(rows[-1])) if rows else None,
+        previous_cursor=encode_cursor(key(rows[0])) if rows else None,
+        count=count)
+
+
+def page_of_list(object_list, request):
+    """Wrap an already bounded list, such as search results, as one page."""
+    return CursorPage(list(object_list)[:page_size(request)], request,
+                      count=len(object_list))
@@ -1,17 +1,74 @@
-import io
+import tempfile
 
 import urllib3
 from django.core.files import File
 from django.shortcuts import redirect
 from social_core.pipeline.partial import partial
 
-from .models import User, Location
+from .avatars import process_avatar
+from .models import Employee, User, Location
+from .tasks import task
 
+MAX_IMAGE_SIZE = 5 * 1024 * 1024
+CHUNK_SIZE = 64 * 1024
+# Bodies up to this size stay in memory, larger ones go to a temporary file.
+SPOOL_SIZE = 1024 * 1024
 
-def retrieve_image(url):
-    response = urllib3.PoolManager().urlopen('GET', url,
-                                             preload_content=False).read()
-    return io.BytesIO(response)
+# One pool for the process, so repeated fetches from the same CDN reuse
+# connections.
+http = urllib3.PoolManager(
+    maxsize=4, block=False,
+    timeout=urllib3.Timeout(connect=3.0, read=10.0),
+    retries=urllib3.Retry(total=2, redirect=3, backoff_factor=0.5,
+                          status_forcelist=[502, 503, 504]))
+
+
+class ImageFetchError(Exception):
+    pass
+
+
+def retrieve_image(url, max_size=MAX_IMAGE_SIZE):
+    """Download the image at ``url`` into a file, reading at most
+    ``max_size`` bytes. Raises ``ImageFetchError`` when the response is
+    not a successful image response or is too large."""
+    response = http.request('GET', url, preload_content=False)
+    try:
+        if response.status != 200:
+            raise ImageFetchError('{0} returned {1}'.format(
+                url, response.status))
+        content_type = response.headers.get('Content-Type', '')
+        if not content_type.startswith('image/'):
+            raise ImageFetchError('{0} is {1}, not an image'.format(
+                url, content_type or 'untyped'))
+        length = response.headers.get('Content-Length')
+        if length and length.isdigit() and int(length) > max_size:
+            raise ImageFetchError('{0} is larger than {1} bytes'.format(
+                url, max_size))
+        file = tempfile.SpooledTemporaryFile(max_size=SPOOL_SIZE)
+        size = 0
+        for chunk in response.stream(CHUNK_SIZE):
+            size += len(chunk)
+            if size > max_size:
+                file.close()
+                raise ImageFetchError('{0} is larger than {1} bytes'.format(
+                    url, max_size))
+            file.write(chunk)
+        file.seek(0)
+        return file
+    except Exception:
+        # Drop the connection rather than reuse it with a body unread.
+        response.close()
+        raise
+    finally:
+        response.release_conn()
+
+
+@task(max_attempts=3)
+def save_avatar(user_id, url):
+    employee = Employee.objects.get(user_id=user_id)
+    with retrieve_image(url) as image:
+        employee.image.save('user_{0}.jpg'.format(user_id), File(image))
+    process_avatar(employee.id)
 
 
 @partial
@@ -25,8 +82,6 @@ def identify_company(strategy, backend, request, details, *args, **kwargs):
         location = Location.objects.get(id=location_id)
         user.employee.location = location
         user.employee.username = kwargs['username']
-        file_name = 'user_{0}.jpg'.format(user.id)
-        user.employee.image.save(file_name, File(
-            retrieve_image(kwargs['response']['picture'])))
         user.employee.save()
+        save_avatar.delay(user.id, kwargs['response']['picture'])
     return
@@ -0,0 +1,139 @@
+"""SQL query count and timing per request.
+
+``QueryStatsMiddleware`` times every statement a view runs with a database
+execute wrapper, so it works with ``DEBUG`` off. For each request it:
+
+* adds ``X-Query-Count`` and ``X-Query-Time`` (milliseconds) headers when
+  ``settings.QUERY_STATS_HEADERS`` is true (the default follows ``DEBUG``),
+* logs the figures and the slowest statements to the ``dashboard.queries``
+  logger as JSON at DEBUG level, so they are only written when that logger
+  is turned up (``QUERY_LOG_LEVEL`` in the settings),
+* adds them to a rolling summary of the last ``WINDOW`` requests of each
+  endpoint, available from ``summary()``.
+"""
+import json
+import logging
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger('dashboard.queries')
+
+SLOWEST = 5
+WINDOW = 200
+
+
+class QueryRecorder:
+    """Context manager recording the statements run on all database
+    connections, with their duration in seconds."""
+
+    def __init__(self):
+        self.statements = []
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.statements.append((sql, time.perf_counter() - start))
+
+    def __enter__(self):
+        self.stack = ExitStack()
+        # Aliases can share a connection, like a test mirror of the replica.
+        for connection in {id(connection): connection
+                           for connection in connections.all()}.values():
+            self.stack.enter_context(connection.execute_wrapper(self))
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stack.close()
+
+    @property
+    def count(self):
+        return len(self.statements)
+
+    @property
+    def duration(self):
+        return sum(duration for _, duration in self.statements)
+
+    def slowest(self, number=SLOWEST):
+        return sorted(self.statements, key=lambda statement: statement[1],
+                      reverse=True)[:number]
+
+
+class Summary:
+    """Rolling query figures of the last ``window`` requests per endpoint."""
+
+    def __init__(self, window=WINDOW):
+        self.lock = threading.Lock()
+        self.samples = defaultdict(lambda: deque(maxlen=window))
+
+    def add(self, endpoint, count, duration):
+        with self.lock:
+            self.samples[endpoint].append((count, duration))
+
+    def clear(self):
+        with self.lock:
+            self.samples.clear()
+
+    def report(self):
+        with self.lock:
+            samples = {endpoint: list(values)
+                       for endpoint, values in self.samples.items()}
+        report = {}
+        for endpoint, values in samples.items():
+            counts = sorted(count for count, _ in values)
+            durations = sorted(duration for _, duration in values)
+            report[endpoint] = {
+                'requests': len(values),
+                'queries_p50': percentile(counts, 50),
+                'queries_max': counts[-1],
+                'db_ms_p50': round(percentile(durations, 50) * 1000, 2),
+                'db_ms_p95': round(percentile(durations, 95) * 1000, 2),
+            }
+        return report
+
+
+def percentile(ordered, percent):
+    index = min(len(ordered) - 1, int(len(ordered) * percent / 100))
+    return ordered[index]
+
+
+summary = Summary()
+
+
+def endpoint_of(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is not None and match.view_name:
+        return match.view_name
+    return request.path
+
+
+class QueryStatsMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with QueryRecorder() as recorder:
+            response = self.get_response(request)
+        endpoint = endpoint_of(request)
+        duration = recorder.duration
+        summary.add(endpoint, recorder.count, duration)
+        if getattr(settings, 'QUERY_STATS_HEADERS', settings.DEBUG):
+            response['X-Query-Count'] = str(recorder.count)
+            response['X-Query-Time'] = '{0:.1f}'.format(duration * 1000)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(json.dumps({
+                'endpoint': endpoint,
+                'method': request.method,
+                'status': response.status_code,
+                'queries': recorder.count,
+                'db_ms': round(duration * 1000, 2),
+                'slowest': [{'sql': sql, 'ms': round(seconds * 1000, 2)}
+                            for sql, seconds in recorder.slowest()],
+            }))
+        return response
@@ -0,0 +1,87 @@
+"""Company reference data cached for the dropdowns of forms.
+
+The categories, suppliers and locations of a company, and the list of all
+companies, fill a select on many pages but rarely change. They are cached
+as ``(id, name)`` choices under keys that carry a version number per
+company. The receivers below bump the version whenever one of these rows
+is saved or deleted, so the next request reads fresh data and the old keys
+simply expire.
+"""
+import time
+from collections import namedtuple
+
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Category, Company, Location, Supplier
+
+CACHE_TIMEOUT = 60 * 60 * 24
+ALL_COMPANIES = 'all'
+
+Choice = namedtuple('Choice', ['id', 'name'])
+
+
+def version_key(scope):
+    return 'reference:{0}:version'.format(scope)
+
+
+def version(scope):
+    key = version_key(scope)
+    value = cache.get(key)
+    if value is None:
+        # Start from the clock, so a version key that was evicted does not
+        # bring back data cached under an earlier number.
+        cache.add(key, time.time_ns(), None)
+        value = cache.get(key)
+    return value
+
+
+def invalidate(scope):
+    try:
+        cache.incr(version_key(scope))
+    except ValueError:
+        # No version yet, so nothing is cached under the current one.
+        pass
+
+
+def choices(scope, kind, queryset):
+    key = 'reference:{0}:{1}:{2}'.format(scope, version(scope), kind)
+    return cache.get_or_set(key, lambda: [
+        Choice(*row) for row in queryset.order_by('name', 'id').values_list(
+            'id', 'name')], CACHE_TIMEOUT)
+
+
+def categories(company_id):
+    return choices(company_id, 'categories',
+                   Category.objects.filter(company_id=company_id))
+
+
+def suppliers(company_id):
+    return choices(company_id, 'suppliers',
+                   Supplier.objects.filter(company_id=company_id))
+
+
+def locations(company_id):
+    return choices(company_id, 'locations',
+                   Location.objects.filter(company_id=company_id))
+
+
+def companies():
+    return choices(ALL_COMPANIES, 'companies', Company.objects.all())
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=Supplier)
+@receiver(post_delete, sender=Supplier)
+@receiver(post_save, sender=Location)
+@receiver(post_delete, sender=Location)
+def invalidate_company(sender, instance, **kwargs):
+    invalidate(instance.company_id)
+
+
+@receiver(post_save, sender=Company)
+@receiver(post_delete, sender=Company)
+def invalidate_companies(sender, instance, **kwargs):
+    invalidate(ALL_COMPANIES)
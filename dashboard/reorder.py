@@ -0,0 +1,87 @@
+"""Vectorized reorder engine.
+
+All items of a company are loaded into NumPy arrays with one query, and
+safety stock and reorder points are computed for every item at once:
+
+    lead time demand = average daily usage * average lead time
+    safety stock     = maximum daily usage * maximum lead time
+                       - lead time demand
+    reorder point    = lead time demand + safety stock
+
+Items without usage figures keep the reorder point entered for them. Every
+item whose stock is at or below its reorder point, and that has no order
+queued or sent already, gets a Queued purchase order big enough to cover
+one more lead time above the reorder point.
+"""
+import numpy as np
+
+from django.db import transaction
+
+from .models import Item, PurchaseOrder
+
+FIELDS = ['quantity_available', 'reorder_point', 'average_daily_usage',
+          'maximum_daily_usage', 'average_lead_time', 'maximum_lead_time']
+OPEN_ORDER_STATUSES = ['Q', 'S']
+
+
+class Plan:
+    """The reorder figures of every item of a company, as parallel arrays
+    indexed like ``skus``."""
+
+    def __init__(self, skus, figures):
+        self.skus = np.array(skus, dtype=object)
+        (self.available, self.current_reorder_point, average_usage,
+         maximum_usage, average_lead_time, maximum_lead_time) = \
+            figures.reshape(-1, len(FIELDS)).T
+        self.lead_time_demand = average_usage * average_lead_time
+        self.safety_stock = np.maximum(
+            maximum_usage * maximum_lead_time - self.lead_time_demand, 0)
+        self.reorder_point = np.where(
+            maximum_usage > 0, self.lead_time_demand + self.safety_stock,
+            self.current_reorder_point)
+        self.due = self.available <= self.reorder_point
+        self.order_quantity = np.maximum(
+            self.reorder_point + self.lead_time_demand - self.available, 1)
+
+
+def plan(company):
+    rows = list(Item.objects.filter(company=company).order_by(
+        'SKU').values_list('SKU', *FIELDS))
+    skus = [row[0] for row in rows]
+    figures = np.array([row[1:] for row in rows], dtype=np.int64)
+    return Plan(skus, figures)
+
+
+def save_reorder_points(result, batch_size):
+    """Store the computed reorder points that changed, with one ``UPDATE``
+    per distinct value and batch of items."""
+    changed = result.reorder_point != result.current_reorder_point
+    for value in np.unique(result.reorder_point[changed]):
+        skus = result.skus[changed & (result.reorder_point == value)]
+        for start in range(0, len(skus), batch_size):
+            Item.objects.filter(
+                SKU__in=list(skus[start:start + batch_size])).update(
+                reorder_point=int(value))
+
+
+def run(company, update_reorder_points=True, batch_size=500):
+    """Queue purchase orders for the company's items that need restocking.
+
+    Returns the created ``PurchaseOrder`` objects.
+    """
+    result = plan(company)
+    with transaction.atomic():
+        if update_reorder_points:
+            save_reorder_points(result, batch_size)
+        open_orders = set(PurchaseOrder.objects.filter(
+            item__company=company,
+            status__in=OPEN_ORDER_STATUSES).values_list('item_id', flat=True))
+        unordered = np.fromiter((sku not in open_orders
+                                 for sku in result.skus), bool,
+                                len(result.skus))
+        due = np.flatnonzero(result.due & unordered)
+        orders = [PurchaseOrder(item_id=result.skus[index],
+                                quantity=int(result.order_quantity[index]),
+                                status='Q') for index in due]
+        return PurchaseOrder.objects.bulk_create(orders)
+
@@ -0,0 +1,103 @@
+"""Read replica routing for read-only views.
+
+Views decorated with ``@read_only`` read from the ``replica`` database
+while writes always go to ``default``. Without a ``replica`` entry in
+``settings.DATABASES`` everything uses ``default``.
+
+A replica lags behind the primary, so after a user sends a request that
+may write (anything but GET, HEAD, OPTIONS and TRACE) ``ReplicaMiddleware``
+sets a cookie that keeps that user's reads on the primary for
+``settings.REPLICA_STICKY_SECONDS``. Users see their own changes straight
+away. Code that reads in order to write, like the counters built the
+first time they are shown, reads the primary inside ``use_primary()``.
+
+``crystalims/test_settings.py`` configures the replica as a test mirror of
+``default``, so the tests go through the same routing.
+"""
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
+
+REPLICA = 'replica'
+PRIMARY = 'default'
+STICKY_COOKIE = 'use_primary'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS', 'TRACE')
+
+state = threading.local()
+
+
+def read_only(view):
+    """Mark a view as safe to serve from the read replica."""
+    view.read_only = True
+    return view
+
+
+def replica_enabled():
+    return REPLICA in settings.DATABASES
+
+
+def reading_replica():
+    return getattr(state, 'replica', False)
+
+
+@contextmanager
+def use_primary():
+    """Read from the primary inside the block. Also a decorator."""
+    replica = reading_replica()
+    state.replica = False
+    try:
+        yield
+    finally:
+        state.replica = replica
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if reading_replica() and replica_enabled():
+            return REPLICA
+        return PRIMARY
+
+    def db_for_write(self, model, **hints):
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # The replica holds the same rows as the primary.
+        return True
+
+
+def streamed(content, replica):
+    """Keep the routing of a view while its streamed response is read."""
+    state.replica = replica
+    try:
+        yield from content
+    finally:
+        state.replica = False
+
+
+class ReplicaMiddleware:
+    """Route the reads of ``@read_only`` views to the replica unless the
+    user has written recently."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        state.replica = False
+        try:
+            response = self.get_response(request)
+            if response.streaming:
+                response.streaming_content = streamed(
+                    response.streaming_content, reading_replica())
+        finally:
+            state.replica = False
+        if request.method not in SAFE_METHODS:
+            response.set_cookie(STICKY_COOKIE, '1',
+                                max_age=settings.REPLICA_STICKY_SECONDS,
+                                httponly=True, samesite='Lax')
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        state.replica = (getattr(view_func, 'read_only', False) and
+                         request.method in SAFE_METHODS and
+                         STICKY_COOKIE not in request.COOKIES)
@@ -0,0 +1,105 @@
+"""Role membership resolved once per user and cached.
+
+A user's group names and company id are read with two small queries the
+first time they are needed and then kept in the cache until the user's
+groups or branch location change. They are also memoised on the user
+object, so checks within one request do not even hit the cache.
+"""
+from django.core.cache import cache
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Employee, User
+
+ADMIN_GROUPS = frozenset(["Company Admins", "Company Superusers"])
+SUPERUSER_GROUPS = frozenset(["Company Superusers"])
+CACHE_TIMEOUT = 60 * 60
+
+
+def cache_key(user_id):
+    return 'roles:{0}'.format(user_id)
+
+
+def get_role_info(user):
+    """Return ``{'groups': frozenset, 'company_id': int}`` for ``user``."""
+    if not getattr(user, 'is_authenticated', False):
+        return {'groups': frozenset(), 'company_id': None}
+    info = getattr(user, '_role_info', None)
+    if info is None:
+        info = cache.get(cache_key(user.pk))
+        if info is None:
+            if User.employee.is_cached(user):
+                # Loaded with its location by the tenant middleware.
+                company_id = user.employee.location.company_id
+            else:
+                company_id = Employee.objects.filter(
+                    user_id=user.pk).values_list(
+                    'location__company_id', flat=True).first()
+            info = {
+                'groups': frozenset(
+                    user.groups.values_list('name', flat=True)),
+                'company_id': company_id,
+            }
+            cache.set(cache_key(user.pk), info, CACHE_TIMEOUT)
+        user._role_info = info
+    return info
+
+
+def get_roles(user):
+    return get_role_info(user)['groups']
+
+
+def has_role(user, *group_names):
+    return not get_roles(user).isdisjoint(group_names)
+
+
+def is_company_admin(user):
+    return has_role(user, *ADMIN_GROUPS)
+
+
+def is_company_superuser(user):
+    return has_role(user, *SUPERUSER_GROUPS)
+
+
+def invalidate(user_id):
+    cache.delete(cache_key(user_id))
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+def invalidate_user_groups(sender, instance, action, reverse, pk_set,
+                           **kwargs):
+    if not reverse:
+        if action.startswith('post_'):
+            invalidate(instance.pk)
+            instance._role_info = None
+    elif action == 'pre_clear':
+        # A group is losing all its members; remember who they were.
+        instance._cleared_user_ids = list(
+            instance.user_set.values_list('pk', flat=True))
+    elif action == 'post_clear':
+        for user_id in getattr(instance, '_cleared_user_ids', []):
+            invalidate(user_id)
+    elif action.startswith('post_'):
+        for user_id in pk_set:
+            invalidate(user_id)
+
+
+@receiver(post_save, sender=Employee)
+@receiver(post_delete, sender=Employee)
+def invalidate_employee(sender, instance, **kwargs):
+    invalidate(instance.user_id)
+
+
+def roles(request):
+    """Template context processor exposing the current user's roles."""
+    user = getattr(request, 'user', None)
+    if user is None or not user.is_authenticated:
+        return {}
+    info = get_role_info(user)
+    return {
+        'roles': info['groups'],
+        'roles_key': '|'.join(sorted(info['groups'])),
+        'company_id': info['company_id'],
+        'is_company_admin': is_company_admin(user),
+        'is_company_superuser': is_company_superuser(user),
+    }
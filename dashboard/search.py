@@ -0,0 +1,137 @@
+"""Full-text item search scoped to a company.
+
+Each item has an ``ItemSearchIndex`` row holding its SKU, description,
+category name and supplier name. The rows are indexed with a MySQL FULLTEXT
+index in production and a SQLite FTS5 table locally; both are created by
+migration 0028. Search terms are matched as prefixes and ranked by
+relevance, and items whose SKU starts with the query are listed first.
+Other database backends fall back to a plain ``icontains`` scan.
+"""
+import re
+
+from django.db import connection
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from .models import Category, Item, ItemSearchIndex, Supplier
+
+TOKEN = re.compile(r'\w+', re.UNICODE)
+
+
+def document(item):
+    return ' '.join([item.SKU, item.description, item.category.name,
+                     item.supplier.name])
+
+
+def index_items(items):
+    """Create or refresh the search rows of ``items``.
+
+    The items should have their category and supplier loaded, e.g. with
+    ``select_related('category', 'supplier')``.
+    """
+    items = list(items)
+    existing = {entry.item_id: entry for entry in
+                ItemSearchIndex.objects.filter(
+                    item_id__in=[item.SKU for item in items])}
+    changed, created = [], []
+    for item in items:
+        body = document(item)
+        entry = existing.get(item.SKU)
+        if entry is None:
+            created.append(ItemSearchIndex(item_id=item.SKU,
+                                           company_id=item.company_id,
+                                           body=body))
+        elif entry.body != body or entry.company_id != item.company_id:
+            entry.body = body
+            entry.company_id = item.company_id
+            changed.append(entry)
+    ItemSearchIndex.objects.bulk_create(created)
+    ItemSearchIndex.objects.bulk_update(changed, ['body', 'company'],
+                                        batch_size=1000)
+
+
+def rebuild(batch_size=1000):
+    """Reindex every item, ``batch_size`` items at a time."""
+    items = Item.objects.select_related('category', 'supplier').order_by(
+        'SKU')
+    last_sku = ''
+    while True:
+        batch = list(items.filter(SKU__gt=last_sku)[:batch_size])
+        if not batch:
+            break
+        index_items(batch)
+        last_sku = batch[-1].SKU
+
+
+def terms(query):
+    return TOKEN.findall(query)[:10]
+
+
+def search_items(company, query, limit=20):
+    """Return up to ``limit`` of the company's items matching ``query``,
+    best matches first."""
+    query = query.strip()
+    if not query:
+        return []
+    skus = list(Item.objects.filter(
+        company=company, SKU__istartswith=query).order_by('SKU').values_list(
+        'SKU', flat=True)[:limit])
+    if len(skus) < limit:
+        for sku in ranked_skus(company.id, terms(query), limit):
+            if sku not in skus:
+                skus.append(sku)
+    skus = skus[:limit]
+    items = Item.objects.select_related('category', 'supplier').in_bulk(skus)
+    return [items[sku] for sku in skus if sku in items]
+
+
+def ranked_skus(company_id, words, limit):
+    if not words:
+        return []
+    vendor = connection.vendor
+    with connection.cursor() as cursor:
+        if vendor == 'sqlite':
+            cursor.execute(
+                "SELECT i.item_id FROM dashboard_itemsearchindex_fts f "
+                "JOIN dashboard_itemsearchindex i ON i.id = f.rowid "
+                "WHERE dashboard_itemsearchindex_fts MATCH %s "
+                "AND i.company_id = %s ORDER BY f.rank LIMIT %s",
+                [' '.join('"{0}"*'.format(word) for word in words),
+                 company_id, limit])
+        elif vendor == 'mysql':
+            match = ' '.join('+{0}*'.format(word) for word in words)
+            cursor.execute(
+                "SELECT item_id FROM dashboard_itemsearchindex "
+                "WHERE company_id = %s "
+                "AND MATCH(body) AGAINST (%s IN BOOLEAN MODE) "
+                "ORDER BY MATCH(body) AGAINST (%s IN BOOLEAN MODE) DESC "
+                "LIMIT %s", [company_id, match, match, limit])
+        else:
+            entries = ItemSearchIndex.objects.filter(company_id=company_id)
+            for word in words:
+                entries = entries.filter(body__icontains=word)
+            return list(entries.values_list('item_id', flat=True)[:limit])
+        return [row[0] for row in cursor.fetchall()]
+
+
+def fields_changed(instance, fields):
+    loaded = getattr(instance, '_loaded_values', None)
+    if loaded is None:
+        return True
+    return any(loaded.get(field) != getattr(instance, field)
+               for field in fields)
+
+
+@receiver(post_save, sender=Item)
+def index_item(sender, instance, created, **kwargs):
+    if created or fields_changed(instance, ['SKU', 'description', 'company_id',
+                                            'category_id', 'supplier_id']):
+        index_items([instance])
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_save, sender=Supplier)
+def reindex_items(sender, instance, created, **kwargs):
+    if not created and fields_changed(instance, ['name']):
+        index_items(instance.item_set.select_related('category',
+                                                     'supplier'))
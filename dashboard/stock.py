@@ -0,0 +1,176 @@
+"""Stock movements done atomically in the database.
+
+Quantities are changed with ``F()`` updates inside a transaction and
+checked against what is on hand, so concurrent fulfilments cannot lose
+updates or drive stock below zero. Because ``QuerySet.update()`` skips the
+``Item`` signals, the company metrics are adjusted here directly.
+
+Every change is also recorded as a ``StockMovement`` in the same
+transaction. ``take_snapshot()`` periodically stores each item's stock
+as a ``StockSnapshot``, computed from the previous snapshot and the
+movements since. The stock on any date is then the latest snapshot
+before it plus the movements between the two, so a historical answer
+never replays more than one snapshot interval of movements.
+"""
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import F, Max, Sum
+from django.utils import timezone
+
+from .models import (CompanyMetrics, Item, ItemRequest, ItemReturn,
+                     StockMovement, StockSnapshot)
+
+# Snapshots stop this far in the past, so movements of transactions still
+# running when a snapshot is taken are not missed.
+SNAPSHOT_LAG = timedelta(minutes=5)
+
+
+def fulfil_requests(request_ids, company=None):
+    """Serve the given pending requests from stock.
+
+    Requests are served oldest first for each item while stock lasts; the
+    rest are marked Stock Out. Requests that are no longer pending (or that
+    belong to another company) are ignored, and those of an item whose
+    stock was taken by someone else meanwhile are left pending. Returns the
+    ids of the fulfilled and stocked out requests.
+    """
+    with transaction.atomic():
+        pending = ItemRequest.objects.select_for_update().filter(
+            id__in=request_ids, status='P').order_by('created_at', 'id')
+        if company is not None:
+            pending = pending.filter(item__company=company)
+        by_item = defaultdict(list)
+        for item_request in pending:
+            by_item[item_request.item_id].append(item_request.id)
+        items = Item.objects.select_for_update().filter(
+            SKU__in=list(by_item)).order_by('SKU')
+
+        fulfilled, stocked_out, returns, movements = [], [], [], []
+        metrics = defaultdict(lambda: defaultdict(int))
+        for item in items:
+            ids = by_item[item.SKU]
+            served = min(len(ids), max(item.quantity_available, 0))
+            if served and not Item.objects.filter(
+                    SKU=item.SKU, quantity_available__gte=served).update(
+                    quantity_available=F('quantity_available') - served):
+                # The stock was taken since it was read, which only happens
+                # where the database ignores the row lock. Leave the
+                # requests pending.
+                continue
+            fulfilled += ids[:served]
+            stocked_out += ids[served:]
+            movements += [StockMovement(item_id=item.SKU,
+                                        company_id=item.company_id, kind='I',
+                                        quantity=-1,
+                                        item_request_id=request_id)
+                          for request_id in ids[:served]]
+            if item.is_returnable:
+                returns += [ItemReturn(request_id=request_id)
+                            for request_id in ids[:served]]
+            company_metrics = metrics[item.company_id]
+            company_metrics['quantity_available'] -= served
+            company_metrics['inventory_value'] -= item.price * served
+            company_metrics['pending_count'] -= len(ids)
+            company_metrics['fulfilled_count'] += served
+            company_metrics['stockout_count'] += len(ids) - served
+
+        ItemRequest.objects.filter(id__in=fulfilled).update(status='F')
+        ItemRequest.objects.filter(id__in=stocked_out).update(status='SO')
+        ItemReturn.objects.bulk_create(returns)
+        StockMovement.objects.bulk_create(movements)
+        for company_id, deltas in metrics.items():
+            CompanyMetrics.apply(company_id, **deltas)
+    return fulfilled, stocked_out
+
+
+def return_item(item_return_id, company=None):
+    """Put a returned item back in stock. Returns False if the return had
+    already been recorded (or belongs to another company)."""
+    with transaction.atomic():
+        item_returns = ItemReturn.objects.filter(id=item_return_id,
+                                                 is_returned=False)
+        if company is not None:
+            item_returns = item_returns.filter(request__item__company=company)
+        updated = item_returns.update(is_returned=True,
+                                      return_date=timezone.now())
+        if not updated:
+            return False
+        item_return = ItemReturn.objects.select_related('request__item').get(
+            id=item_return_id)
+        item = item_return.request.item
+        Item.objects.filter(SKU=item.SKU).update(
+            quantity_available=F('quantity_available') + 1)
+        StockMovement.objects.create(item=item, company_id=item.company_id,
+                                     kind='RT', quantity=1,
+                                     item_request_id=item_return.request_id)
+        CompanyMetrics.apply(item.company_id, quantity_available=1,
+                             inventory_value=item.price)
+    return True
+
+
+def stock_at(item_id, when):
+    """Return the stock of an item at ``when``."""
+    snapshot = StockSnapshot.objects.filter(
+        item_id=item_id, taken_at__lte=when).order_by(
+        '-taken_at').values_list('taken_at', 'quantity').first()
+    movements = StockMovement.objects.filter(item_id=item_id,
+                                             created_at__lte=when)
+    quantity = 0
+    if snapshot is not None:
+        movements = movements.filter(created_at__gt=snapshot[0])
+        quantity = snapshot[1]
+    return quantity + (movements.aggregate(
+        total=Sum('quantity'))['total'] or 0)
+
+
+def stock_on(company_id, when):
+    """Return ``{SKU: quantity}`` of the company's items in stock at
+    ``when``."""
+    taken_at = StockSnapshot.objects.filter(
+        company_id=company_id, taken_at__lte=when).aggregate(
+        taken_at=Max('taken_at'))['taken_at']
+    movements = StockMovement.objects.filter(company_id=company_id,
+                                             created_at__lte=when)
+    quantities = defaultdict(int)
+    if taken_at is not None:
+        quantities.update(StockSnapshot.objects.filter(
+            company_id=company_id, taken_at=taken_at).values_list(
+            'item_id', 'quantity'))
+        movements = movements.filter(created_at__gt=taken_at)
+    for item_id, quantity in movements.values_list('item_id').annotate(
+            Sum('quantity')).order_by():
+        quantities[item_id] += quantity
+    return {item_id: quantity for item_id, quantity in quantities.items()
+            if quantity}
+
+
+def take_snapshot(company_id, now=None):
+    """Snapshot the company's stock as it was ``SNAPSHOT_LAG`` ago. Returns
+    the number of rows written, which is zero if nothing moved since the
+    previous snapshot."""
+    taken_at = (now or timezone.now()) - SNAPSHOT_LAG
+    with transaction.atomic():
+        previous = StockSnapshot.objects.filter(
+            company_id=company_id).aggregate(
+            taken_at=Max('taken_at'))['taken_at']
+        moved = StockMovement.objects.filter(company_id=company_id,
+                                             created_at__lte=taken_at)
+        if previous is not None:
+            if previous >= taken_at:
+                return 0
+            moved = moved.filter(created_at__gt=previous)
+        moved = set(moved.values_list('item_id', flat=True).distinct())
+        if not moved:
+            return 0
+        quantities = stock_on(company_id, taken_at)
+        # Items that ran out keep a row, so their next read starts here.
+        quantities.update({item_id: 0 for item_id in moved
+                           if item_id not in quantities})
+        # Batches of 200 stay within SQLite's 999 parameters per statement.
+        snapshots = StockSnapshot.objects.bulk_create([
+            StockSnapshot(item_id=item_id, company_id=company_id,
+                          taken_at=taken_at, quantity=quantity)
+            for item_id, quantity in quantities.items()], batch_size=200)
+    return len(snapshots)
@@ -0,0 +1,274 @@
+"""Synthetic tenants for load testing and benchmarks.
+
+``generate()`` creates companies with locations, categories, suppliers,
+employees, items, item requests and messages. The large tables are filled
+with ``executemany`` inserts of ``BATCH_SIZE`` rows, which skips model
+signals, so the search index, company metrics and inventory ledger are
+rebuilt for the new companies at the end. Each item's stock history is a
+receipt of its purchases when it was created and an adjustment down to what
+is available some time later, and the companies' stock is snapshotted once
+it is written.
+
+Request traffic is skewed towards a small share of popular items and spread
+over the last ``HISTORY_DAYS`` days, and a tenth of the messages are alerts
+from the system user.
+"""
+import datetime
+from itertools import islice
+
+import numpy as np
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import Group
+from django.db import connection, transaction
+from django.utils import timezone
+from faker import Faker
+
+from . import ledger, search, stock
+from .models import (Category, Company, CompanyMetrics, Employee, Item,
+                     ItemRequest, Location, Message, StockMovement, Supplier,
+                     User)
+from .notifications import SYSTEM_USER_ID
+from .roles import ADMIN_GROUPS
+
+BATCH_SIZE = 10000
+HISTORY_DAYS = 365
+LOCATIONS = 5
+CATEGORIES = 20
+SUPPLIERS = 20
+REQUEST_STATUSES = ['F', 'P', 'SO', 'C']
+REQUEST_STATUS_WEIGHTS = [0.8, 0.1, 0.05, 0.05]
+ALERT_SHARE = 0.1
+READ_SHARE = 0.8
+PASSWORD = 'password'
+
+
+def insert(model, fields, rows, batch_size=BATCH_SIZE):
+    """Insert ``rows``, tuples of values for ``fields``, into the table of
+    ``model``, ``batch_size`` rows per statement."""
+    quote = connection.ops.quote_name
+    sql = 'INSERT INTO {0} ({1}) VALUES ({2})'.format(
+        quote(model._meta.db_table),
+        ', '.join(quote(model._meta.get_field(field).column)
+                  for field in fields),
+        ', '.join(['%s'] * len(fields)))
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == batch_size:
+            execute_batch(sql, batch)
+            batch = []
+    if batch:
+        execute_batch(sql, batch)
+
+
+def execute_batch(sql, batch):
+    # One transaction per batch, or autocommit would commit every row.
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.executemany(sql, batch)
+
+
+class Generator:
+    def __init__(self, seed=None, log=None):
+        self.rng = np.random.default_rng(seed)
+        self.fake = Faker()
+        self.fake.seed_instance(seed)
+        self.log = log or (lambda message: None)
+        self.words = sorted({self.fake.word() for _ in range(1000)})
+        self.password = make_password(PASSWORD)
+        self.now = timezone.now()
+        self.system_user = User.objects.filter(id=SYSTEM_USER_ID).exists()
+
+    def datetimes(self, count):
+        """Return ``count`` database-ready datetimes in the history window."""
+        offsets = self.rng.random(count) * HISTORY_DAYS * 86400
+        return [connection.ops.adapt_datetimefield_value(
+            self.now - datetime.timedelta(seconds=float(offset)))
+            for offset in offsets]
+
+    def sentences(self, count, length):
+        words = self.rng.integers(0, len(self.words), (count, length))
+        return [' '.join(self.words[word] for word in row).capitalize()
+                for row in words]
+
+    def batches(self, total):
+        for start in range(0, total, BATCH_SIZE):
+            yield min(BATCH_SIZE, total - start)
+
+    def company(self, items, requests, messages, employees):
+        company = Company.objects.create(name=self.fake.company()[:50])
+        self.log('Generating {0}'.format(company))
+        locations = [Location.objects.create(
+            name=self.fake.city()[:20], address=self.fake.address(),
+            city=self.fake.city()[:20], country=self.fake.country()[:20],
+            company=company) for _ in range(LOCATIONS)]
+        categories = [Category.objects.create(
+            name=word[:20], company=company) for word in self.rng.choice(
+            self.words, CATEGORIES, replace=False)]
+        suppliers = [Supplier.objects.create(
+            name=self.fake.company(), description=self.fake.sentence(),
+            email=self.fake.company_email(), company=company)
+            for _ in range(SUPPLIERS)]
+        user_ids = self.employees(company, locations, employees)
+        skus = self.items(company, categories, suppliers, items)
+        self.movements(company)
+        self.requests(skus, user_ids, requests)
+        self.messages(user_ids, messages)
+        return company
+
+    def employees(self, company, locations, count):
+        domain = 'company{0}.example.com'.format(company.id)
+        joined = connection.ops.adapt_datetimefield_value(self.now)
+        insert(User, ['password', 'is_superuser', 'is_staff', 'is_active',
+                      'date_joined', 'first_name', 'last_name', 'email'],
+               ((self.password, False, False, True, joined,
+                 self.fake.first_name()[:30], self.fake.last_name()[:150],
+                 'employee{0}@{1}'.format(number, domain))
+                for number in range(count)))
+        user_ids = list(User.objects.filter(
+            email__endswith='@' + domain).order_by('id').values_list(
+            'id', flat=True))
+        location_ids = [location.id for location in locations]
+        insert(Employee, ['user', 'username', 'image', 'avatar', 'location'],
+               ((user_id, 'employee{0}'.format(number), '', '',
+                 location_ids[number % len(location_ids)])
+                for number, user_id in enumerate(user_ids)))
+        admin = User.objects.get(id=user_ids[0])
+        admin.groups.add(*[Group.objects.get_or_create(name=name)[0]
+                           for name in ADMIN_GROUPS])
+        self.log('  {0} employees'.format(len(user_ids)))
+        return np.array(user_ids)
+
+    def items(self, company, categories, suppliers, count):
+        skus = ['C{0}-{1:07d}'.format(company.id, number)
+                for number in range(count)]
+        category_ids = [category.id for category in categories]
+        supplier_ids = [supplier.id for supplier in suppliers]
+
+        def rows():
+            done = 0
+            for size in self.batches(count):
+                prices = self.rng.integers(1, 1000, size) * 100
+                purchased = self.rng.integers(1, 200, size)
+                available = (purchased * self.rng.random(size)).astype(int)
+                average_usage = self.rng.integers(0, 10, size)
+                maximum_usage = average_usage + self.rng.integers(0, 5, size)
+                average_lead_time = self.rng.integers(1, 10, size)
+                maximum_lead_time = (average_lead_time +
+                                     self.rng.integers(0, 5, size))
+                categories = self.rng.integers(0, len(category_ids), size)
+                suppliers = self.rng.integers(0, len(supplier_ids), size)
+                returnable = self.rng.random(size) < 0.3
+                descriptions = self.sentences(size, 3)
+                created = self.datetimes(size)
+                for index in range(size):
+                    yield (skus[done + index], company.id,
+                           descriptions[index], int(prices[index]),
+                           supplier_ids[suppliers[index]],
+                           category_ids[categories[index]],
+                           int(purchased[index]), int(available[index]),
+                           int(maximum_usage[index]),
+                           int(maximum_lead_time[index]),
+                           int(average_usage[index]),
+                           int(average_lead_time[index]),
+                           int(maximum_usage[index] *
+                               maximum_lead_time[index]),
+                           bool(returnable[index]), created[index])
+                done += size
+
+        insert(Item, ['SKU', 'company', 'description', 'price', 'supplier',
+                      'category', 'quantity_purchased', 'quantity_available',
+                      'maximum_daily_usage', 'maximum_lead_time',
+                      'average_daily_usage', 'average_lead_time',
+                      'reorder_point', 'is_returnable', 'created_at'],
+               rows())
+        self.log('  {0} items'.format(count))
+        return skus
+
+    def movements(self, company):
+        items = Item.objects.filter(company=company).order_by(
+            'SKU').values_list('SKU', 'quantity_purchased',
+                               'quantity_available', 'created_at').iterator()
+
+        def rows():
+            while True:
+                batch = list(islice(items, BATCH_SIZE))
+                if not batch:
+                    break
+                # Stock is adjusted at a random time between the item's
+                # creation and now.
+                shares = self.rng.random(len(batch))
+                for (sku, purchased, available, created), share in zip(
+                        batch, shares):
+                    yield (sku, company.id, 'R', purchased,
+                           connection.ops.adapt_datetimefield_value(created))
+                    if available != purchased:
+                        adjusted = created + (self.now - created) * share
+                        yield (sku, company.id, 'A', available - purchased,
+                               connection.ops.adapt_datetimefield_value(
+                                   adjusted))
+
+        insert(StockMovement, ['item', 'company', 'kind', 'quantity',
+                               'created_at'], rows())
+        self.log('  stock movements')
+
+    def requests(self, skus, user_ids, count):
+        def rows():
+            for size in self.batches(count):
+                # Cubing a uniform sample favours the first items, so a
+                # few items get most of the requests.
+                items = (self.rng.random(size) ** 3 * len(skus)).astype(int)
+                users = self.rng.choice(user_ids, size)
+                statuses = self.rng.choice(REQUEST_STATUSES, size,
+                                           p=REQUEST_STATUS_WEIGHTS)
+                created = self.datetimes(size)
+                for index in range(size):
+                    yield (skus[items[index]], int(users[index]),
+                           created[index], str(statuses[index]))
+
+        insert(ItemRequest, ['item', 'user', 'created_at', 'status'], rows())
+        self.log('  {0} requests'.format(count))
+
+    def messages(self, user_ids, count):
+        def rows():
+            for size in self.batches(count):
+                senders = self.rng.choice(user_ids, size)
+                if self.system_user:
+                    senders = np.where(self.rng.random(size) < ALERT_SHARE,
+                                       SYSTEM_USER_ID, senders)
+                recipients = self.rng.choice(user_ids, size)
+                read = self.rng.random(size) < READ_SHARE
+                texts = self.sentences(size, 12)
+                sent = self.datetimes(size)
+                for index in range(size):
+                    yield (int(senders[index]), int(recipients[index]),
+                           texts[index], sent[index], bool(read[index]))
+
+        insert(Message, ['from_user', 'to_user', 'text', 'date_sent', 'read'],
+               rows())
+        self.log('  {0} messages'.format(count))
+
+    def rebuild(self, companies):
+        """Refresh the tables that signals would have kept up to date."""
+        self.log('Rebuilding search index, metrics, ledger and stock')
+        search.rebuild()
+        for company in companies:
+            metrics, _ = CompanyMetrics.objects.get_or_create(company=company)
+            metrics.rebuild()
+            stock.take_snapshot(company.id)
+        for year in {self.now.year,
+                     (self.now - datetime.timedelta(days=HISTORY_DAYS)).year}:
+            ledger.rebuild(year, companies)
+
+
+def generate(companies=1, items=1000, requests=10000, messages=1000,
+             employees=None, seed=None, log=None):
+    """Create ``companies`` tenants, each with the given number of items,
+    requests and messages. Returns the companies."""
+    generator = Generator(seed, log)
+    if employees is None:
+        employees = max(10, items // 1000)
+    created = [generator.company(items, requests, messages, employees)
+               for _ in range(companies)]
+    generator.rebuild(created)
+    return created
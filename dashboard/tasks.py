@@ -0,0 +1,136 @@
+"""A small database-backed background task queue.
+
+Functions decorated with ``@task`` can be queued with ``.delay(...)``, which
+stores a ``Task`` row and returns immediately. ``manage.py runworker`` picks
+queued rows up, runs them and retries failures with exponential backoff.
+
+A worker claims a task by moving it to Running with a ``locked_until``
+deadline in a single conditional UPDATE, so several workers can poll the
+same table safely. If a worker dies mid-task, the task becomes claimable
+again once its visibility timeout has passed.
+"""
+import json
+import logging
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import close_old_connections
+from django.db.models import F, Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Task
+
+logger = logging.getLogger(__name__)
+
+registry = {}
+
+
+def task(function=None, max_attempts=5, backoff=30):
+    """Register ``function`` as a background task.
+
+    ``backoff`` is the delay in seconds before the first retry; it doubles
+    on each further attempt.
+    """
+
+    def decorator(function):
+        name = '{0}.{1}'.format(function.__module__, function.__qualname__)
+
+        def delay(*args, **kwargs):
+            return enqueue(name, args, kwargs, max_attempts=max_attempts)
+
+        function.task_name = name
+        function.max_attempts = max_attempts
+        function.backoff = backoff
+        function.delay = delay
+        registry[name] = function
+        return function
+
+    if function is not None:
+        return decorator(function)
+    return decorator
+
+
+def enqueue(name, args=(), kwargs=None, max_attempts=5, run_at=None):
+    return Task.objects.create(
+        name=name,
+        arguments=json.dumps({'args': list(args), 'kwargs': kwargs or {}},
+                             cls=DjangoJSONEncoder),
+        max_attempts=max_attempts,
+        run_at=run_at or timezone.now())
+
+
+def get_task(name):
+    if name not in registry:
+        # Importing the module runs its @task decorators.
+        import_string(name)
+    return registry[name]
+
+
+def claimable(now):
+    return Q(status='Q', run_at__lte=now) | Q(status='R',
+                                              locked_until__lt=now)
+
+
+def claim(visibility_timeout, limit):
+    """Claim up to ``limit`` runnable tasks for this worker."""
+    now = timezone.now()
+    candidates = Task.objects.filter(claimable(now)).order_by(
+        'run_at').values_list('id', flat=True)[:limit]
+    claimed = []
+    for task_id in candidates:
+        updated = Task.objects.filter(claimable(now), id=task_id).update(
+            status='R', attempts=F('attempts') + 1,
+            locked_until=now + timedelta(seconds=visibility_timeout))
+        if updated:
+            claimed.append(task_id)
+    return claimed
+
+
+def execute(task_id):
+    """Run a claimed task and record its outcome."""
+    close_old_connections()
+    try:
+        record = Task.objects.get(id=task_id)
+        try:
+            function = get_task(record.name)
+            arguments = json.loads(record.arguments)
+            function(*arguments['args'], **arguments['kwargs'])
+        except Exception:
+            error = traceback.format_exc()
+            logger.exception('Task %s (%s) failed', record.id, record.name)
+            if record.attempts < record.max_attempts:
+                backoff = getattr(registry.get(record.name), 'backoff', 30)
+                Task.objects.filter(id=task_id).update(
+                    status='Q', locked_until=None, last_error=error,
+                    run_at=timezone.now() + timedelta(
+                        seconds=backoff * 2 ** (record.attempts - 1)))
+            else:
+                Task.objects.filter(id=task_id).update(
+                    status='F', locked_until=None, last_error=error)
+        else:
+            Task.objects.filter(id=task_id).update(status='D',
+                                                   locked_until=None)
+    finally:
+        close_old_connections()
+
+
+def run_worker(concurrency=1, poll_interval=1.0, visibility_timeout=300,
+               once=False):
+    """Poll for tasks and run them on ``concurrency`` threads.
+
+    With ``once`` the worker stops as soon as the queue is empty.
+    """
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        while True:
+            claimed = claim(visibility_timeout, concurrency)
+            if claimed:
+                list(executor.map(execute, claimed))
+            elif once:
+                return
+            else:
+                time.sleep(poll_interval)
+
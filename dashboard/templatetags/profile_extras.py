@@ -1,12 +1,18 @@
 from django import template
+from django.conf import settings
+from django.template.defaultfilters import urlencode
 from django.utils import timezone
+from django.utils.html import format_html, format_html_join
+
+from dashboard import avatars
+from dashboard.roles import has_role
 
 register = template.Library()
 
 
 @register.filter(name='has_group')
 def has_group(user, group_name):
-    return user.groups.filter(name=group_name).exists()
+    return has_role(user, group_name)
 
 
 @register.filter
@@ -23,3 +29,25 @@ def percent_date(value, arg):
 @register.filter
 def count(value):
     return len(value)
+
+
+@register.simple_tag
+def avatar(employee, size, **attributes):
+    """Render an employee's profile picture ``size`` pixels square, from the
+    smallest variant that is large enough, as WebP with a JPEG fallback.
+    The original upload is used until its variants have been made."""
+    attributes.setdefault('alt', '{0} profile picture'.format(
+        employee.user.get_full_name()))
+    attributes.setdefault('width', size)
+    attributes.setdefault('height', size)
+    attributes = format_html_join('', ' {0}="{1}"', sorted(attributes.items()))
+    if not employee.avatar:
+        return format_html('<img src="{0}{1}"{2}>', settings.MEDIA_URL,
+                           urlencode(employee.image), attributes)
+    variant = min([width for width in avatars.SIZES if width >= size],
+                  default=max(avatars.SIZES))
+    return format_html(
+        '<picture><source type="image/webp" srcset="{0}{1}">'
+        '<img src="{0}{2}"{3}></picture>', settings.MEDIA_URL,
+        avatars.variant_name(employee.avatar, variant, 'webp'),
+        avatars.variant_name(employee.avatar, variant, 'jpg'), attributes)
@@ -0,0 +1,86 @@
+"""The company a request acts for, resolved once per user and cached.
+
+``TenantMiddleware`` loads the user's employee record with its location and
+company in one query the first time they are needed, keeps it in the cache
+and attaches it to the request as ``request.tenant``. The employee is also
+set on the user object, so ``request.user.employee.location.company`` no
+longer costs a query per relation. The cached record is dropped whenever
+the employee, its location or its company is saved or deleted.
+"""
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Company, Employee, Location
+
+CACHE_TIMEOUT = 60 * 60
+
+
+def cache_key(user_id):
+    return 'tenant:{0}'.format(user_id)
+
+
+class Tenant:
+    def __init__(self, user, employee):
+        self.user = user
+        self.employee = employee
+        self.location = employee.location
+        self.company = employee.location.company
+
+    @property
+    def company_id(self):
+        return self.location.company_id
+
+
+def get_tenant(user):
+    """Return the ``Tenant`` of ``user``, or ``None`` for anonymous users
+    and users without an employee record."""
+    if not getattr(user, 'is_authenticated', False):
+        return None
+    employee = cache.get(cache_key(user.pk))
+    if employee is None:
+        employee = Employee.objects.select_related(
+            'location__company').filter(user_id=user.pk).first()
+        if employee is None:
+            return None
+        cache.set(cache_key(user.pk), employee, CACHE_TIMEOUT)
+    # Also caches the employee on the user.
+    employee.user = user
+    return Tenant(user, employee)
+
+
+def invalidate(*user_ids):
+    cache.delete_many([cache_key(user_id) for user_id in user_ids])
+
+
+@receiver(post_save, sender=Employee)
+@receiver(post_delete, sender=Employee)
+def invalidate_employee(sender, instance, **kwargs):
+    invalidate(instance.user_id)
+
+
+@receiver(post_save, sender=Location)
+@receiver(post_delete, sender=Location)
+def invalidate_location(sender, instance, **kwargs):
+    invalidate(*Employee.objects.filter(location_id=instance.pk).values_list(
+        'user_id', flat=True))
+
+
+@receiver(post_save, sender=Company)
+def invalidate_company(sender, instance, created, **kwargs):
+    if not created:
+        invalidate(*Employee.objects.filter(
+            location__company_id=instance.pk).values_list(
+            'user_id', flat=True))
+
+
+class TenantMiddleware:
+    """Attach the current user's ``Tenant`` to the request as
+    ``request.tenant``."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.tenant = get_tenant(request.user)
+        return self.get_response(request)
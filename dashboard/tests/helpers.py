@@ -0,0 +1,53 @@
+from contextlib import contextmanager
+
+from django.db import connections
+
+from dashboard import replicas
+from dashboard.querystats import QueryRecorder
+
+
+class QueryBudgetMixin:
+    """Assertions failing a test when code runs more SQL queries than its
+    budget, listing the statements that ran."""
+
+    @contextmanager
+    def assertQueryBudget(self, budget):
+        with QueryRecorder() as recorder:
+            yield recorder
+        if recorder.count > budget:
+            self.fail('{0} queries run, budget is {1}:\n{2}'.format(
+                recorder.count, budget, '\n'.join(
+                    '{0}. {1}'.format(number, sql) for number, (sql, _)
+                    in enumerate(recorder.statements, 1))))
+
+    def assertViewQueryBudget(self, url, budget, method='get', **kwargs):
+        """Request ``url`` with ``self.client`` and check the queries it ran
+        against ``budget``. Returns the response."""
+        with self.assertQueryBudget(budget):
+            response = getattr(self.client, method)(url, **kwargs)
+        return response
+
+
+class ReplicaMixin:
+    """Let a test case call read-only views when a ``replica`` database is
+    configured as a test mirror of ``default``.
+
+    A mirror is a second connection to the test database, which would not
+    see the rows of the test's transaction, so the replica is served by the
+    default connection while the test case runs.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        cls.replica_connection = None
+        if replicas.replica_enabled():
+            cls.databases = set(cls.databases) | {replicas.REPLICA}
+            cls.replica_connection = connections[replicas.REPLICA]
+            connections[replicas.REPLICA] = connections[replicas.PRIMARY]
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        if cls.replica_connection is not None:
+            connections[replicas.REPLICA] = cls.replica_connection
@@ -0,0 +1,231 @@
+import datetime
+import json
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.utils import timezone
+
+from dashboard.models import (ApiToken, CategoryFactory, CompanyMetrics,
+                              Item, ItemFactory, ItemRequest,
+                              LocationFactory, PurchaseOrder, StockMovement,
+                              StockSnapshot, SupplierFactory, UserFactory)
+from dashboard.tests.helpers import QueryBudgetMixin, ReplicaMixin
+
+
+class ApiTests(ReplicaMixin, QueryBudgetMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.company = LocationFactory(id=1).company
+        cls.user = UserFactory()
+        supplier = SupplierFactory(name='Parts', company=cls.company)
+        category = CategoryFactory(company=cls.company)
+        Item.objects.bulk_create([
+            ItemFactory.build(SKU='SKU{0:04}'.format(number),
+                              company=cls.company, price=2,
+                              quantity_available=10, supplier=supplier,
+                              category=category)
+            for number in range(1200)])
+        PurchaseOrder.objects.create(item_id='SKU0001', quantity=5,
+                                     status='Q')
+
+        cls.other_location = LocationFactory()
+        ItemFactory(SKU='GLOBEX', company=cls.other_location.company)
+        cls.token, cls.key = ApiToken.issue(cls.user, 'Scanner')
+
+    def setUp(self):
+        cache.clear()
+        self.client.defaults['HTTP_AUTHORIZATION'] = 'Bearer ' + self.key
+
+    def warm_token(self):
+        self.client.get('/api/v1/suppliers/')
+
+    def post(self, url, data):
+        return self.client.post(url, json.dumps(data),
+                                content_type='application/json')
+
+    def test_token_required(self):
+        del self.client.defaults['HTTP_AUTHORIZATION']
+        response = self.client.get('/api/v1/items/')
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response['WWW-Authenticate'], 'Bearer')
+        response = self.client.get('/api/v1/items/',
+                                   HTTP_AUTHORIZATION='Bearer wrong')
+        self.assertEqual(response.status_code, 401)
+
+    def test_revoked_token(self):
+        self.assertEqual(self.client.get('/api/v1/items/').status_code, 200)
+        ApiToken.objects.get(id=self.token.id).delete()
+        self.assertEqual(self.client.get('/api/v1/items/').status_code, 401)
+
+    def test_deactivated_token(self):
+        self.warm_token()
+        token = ApiToken.objects.get(id=self.token.id)
+        token.is_active = False
+        token.save()
+        self.assertEqual(self.client.get('/api/v1/items/').status_code, 401)
+
+    def test_cached_token(self):
+        self.warm_token()
+        self.assertIsNotNone(ApiToken.objects.get().last_used_at)
+        # Only the page itself is read: no session, user or token queries.
+        with self.assertQueryBudget(1):
+            response = self.client.get('/api/v1/suppliers/')
+        self.assertEqual(response.json()['results'][0]['name'], 'Parts')
+
+    def test_list_pages_and_fields(self):
+        response = self.client.get('/api/v1/items/',
+                                   {'fields': 'sku,quantity_available',
+                                    'limit': 2})
+        data = response.json()
+        self.assertEqual(data['results'], [
+            {'sku': 'SKU0000', 'quantity_available': 10},
+            {'sku': 'SKU0001', 'quantity_available': 10}])
+        self.assertNotIn(b' ', response.content)
+        data = self.client.get('/api/v1/items/', {
+            'fields': 'sku', 'limit': 2, 'after': data['next']}).json()
+        self.assertEqual(data['results'],
+                         [{'sku': 'SKU0002'}, {'sku': 'SKU0003'}])
+        response = self.client.get('/api/v1/items/', {'fields': 'secret'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_company_scoped(self):
+        self.assertEqual(self.client.get('/api/v1/items/GLOBEX/').status_code,
+                         404)
+        data = self.client.get('/api/v1/items/', {
+            'after': 'SKU1199'}).json()
+        self.assertEqual(data, {'results': [], 'next': None})
+
+    def test_lookup(self):
+        skus = ['SKU{0:04}'.format(number) for number in range(999)]
+        self.warm_token()
+        with self.assertQueryBudget(1):
+            response = self.post(
+                '/api/v1/items/lookup/?fields=price',
+                {'skus': skus + ['GLOBEX']})
+        data = response.json()
+        self.assertEqual(len(data['results']), 999)
+        self.assertEqual(data['results'][0], {'sku': 'SKU0000', 'price': 2})
+        self.assertEqual(data['missing'], ['GLOBEX'])
+        response = self.post('/api/v1/items/lookup/',
+                             {'skus': ['SKU'] * 1001})
+        self.assertEqual(response.status_code, 413)
+
+    def test_update_stock(self):
+        CompanyMetrics.for_company(self.company).rebuild()
+        self.warm_token()
+        with self.assertQueryBudget(7):
+            response = self.post('/api/v1/items/stock/', {'updates': [
+                {'sku': 'SKU0000', 'quantity_available': 4},
+                {'sku': 'SKU0001', 'delta': 5},
+                {'sku': 'SKU0001', 'delta': -1}]})
+        self.assertEqual(response.json()['results'], [
+            {'sku': 'SKU0000', 'quantity_available': 4},
+            {'sku': 'SKU0001', 'quantity_available': 14}])
+        self.assertEqual(Item.objects.get(SKU='SKU0001').quantity_available,
+                         14)
+        self.assertEqual(sorted(StockMovement.objects.filter(
+            kind='A').values_list('item_id', 'quantity')),
+            [('SKU0000', -6), ('SKU0001', 4)])
+        metrics = CompanyMetrics.objects.get(company=self.company)
+        self.assertEqual(metrics.quantity_available, 12000 - 6 + 4)
+        self.assertEqual(metrics.inventory_value, 2 * (12000 - 2))
+
+    def test_update_stock_is_all_or_nothing(self):
+        response = self.post('/api/v1/items/stock/', {'updates': [
+            {'sku': 'SKU0000', 'delta': 1},
+            {'sku': 'SKU0001', 'delta': -11},
+            {'sku': 'GLOBEX', 'quantity_available': 1},
+            {'sku': 'SKU0002', 'delta': 1, 'quantity_available': 1}]})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['errors'], [
+            {'index': 3, 'error': 'Give a whole quantity_available or '
+                                  'delta.'}])
+        response = self.post('/api/v1/items/stock/', {'updates': [
+            {'sku': 'SKU0000', 'delta': 1},
+            {'sku': 'SKU0001', 'delta': -11},
+            {'sku': 'GLOBEX', 'quantity_available': 1}]})
+        self.assertEqual(response.json()['errors'], [
+            {'index': 1, 'error': 'Stock cannot go below zero.'},
+            {'index': 2, 'error': 'Unknown SKU.'}])
+        self.assertEqual(Item.objects.get(SKU='SKU0000').quantity_available,
+                         10)
+
+    def test_entry_types(self):
+        response = self.post('/api/v1/items/stock/', {'updates': [
+            {'sku': ['SKU0000'], 'delta': 1}, {'sku': 'SKU0001', 'delta': 1}]})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['errors'], [
+            {'index': 0, 'error': 'sku must be a string.'}])
+        response = self.post('/api/v1/requests/', {'requests': [
+            {'sku': 'SKU0000', 'user': {}}, {'sku': 1},
+            {'sku': 'SKU0000', 'user': True},
+            {'sku': 'SKU0000', 'user': self.user.id}]})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['errors'], [
+            {'index': 0, 'error': 'user must be a whole number.'},
+            {'index': 1, 'error': 'sku must be a string.'},
+            {'index': 2, 'error': 'user must be a whole number.'}])
+        self.assertFalse(ItemRequest.objects.exists())
+
+    def test_create_requests(self):
+        CompanyMetrics.for_company(self.company)
+        colleague = UserFactory()
+        outsider = UserFactory()
+        outsider.employee.location = self.other_location
+        outsider.employee.save()
+        response = self.post('/api/v1/requests/', {'requests': [
+            {'sku': 'SKU0000'}, {'sku': 'GLOBEX'},
+            {'sku': 'SKU0001', 'user': outsider.id}]})
+        self.assertEqual(response.json()['errors'], [
+            {'index': 1, 'error': 'Unknown SKU.'},
+            {'index': 2, 'error': 'Unknown user.'}])
+        entries = [{'sku': 'SKU{0:04}'.format(number)}
+                   for number in range(500)]
+        entries[0]['user'] = colleague.id
+        # SQLite splits the insert in three.
+        with self.assertQueryBudget(9):
+            response = self.post('/api/v1/requests/', {'requests': entries})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json(), {'created': 500})
+        self.assertEqual(ItemRequest.objects.filter(
+            user=self.user, status='P').count(), 499)
+        metrics = CompanyMetrics.objects.get(company=self.company)
+        self.assertEqual(metrics.pending_count, 500)
+
+        data = self.client.get('/api/v1/requests/', {
+            'sku': 'SKU0000', 'fields': 'sku,user,status'}).json()
+        self.assertEqual(data['results'], [
+            {'sku': 'SKU0000', 'user': colleague.id, 'status': 'P'}])
+
+    def test_purchase_orders(self):
+        order = PurchaseOrder.objects.get()
+        data = self.client.get('/api/v1/purchase-orders/',
+                               {'status': 'Q'}).json()
+        self.assertEqual(data['results'][0]['sku'], 'SKU0001')
+        data = self.client.get('/api/v1/purchase-orders/{0}/'.format(
+            order.id), {'fields': 'quantity'}).json()
+        self.assertEqual(data, {'quantity': 5})
+        response = self.client.post('/api/v1/purchase-orders/')
+        self.assertEqual(response.status_code, 405)
+
+    def test_stock_levels(self):
+        # The opening balance of the bulk created items.
+        StockSnapshot.objects.create(
+            item_id='SKU0000', company=self.company, quantity=10,
+            taken_at=timezone.make_aware(datetime.datetime(2021, 1, 1)))
+        self.post('/api/v1/items/stock/', {'updates': [
+            {'sku': 'SKU0000', 'quantity_available': 4}]})
+        for at, quantity in [('', 4), ('2021-06-01', 10),
+                             ('2020-01-01T12:00:00', 0)]:
+            with self.subTest(at=at):
+                data = self.client.get('/api/v1/stock/', {
+                    'sku': 'SKU0000', 'at': at}).json()
+                self.assertEqual(data['results'],
+                                 [{'sku': 'SKU0000', 'quantity': quantity}])
+        data = self.client.get('/api/v1/stock/', {'at': '2021-06-01'}).json()
+        self.assertEqual(data['results'],
+                         [{'sku': 'SKU0000', 'quantity': 10}])
+        self.assertEqual(self.client.get('/api/v1/stock/', {
+            'sku': 'GLOBEX'}).status_code, 404)
+        self.assertEqual(self.client.get('/api/v1/stock/', {
+            'at': 'yesterday'}).status_code, 400)
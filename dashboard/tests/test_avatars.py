@@ -0,0 +1,88 @@
+import io
+import shutil
+import tempfile
+from unittest import mock
+
+from django.core.files.base import ContentFile
+from django.template import Context, Template
+from django.test import TestCase, override_settings
+from PIL import Image
+
+from dashboard import avatars
+from dashboard.models import LocationFactory, UserFactory
+
+
+def png(color, size=(600, 400), mode='RGB'):
+    output = io.BytesIO()
+    Image.new(mode, size, color).save(output, 'PNG')
+    return output.getvalue()
+
+
+class AvatarTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        LocationFactory(id=1)
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings = override_settings(
+            DEFAULT_FILE_STORAGE='django.core.files.storage.FileSystemStorage',
+            MEDIA_ROOT=media_root, MEDIA_URL='/media/')
+        settings.enable()
+        self.addCleanup(settings.disable)
+        avatars.storage.cache_clear()
+        self.addCleanup(avatars.storage.cache_clear)
+
+    def upload(self, data):
+        employee = UserFactory().employee
+        employee.image.save('upload.png', ContentFile(data))
+        avatars.process_avatar(employee.id)
+        employee.refresh_from_db()
+        return employee
+
+    def test_variants(self):
+        employee = self.upload(png('red', mode='RGBA'))
+        self.assertEqual(len(employee.avatar), 64)
+        for size in avatars.SIZES:
+            for extension, image_format, _ in avatars.FORMATS:
+                name = avatars.variant_name(employee.avatar, size, extension)
+                with avatars.storage().open(name) as file:
+                    image = Image.open(file)
+                    self.assertEqual(image.format, image_format)
+                    self.assertEqual(image.size, (size, size))
+
+    def test_identical_uploads_share_variants(self):
+        first = self.upload(png('blue'))
+        with mock.patch.object(avatars, 'thumbnails') as thumbnails:
+            second = self.upload(png('blue'))
+        thumbnails.assert_not_called()
+        self.assertEqual(first.avatar, second.avatar)
+
+    def test_replaced_variants_are_deleted_when_unused(self):
+        employee = self.upload(png('green'))
+        shared = self.upload(png('yellow'))
+        old = employee.avatar
+        employee.image.save('upload.png', ContentFile(png('yellow')))
+        avatars.process_avatar(employee.id)
+        for name in avatars.variant_names(old):
+            self.assertFalse(avatars.storage().exists(name))
+        for name in avatars.variant_names(shared.avatar):
+            self.assertTrue(avatars.storage().exists(name))
+
+    def test_template_tag(self):
+        template = Template('{% load profile_extras %}'
+                            '{% avatar employee 30 class="rounded-circle" %}')
+        employee = UserFactory().employee
+        employee.image.save('upload.png', ContentFile(png('black')))
+        html = template.render(Context({'employee': employee}))
+        self.assertIn('src="/media/{0}"'.format(employee.image.name), html)
+        self.assertNotIn('<picture>', html)
+        avatars.process_avatar(employee.id)
+        employee.refresh_from_db()
+        html = template.render(Context({'employee': employee}))
+        self.assertIn('srcset="/media/avatars/{0}/64.webp"'.format(
+            employee.avatar), html)
+        self.assertIn('src="/media/avatars/{0}/64.jpg"'.format(
+            employee.avatar), html)
+        self.assertIn('width="30"', html)
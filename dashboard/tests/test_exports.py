@@ -0,0 +1,72 @@
+import json
+
+from django.contrib.auth.models import Group
+from django.test import TestCase
+
+from dashboard.exports import export_response, iterate_in_batches
+from dashboard.models import (Item, ItemFactory, ItemRequest,
+                              LocationFactory, SupplierFactory, UserFactory)
+from dashboard.querystats import QueryRecorder
+from dashboard.tests.helpers import ReplicaMixin
+
+
+class ExportTests(ReplicaMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.company = LocationFactory(id=1).company
+        supplier = SupplierFactory(name='Dell', company=cls.company)
+        for number in range(5):
+            ItemFactory(SKU='LAP{0:03}'.format(number), company=cls.company,
+                        description='Laptop, {0}'.format(number),
+                        price=number, supplier=supplier)
+        ItemFactory(SKU='GLOBEX')
+        cls.user = UserFactory()
+        cls.user.groups.add(Group.objects.create(name='Company Admins'))
+        ItemRequest.objects.create(item_id='LAP001', user=cls.user,
+                                   status='P')
+        ItemRequest.objects.create(item_id='LAP002', user=cls.user,
+                                   status='F')
+
+    def test_keyset_batches(self):
+        items = Item.objects.filter(company=self.company)
+        for batch_size, queries in [(2, 3), (5, 2), (10, 1)]:
+            with self.subTest(batch_size=batch_size):
+                with QueryRecorder() as recorder:
+                    rows = list(iterate_in_batches(
+                        items.order_by('-price'), ['SKU'], batch_size))
+                # Rows come in primary key order whatever the queryset's.
+                self.assertEqual(rows, [('LAP{0:03}'.format(number),)
+                                        for number in range(5)])
+                self.assertEqual(recorder.count, queries)
+
+    def test_csv(self):
+        response = export_response(
+            Item.objects.filter(SKU__in=['LAP000', 'LAP001']),
+            [('sku', 'SKU'), ('description', 'description'),
+             ('supplier', 'supplier__name')], 'items')
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        self.assertEqual(response['Content-Disposition'],
+                         'attachment; filename="items.csv"')
+        self.assertEqual(b''.join(response.streaming_content).decode(),
+                         'sku,description,supplier\r\n'
+                         'LAP000,"Laptop, 0",Dell\r\n'
+                         'LAP001,"Laptop, 1",Dell\r\n')
+
+    def test_ndjson(self):
+        response = export_response(Item.objects.filter(SKU='LAP003'),
+                                   [('sku', 'SKU'), ('price', 'price')],
+                                   'items', 'ndjson')
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual([json.loads(line) for line in lines],
+                         [{'sku': 'LAP003', 'price': 3}])
+
+    def test_views_are_company_scoped(self):
+        self.client.force_login(self.user)
+        response = self.client.get('/items/export/', {'format': 'ndjson'})
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual([json.loads(line)['SKU'] for line in lines],
+                         ['LAP{0:03}'.format(number) for number in range(5)])
+        response = self.client.get('/requests/export/', {'status': 'P'})
+        self.assertEqual(len(b''.join(
+            response.streaming_content).decode().splitlines()), 2)
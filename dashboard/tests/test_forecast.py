@@ -0,0 +1,70 @@
+import datetime
+
+from django.test import TestCase
+
+from dashboard import forecast
+from dashboard.models import (CompanyFactory, DemandForecast, Item,
+                              ItemFactory, ItemRequest, LocationFactory,
+                              UserFactory)
+
+DAY = datetime.date(2026, 3, 1)
+
+
+class ForecastTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.company = LocationFactory(id=1).company
+        for sku in ['USED', 'UNUSED']:
+            ItemFactory(SKU=sku, company=cls.company, average_daily_usage=3,
+                        maximum_daily_usage=9)
+        cls.user = UserFactory()
+        cls.request('USED', DAY, 5)
+        cls.request('USED', DAY, 2, status='C')
+        cls.request('USED', DAY + datetime.timedelta(days=2), 1)
+
+    @classmethod
+    def request(cls, sku, day, count, status='F'):
+        requests = [ItemRequest.objects.create(item_id=sku, user=cls.user,
+                                               status=status)
+                    for _ in range(count)]
+        ItemRequest.objects.filter(
+            id__in=[item_request.id for item_request in requests]).update(
+            created_at=forecast.midnight(day) + datetime.timedelta(hours=9))
+
+    def usage(self):
+        return dict((sku, (average, maximum)) for sku, average, maximum in
+                    Item.objects.values_list('SKU', 'average_daily_usage',
+                                             'maximum_daily_usage'))
+
+    def test_forecast(self):
+        # Days 1 and 2 only: 5 then 0 requests, the cancelled ones and
+        # today's are not counted.
+        self.assertEqual(forecast.run(
+            self.company, today=DAY + datetime.timedelta(days=2)), 1)
+        state = DemandForecast.objects.get(item_id='USED')
+        self.assertAlmostEqual(state.level, 0.8)
+        self.assertAlmostEqual(state.variance, 3.36)
+        # Level 0.8 plus two standard deviations of 1.83, rounded up.
+        self.assertEqual(self.usage(), {'USED': (1, 5), 'UNUSED': (3, 9)})
+        self.assertFalse(DemandForecast.objects.filter(
+            item_id='UNUSED').exists())
+
+    def test_continues_from_previous_run(self):
+        forecast.run(self.company, today=DAY + datetime.timedelta(days=2))
+        self.assertEqual(forecast.run(
+            self.company, today=DAY + datetime.timedelta(days=2)), 0)
+        forecast.run(self.company, today=DAY + datetime.timedelta(days=5))
+        continued = DemandForecast.objects.get(item_id='USED')
+        forecast.run(self.company, full=True,
+                     today=DAY + datetime.timedelta(days=5))
+        full = DemandForecast.objects.get(item_id='USED')
+        self.assertAlmostEqual(continued.level, full.level)
+        self.assertAlmostEqual(continued.variance, full.variance)
+        self.assertEqual(full.updated_through,
+                         DAY + datetime.timedelta(days=5))
+
+    def test_no_requests(self):
+        self.assertEqual(forecast.run(CompanyFactory()), 0)
+        ItemRequest.objects.all().delete()
+        self.assertEqual(forecast.run(self.company, today=DAY), 0)
+        self.assertEqual(self.usage(), {'USED': (3, 9), 'UNUSED': (3, 9)})
@@ -0,0 +1,144 @@
+import io
+from unittest import mock
+
+from django.contrib.auth.models import Group
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import IntegrityError
+from django.test import TestCase
+
+from dashboard import search
+from dashboard.importer import ItemImporter, read_rows
+from dashboard.models import (CategoryFactory, CompanyMetrics, Item,
+                              ItemFactory, ItemLog, ItemSearchIndex,
+                              LocationFactory, StockMovement, SupplierFactory,
+                              UserFactory)
+
+HEADER = 'SKU,Description,Price,Quantity,Supplier,Category,Returnable\n'
+
+
+class ItemImporterTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.company = LocationFactory(id=1).company
+        cls.supplier = SupplierFactory(name='Dell', company=cls.company)
+        cls.category = CategoryFactory(name='Laptops', company=cls.company)
+        # Another company with suppliers and categories of the same names.
+        ItemFactory(SKU='GLOBEX', description='Theirs', quantity_available=0,
+                    supplier__name='Dell', category__name='Laptops')
+
+    def run_import(self, lines, chunk_size=1000):
+        rows = read_rows(io.StringIO(HEADER + ''.join(lines)), 'items.csv')
+        return ItemImporter(self.company, chunk_size=chunk_size).run(rows)
+
+    def test_missing_columns(self):
+        with self.assertRaisesMessage(ValueError,
+                                      'Missing columns: supplier, category'):
+            list(read_rows(io.StringIO('SKU,Description,Price,Quantity\n'),
+                           'items.csv'))
+
+    def test_row_errors(self):
+        result = self.run_import([
+            'LAP001,Laptop,1000,5,Dell,Laptops,yes\n',
+            ',No SKU,1,1,Dell,Laptops,\n',
+            '\n',
+            'LAP002,Laptop,cheap,1,Dell,Laptops,\n',
+            'LAP003,Laptop,10,-1,Dell,Laptops,\n',
+            'LAP004,Laptop,10,1,HP,Laptops,\n'])
+        self.assertEqual(result.created, 1)
+        # Row numbers count the header and the skipped blank row.
+        self.assertEqual(result.errors, [
+            (3, 'SKU is required'),
+            (5, 'price must be a number, got "cheap"'),
+            (6, 'quantity cannot be negative'),
+            (7, 'Unknown supplier "HP"')])
+        item = Item.objects.get(SKU='LAP001')
+        self.assertTrue(item.is_returnable)
+        self.assertEqual(item.quantity_available, 5)
+
+    def test_numbers(self):
+        result = self.run_import([
+            'LAP001,Laptop,12.0,3,Dell,Laptops,\n',
+            'LAP002,Laptop,1e400,1,Dell,Laptops,\n',
+            'LAP003,Laptop,10,99999999999,Dell,Laptops,\n',
+            'LAP004,Laptop,inf,1,Dell,Laptops,\n'])
+        self.assertEqual(result.errors, [
+            (3, 'price cannot be more than 2147483647'),
+            (4, 'quantity cannot be more than 2147483647'),
+            (5, 'price must be a number, got "inf"')])
+        self.assertEqual(Item.objects.get(SKU='LAP001').price, 12)
+        result = self.run_import(['LAP001,Laptop,12,2147483647,Dell,'
+                                  'Laptops,\n'])
+        self.assertEqual(result.errors,
+                         [(2, 'quantity of SKU LAP001 is too large')])
+
+    def test_corrupt_workbook(self):
+        with self.assertRaisesMessage(
+                ValueError, 'The file is not a valid XLSX workbook'):
+            list(read_rows(io.BytesIO(b'not a workbook'), 'items.xlsx'))
+        user = UserFactory()
+        user.groups.add(Group.objects.create(name='Company Admins'))
+        self.client.force_login(user)
+        upload = SimpleUploadedFile('items.xlsx', b'not a workbook')
+        response = self.client.post('/items/import/', {'items_file': upload})
+        self.assertContains(response, 'The file is not a valid XLSX workbook')
+
+    def test_chunk_boundaries(self):
+        result = self.run_import([
+            'LAP{0:03},Laptop,10,2,Dell,Laptops,\n'.format(number)
+            for number in range(5)], chunk_size=2)
+        self.assertEqual(str(result), '5 created, 0 updated, 0 errors')
+        self.assertEqual(Item.objects.filter(company=self.company).count(), 5)
+        self.assertEqual(ItemSearchIndex.objects.filter(
+            company=self.company).count(), 5)
+        metrics = CompanyMetrics.objects.get(company=self.company)
+        self.assertEqual(metrics.items_count, 5)
+        self.assertEqual(metrics.quantity_available, 10)
+        self.assertEqual(metrics.inventory_value, 100)
+
+    def test_failed_chunk_keeps_earlier_chunks(self):
+        with mock.patch.object(search, 'index_items',
+                               side_effect=[None, IntegrityError]):
+            with self.assertRaises(IntegrityError):
+                self.run_import([
+                    'LAP{0:03},Laptop,10,2,Dell,Laptops,\n'.format(number)
+                    for number in range(4)], chunk_size=2)
+        self.assertEqual(Item.objects.filter(company=self.company).count(), 2)
+        self.assertEqual(sum(ItemLog.objects.filter(
+            company=self.company).values_list('inventory_value', flat=True)),
+            40)
+        self.assertEqual(CompanyMetrics.objects.get(
+            company=self.company).quantity_available, 4)
+
+    def test_existing_sku_receives_stock(self):
+        self.run_import(['LAP001,Laptop,10,2,Dell,Laptops,\n'])
+        result = self.run_import(['LAP001,Laptop 2,10,3,Dell,Laptops,\n'])
+        self.assertEqual(str(result), '0 created, 1 updated, 0 errors')
+        item = Item.objects.get(SKU='LAP001')
+        self.assertEqual(item.description, 'Laptop 2')
+        self.assertEqual((item.quantity_purchased, item.quantity_available),
+                         (5, 5))
+        self.assertEqual(list(StockMovement.objects.filter(
+            item=item).values_list('kind', 'quantity')),
+            [('R', 2), ('R', 3)])
+        self.assertEqual(CompanyMetrics.objects.get(
+            company=self.company).quantity_available, 5)
+
+    def test_duplicate_sku(self):
+        result = self.run_import([
+            'LAP001,Laptop,10,2,Dell,Laptops,\n',
+            'LAP001,Laptop,10,4,Dell,Laptops,\n',
+            'LAP002,Laptop,10,1,Dell,Laptops,\n',
+            'LAP001,Laptop,10,1,Dell,Laptops,\n'], chunk_size=3)
+        self.assertEqual(result.errors, [(3, 'Duplicate SKU LAP001')])
+        # A repeat in a later chunk is stock received for a known SKU.
+        self.assertEqual(str(result), '2 created, 1 updated, 1 errors')
+        self.assertEqual(Item.objects.get(SKU='LAP001').quantity_available,
+                         3)
+
+    def test_foreign_sku(self):
+        result = self.run_import(['GLOBEX,Mine,5,5,Dell,Laptops,\n'])
+        self.assertEqual(result.errors,
+                         [(2, 'SKU GLOBEX belongs to another company')])
+        item = Item.objects.get(SKU='GLOBEX')
+        self.assertEqual((item.description, item.quantity_available),
+                         ('Theirs', 0))
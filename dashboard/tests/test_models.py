@@ -0,0 +1,345 @@
+from datetime import datetime, timedelta
+from unittest import mock
+
+from django.test import TestCase
+from django.utils import timezone
+
+from dashboard import ledger, notifications, stock, synthetic
+from dashboard.models import (CompanyMetrics, Employee, Item, ItemLog,
+                              ItemRequest, ItemReturn, ItemSearchIndex,
+                              Location, Message, StockMovement,
+                              StockSnapshot, UnreadCounter,
+                              CompanyFactory, EmployeeFactory, ItemFactory,
+                              ItemRequestFactory, LocationFactory,
+                              MessageFactory, UserFactory)
+
+
+class FactoryTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.location = LocationFactory(id=1)
+
+    def test_item_factory_uses_one_company(self):
+        item = ItemFactory()
+        self.assertEqual(item.supplier.company, item.company)
+        self.assertEqual(item.category.company, item.company)
+
+    def test_item_request_factory(self):
+        item_request = ItemRequestFactory()
+        self.assertTrue(ItemRequest.objects.filter(
+            id=item_request.id, item=item_request.item).exists())
+
+    def test_employee_factory_updates_employee_of_user(self):
+        location = LocationFactory()
+        employee = EmployeeFactory(location=location)
+        self.assertEqual(employee.location, location)
+        self.assertEqual(Employee.objects.filter(
+            user=employee.user).count(), 1)
+
+
+class SyntheticDataTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        LocationFactory(id=1)
+        cls.company, = synthetic.generate(items=50, requests=300,
+                                          messages=40, employees=5, seed=1)
+
+    def test_counts(self):
+        self.assertEqual(Item.objects.filter(
+            company=self.company).count(), 50)
+        self.assertEqual(ItemRequest.objects.filter(
+            item__company=self.company).count(), 300)
+        self.assertEqual(Employee.objects.filter(
+            location__company=self.company).count(), 5)
+        self.assertEqual(Message.objects.filter(
+            to_user__employee__location__company=self.company).count(), 40)
+        self.assertEqual(Location.objects.filter(
+            company=self.company).count(), synthetic.LOCATIONS)
+
+    def test_derived_tables_rebuilt(self):
+        self.assertEqual(ItemSearchIndex.objects.filter(
+            company=self.company).count(), 50)
+        metrics = CompanyMetrics.objects.get(company=self.company)
+        self.assertEqual(metrics.items_count, 50)
+        self.assertEqual(metrics.requests_count, 300)
+
+    def test_stock_history(self):
+        items = Item.objects.filter(company=self.company)
+        self.assertEqual(stock.stock_on(self.company.id, timezone.now()), {
+            sku: available for sku, available in items.values_list(
+                'SKU', 'quantity_available') if available})
+        self.assertTrue(StockSnapshot.objects.filter(
+            company=self.company).exists())
+        item = items.first()
+        self.assertEqual(stock.stock_at(
+            item.SKU, item.created_at - timedelta(seconds=1)), 0)
+        self.assertEqual(stock.stock_at(item.SKU, item.created_at),
+                         item.quantity_purchased)
+
+    def test_first_change_builds_metrics(self):
+        CompanyMetrics.objects.filter(company=self.company).delete()
+        item = Item.objects.filter(company=self.company).first()
+        item.quantity_available += 1
+        item.save()
+        metrics = CompanyMetrics.objects.get(company=self.company)
+        self.assertEqual(metrics.items_count, 50)
+        self.assertEqual(metrics.requests_count, 300)
+        self.assertEqual(metrics.quantity_available, sum(
+            Item.objects.filter(company=self.company).values_list(
+                'quantity_available', flat=True)))
+
+
+class CompanyMetricsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.company = LocationFactory(id=1).company
+        cls.item = ItemFactory(company=cls.company, price=10,
+                               quantity_purchased=5, quantity_available=5)
+        cls.other_item = ItemFactory(company=cls.company, price=3,
+                                     quantity_purchased=2,
+                                     quantity_available=2)
+        cls.requests = [ItemRequestFactory(item=cls.item, status='P')
+                        for _ in range(3)]
+
+    def assertMetrics(self, **expected):
+        metrics = CompanyMetrics.objects.get(company=self.company)
+        figures = {field: getattr(metrics, field) for field in expected}
+        self.assertEqual(figures, expected)
+        # The counters kept so far match a count of the source tables.
+        metrics.rebuild()
+        self.assertEqual({field: getattr(metrics, field)
+                          for field in expected}, figures)
+
+    def test_request_status_change(self):
+        item_request = ItemRequest.objects.get(id=self.requests[0].id)
+        item_request.status = 'C'
+        item_request.save()
+        self.assertMetrics(requests_count=3, pending_count=2,
+                           fulfilled_count=0)
+        item_request.delete()
+        self.assertMetrics(requests_count=2, pending_count=2)
+
+    def test_item_delete(self):
+        Item.objects.get(SKU=self.other_item.SKU).delete()
+        self.assertMetrics(items_count=1, inventory_value=50,
+                           quantity_purchased=5, quantity_available=5)
+
+    def test_fulfilment(self):
+        Item.objects.filter(SKU=self.item.SKU).update(quantity_available=2)
+        CompanyMetrics.objects.get(company=self.company).rebuild()
+        stock.fulfil_requests([request.id for request in self.requests],
+                              self.company)
+        self.assertMetrics(inventory_value=6, quantity_available=2,
+                           pending_count=0, fulfilled_count=2,
+                           stockout_count=1, requests_count=3)
+
+
+class InventoryLedgerTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.company_id = LocationFactory(id=1).company_id
+
+    def value(self):
+        return sum(ItemLog.objects.filter(
+            company_id=self.company_id).values_list('inventory_value',
+                                                    flat=True))
+
+    def test_buffered_flushes_once(self):
+        with ledger.buffered():
+            with ledger.buffered():
+                ledger.record(self.company_id, 5)
+            ledger.record(self.company_id, 7)
+            self.assertEqual(self.value(), 0)
+        self.assertEqual(self.value(), 12)
+
+    def test_failed_block_discards_deltas(self):
+        with self.assertRaises(ValueError):
+            with ledger.buffered():
+                ledger.record(self.company_id, 5)
+                raise ValueError
+        ledger.record(self.company_id, 7)
+        self.assertEqual(self.value(), 7)
+
+    def test_rebuild(self):
+        created_at = timezone.make_aware(datetime(2025, 3, 10))
+        item = ItemFactory(company_id=self.company_id, price=10,
+                           quantity_purchased=2, created_at=created_at)
+        item.price = 20
+        item.save()
+        ItemLog.objects.create(company_id=self.company_id, year=2025,
+                               month='Jan', inventory_value=99)
+        self.assertEqual(ledger.rebuild(2025), 1)
+        self.assertEqual(list(ItemLog.objects.filter(
+            company_id=self.company_id, year=2025).values_list(
+            'month', 'inventory_value')), [('Mar', 40)])
+
+    def test_rebuild_skips_undated_items(self):
+        ItemFactory(company_id=self.company_id, created_at=None)
+        log = ItemLog.objects.create(company_id=self.company_id, year=2025,
+                                     month='Jan', inventory_value=99)
+        self.assertEqual(ledger.rebuild(2025), 0)
+        self.assertTrue(ItemLog.objects.filter(
+            id=log.id, inventory_value=99).exists())
+
+
+class UnreadCounterTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        LocationFactory(id=1)
+        cls.system = UserFactory(id=notifications.SYSTEM_USER_ID)
+        cls.sender = UserFactory()
+        cls.user = UserFactory()
+
+    def counter(self):
+        return UnreadCounter.for_user(self.user.pk)
+
+    def test_counts_follow_messages(self):
+        message = MessageFactory(from_user=self.sender, to_user=self.user)
+        alert = MessageFactory(from_user=self.system, to_user=self.user)
+        counter = self.counter()
+        self.assertEqual((counter.messages, counter.alerts), (1, 1))
+        self.assertEqual(counter.last_message_id, alert.id)
+        message.read = True
+        message.save()
+        Message.objects.get(pk=alert.pk).delete()
+        counter = self.counter()
+        self.assertEqual((counter.messages, counter.alerts), (0, 0))
+        self.assertEqual(counter.last_message_id, alert.id)
+
+    def test_mark_read_once(self):
+        message = MessageFactory(from_user=self.sender, to_user=self.user)
+        self.assertTrue(notifications.mark_read(message))
+        self.assertFalse(notifications.mark_read(
+            Message.objects.get(pk=message.pk)))
+        self.assertEqual(self.counter().messages, 0)
+
+    def test_missing_counter_is_counted_from_inbox(self):
+        MessageFactory.create_batch(2, from_user=self.sender,
+                                    to_user=self.user)
+        UnreadCounter.objects.filter(user=self.user).delete()
+        MessageFactory(from_user=self.system, to_user=self.user)
+        counter = self.counter()
+        self.assertEqual((counter.messages, counter.alerts), (2, 1))
+
+
+class StockLedgerTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        LocationFactory(id=1)
+        cls.item = ItemFactory(quantity_purchased=10, quantity_available=10,
+                               is_returnable=True)
+        cls.company_id = cls.item.company_id
+
+    def day(self, number):
+        return timezone.make_aware(datetime(2026, 1, number, 12))
+
+    def move(self, day, quantity):
+        """Adjust the stock as if it happened on ``day``."""
+        item = Item.objects.get(SKU=self.item.SKU)
+        item.quantity_available += quantity
+        item.save()
+        StockMovement.objects.filter(id=StockMovement.objects.latest(
+            'id').id).update(created_at=self.day(day))
+
+    def test_movements_follow_stock(self):
+        requests = ItemRequestFactory.create_batch(3, item=self.item,
+                                                   status='P')
+        stock.fulfil_requests([item_request.id for item_request in requests])
+        stock.return_item(ItemReturn.objects.get(request=requests[0]).id)
+        item = Item.objects.get(SKU=self.item.SKU)
+        item.quantity_available = 20
+        item.save()
+        movements = list(StockMovement.objects.filter(
+            item=self.item).order_by('id').values_list(
+            'kind', 'quantity', 'item_request_id'))
+        self.assertEqual(movements, [
+            ('R', 10, None),
+            ('I', -1, requests[0].id),
+            ('I', -1, requests[1].id),
+            ('I', -1, requests[2].id),
+            ('RT', 1, requests[0].id),
+            ('A', 12, None)])
+        item = Item.objects.get(SKU=self.item.SKU)
+        self.assertEqual(sum(movement[1] for movement in movements),
+                         item.quantity_available)
+
+    def test_stock_at(self):
+        StockMovement.objects.update(created_at=self.day(1))
+        self.move(3, -3)
+        self.assertEqual(stock.take_snapshot(
+            self.company_id, now=self.day(4) + stock.SNAPSHOT_LAG), 1)
+        self.move(5, 5)
+        self.assertEqual(stock.stock_at(self.item.SKU, self.day(2)), 10)
+        # Movements before the snapshot are not read after it.
+        StockMovement.objects.filter(created_at__lt=self.day(4)).delete()
+        expected = [(self.day(2), 0), (self.day(4), 7), (self.day(5), 12),
+                    (self.day(6), 12)]
+        for when, quantity in expected:
+            with self.subTest(when=when):
+                self.assertEqual(stock.stock_at(self.item.SKU, when),
+                                 quantity)
+                self.assertEqual(
+                    stock.stock_on(self.company_id, when).get(
+                        self.item.SKU, 0), quantity)
+        with self.assertNumQueries(2):
+            stock.stock_at(self.item.SKU, self.day(6))
+        with self.assertNumQueries(3):
+            stock.stock_on(self.company_id, self.day(6))
+
+    def test_snapshot_keeps_items_that_ran_out(self):
+        StockMovement.objects.update(created_at=self.day(1))
+        self.move(2, -10)
+        now = self.day(3) + stock.SNAPSHOT_LAG
+        self.assertEqual(stock.take_snapshot(self.company_id, now=now), 1)
+        self.assertEqual(StockSnapshot.objects.get().quantity, 0)
+        # Nothing moved since.
+        self.assertEqual(stock.take_snapshot(
+            self.company_id, now=now + timedelta(days=1)), 0)
+        self.assertEqual(stock.stock_on(self.company_id, self.day(4)), {})
+
+
+class FulfilmentTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        LocationFactory(id=1)
+        cls.item = ItemFactory(quantity_purchased=2, quantity_available=2,
+                               is_returnable=True)
+
+    def test_oldest_requests_served_while_stock_lasts(self):
+        requests = ItemRequestFactory.create_batch(3, item=self.item,
+                                                   status='P')
+        fulfilled, stocked_out = stock.fulfil_requests(
+            [item_request.id for item_request in reversed(requests)])
+        self.assertEqual(fulfilled, [requests[0].id, requests[1].id])
+        self.assertEqual(stocked_out, [requests[2].id])
+        self.assertEqual(Item.objects.get(SKU=self.item.SKU)
+                         .quantity_available, 0)
+        self.assertEqual(ItemReturn.objects.filter(
+            request__item=self.item).count(), 2)
+        self.assertEqual(stock.fulfil_requests([requests[0].id]), ([], []))
+
+    def test_stock_taken_meanwhile_leaves_requests_pending(self):
+        requests = ItemRequestFactory.create_batch(2, item=self.item,
+                                                   status='P')
+        stale = Item.objects.get(SKU=self.item.SKU)
+        Item.objects.filter(SKU=self.item.SKU).update(quantity_available=1)
+        with mock.patch.object(Item.objects, 'select_for_update') as select:
+            select.return_value.filter.return_value.order_by.return_value = [
+                stale]
+            self.assertEqual(stock.fulfil_requests(
+                [item_request.id for item_request in requests]), ([], []))
+        self.assertEqual(set(ItemRequest.objects.filter(
+            item=self.item).values_list('status', flat=True)), {'P'})
+        self.assertEqual(Item.objects.get(SKU=self.item.SKU)
+                         .quantity_available, 1)
+        self.assertFalse(StockMovement.objects.filter(kind='I').exists())
+
+    def test_return_is_company_scoped(self):
+        item_request = ItemRequestFactory(item=self.item, status='P')
+        stock.fulfil_requests([item_request.id])
+        item_return = ItemReturn.objects.get(request=item_request)
+        self.assertFalse(stock.return_item(item_return.id, CompanyFactory()))
+        self.assertTrue(stock.return_item(item_return.id, self.item.company))
+        self.assertFalse(stock.return_item(item_return.id, self.item.company))
+        self.assertEqual(Item.objects.get(SKU=self.item.SKU)
+                         .quantity_available, 2)
@@ -0,0 +1,106 @@
+from datetime import timedelta
+from smtplib import SMTPRecipientsRefused
+
+from django.core import mail
+from django.core.mail.backends.locmem import EmailBackend
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from dashboard import outbox
+from dashboard.models import OutgoingEmail
+
+LOCMEM = 'django.core.mail.backends.locmem.EmailBackend'
+
+
+class RejectingBackend(EmailBackend):
+    """Refuses every message to a rejected@ address and counts the
+    connections opened."""
+    opened = 0
+
+    def open(self):
+        RejectingBackend.opened += 1
+        return True
+
+    def send_messages(self, messages):
+        for message in messages:
+            if any(address.startswith('rejected@')
+                   for address in message.to):
+                raise SMTPRecipientsRefused({})
+        return super().send_messages(messages)
+
+
+class BrokenBackend(EmailBackend):
+    def open(self):
+        raise ConnectionRefusedError
+
+
+@override_settings(EMAIL_BACKEND=LOCMEM)
+class OutboxTests(TestCase):
+    def due(self):
+        OutgoingEmail.objects.update(send_after=timezone.now())
+
+    def test_queue_does_not_send(self):
+        outbox.queue('Welcome', 'Hello', ['new@acme.com'])
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(OutgoingEmail.objects.get().status, 'Q')
+
+    def test_send_batch(self):
+        for number in range(3):
+            outbox.queue('Welcome', 'Hello',
+                         ['user{0}@acme.com'.format(number)])
+        self.assertEqual(outbox.send_batch(batch_size=2), 2)
+        self.assertEqual(len(mail.outbox), 2)
+        outbox.run_sender(once=True)
+        self.assertEqual(len(mail.outbox), 3)
+        self.assertEqual(mail.outbox[0].to, ['user0@acme.com'])
+        self.assertFalse(OutgoingEmail.objects.exclude(status='S').exists())
+
+    @override_settings(
+        EMAIL_BACKEND='dashboard.tests.test_outbox.RejectingBackend')
+    def test_one_connection_per_batch(self):
+        RejectingBackend.opened = 0
+        for number in range(5):
+            outbox.queue('Welcome', 'Hello',
+                         ['user{0}@acme.com'.format(number)])
+        outbox.send_batch()
+        self.assertEqual(RejectingBackend.opened, 1)
+        self.assertEqual(len(mail.outbox), 5)
+
+    @override_settings(
+        EMAIL_BACKEND='dashboard.tests.test_outbox.RejectingBackend')
+    def test_retry_then_dead(self):
+        rejected = outbox.queue('Welcome', 'Hello', ['rejected@acme.com'],
+                                max_attempts=2)
+        outbox.queue('Welcome', 'Hello', ['user@acme.com'])
+        outbox.send_batch()
+        rejected.refresh_from_db()
+        self.assertEqual((rejected.status, rejected.attempts), ('Q', 1))
+        self.assertIn('SMTPRecipientsRefused', rejected.last_error)
+        self.assertGreater(rejected.send_after,
+                           timezone.now() + timedelta(seconds=30))
+        self.assertEqual(outbox.send_batch(), 0)
+        self.due()
+        outbox.send_batch()
+        rejected.refresh_from_db()
+        self.assertEqual((rejected.status, rejected.attempts), ('D', 2))
+        self.assertEqual(len(mail.outbox), 1)
+
+    @override_settings(
+        EMAIL_BACKEND='dashboard.tests.test_outbox.BrokenBackend')
+    def test_connection_failure_retries_batch(self):
+        outbox.queue('Welcome', 'Hello', ['user@acme.com'])
+        outbox.send_batch()
+        email = OutgoingEmail.objects.get()
+        self.assertEqual((email.status, email.attempts), ('Q', 1))
+
+    def test_expired_lock_is_claimable(self):
+        email = outbox.queue('Welcome', 'Hello', ['user@acme.com'])
+        OutgoingEmail.objects.update(
+            claimed_by='dead', locked_until=timezone.now() + timedelta(
+                minutes=5))
+        self.assertEqual(outbox.send_batch(), 0)
+        OutgoingEmail.objects.update(
+            locked_until=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(outbox.send_batch(), 1)
+        email.refresh_from_db()
+        self.assertEqual(email.status, 'S')
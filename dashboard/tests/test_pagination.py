@@ -0,0 +1,84 @@
+import base64
+from datetime import datetime, timedelta
+
+from django.test import RequestFactory, TestCase
+from django.utils import timezone
+
+from dashboard.models import Company, Employee, Location, User
+from dashboard.pagination import (decode_cursor, encode_cursor, paginate,
+                                  seek)
+
+ORDERING = ['-user__last_login', '-id']
+
+
+class PaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        Location.objects.create(id=1, name='Head Office',
+                                company=Company.objects.create(name='Acme'))
+        login = timezone.make_aware(datetime(2026, 1, 1))
+        # Ties and NULLs in the first column are broken by the id.
+        for number, days in enumerate([3, None, 1, 3, None, 2, 3]):
+            User.objects.create_user(
+                'user{0}@acme.com'.format(number),
+                last_login=None if days is None else
+                login + timedelta(days=days))
+        cls.expected = list(Employee.objects.order_by(*ORDERING))
+
+    def page(self, **params):
+        request = RequestFactory().get('/team/', params)
+        return paginate(Employee.objects.select_related('user'), request,
+                        ORDERING)
+
+    def test_seek(self):
+        fields = [('user__last_login', True), ('id', True)]
+        for index, employee in enumerate(self.expected):
+            values = [employee.user.last_login, employee.id]
+            with self.subTest(index=index):
+                self.assertEqual(
+                    list(Employee.objects.filter(seek(
+                        fields, values, True)).order_by(*ORDERING)),
+                    self.expected[index + 1:])
+                self.assertEqual(
+                    list(Employee.objects.filter(seek(
+                        fields, values, False)).order_by(*ORDERING)),
+                    self.expected[:index])
+
+    def test_walk_forward_and_back(self):
+        pages = [self.page(num=2)]
+        while pages[-1].has_next:
+            pages.append(self.page(num=2, after=pages[-1].next_cursor))
+        self.assertEqual([employee for page in pages for employee in page],
+                         self.expected)
+        self.assertEqual([page.has_previous for page in pages],
+                         [False, True, True, True])
+        self.assertEqual(pages[0].count, 7)
+
+        page = pages[-1]
+        for expected in reversed(pages[:-1]):
+            page = self.page(num=2, before=page.previous_cursor)
+            self.assertEqual(list(page), list(expected))
+            self.assertTrue(page.has_next)
+        self.assertFalse(page.has_previous)
+
+    def test_tampered_cursors(self):
+        def encoded(text):
+            return base64.urlsafe_b64encode(text.encode()).decode()
+
+        first_page = list(self.page(num=2))
+        for cursor in ['garbage!', 'é', encoded('{"id": 1}'),
+                       encoded('["2026-01-01", 1, 2]'),
+                       encoded('["yesterday", 1]'),
+                       encoded('[[1], {"id": 1}]'),
+                       encoded('[null, "one"]'),
+                       base64.urlsafe_b64encode(b'\xff\xfe').decode()]:
+            with self.subTest(cursor=cursor):
+                self.assertEqual(list(self.page(num=2, after=cursor)),
+                                 first_page)
+                self.assertEqual(list(self.page(num=2, before=cursor)),
+                                 first_page)
+
+    def test_cursor_keeps_microseconds(self):
+        moment = timezone.make_aware(datetime(2026, 1, 1, 12, 0, 0, 123456))
+        self.assertEqual(decode_cursor(encode_cursor([moment, 5])),
+                         [moment.isoformat(), 5])
@@ -0,0 +1,146 @@
+import io
+import shutil
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+
+import urllib3
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from dashboard import pipeline, tasks
+from dashboard.models import Employee, LocationFactory, Task, UserFactory
+
+IMAGE = b'\x89PNG\r\n\x1a\n' + b'\0' * 1000
+
+
+class ImageHandler(BaseHTTPRequestHandler):
+    """Stands in for the avatar CDN."""
+    protocol_version = 'HTTP/1.1'
+    connections = 0
+
+    def setup(self):
+        ImageHandler.connections += 1
+        super().setup()
+
+    def log_message(self, *args):
+        pass
+
+    def send(self, status, content_type, body, length=True):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        if length:
+            self.send_header('Content-Length', str(len(body)))
+        else:
+            self.send_header('Connection', 'close')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == '/avatar.png':
+            self.send(200, 'image/png', IMAGE)
+        elif self.path == '/large.png':
+            self.send(200, 'image/png', IMAGE * 10)
+        elif self.path == '/unsized.png':
+            self.send(200, 'image/png', IMAGE * 10, length=False)
+            self.close_connection = True
+        elif self.path == '/page':
+            self.send(200, 'text/html', b'<html></html>')
+        elif self.path == '/slow.png':
+            time.sleep(1)
+            self.send(200, 'image/png', IMAGE)
+        else:
+            self.send(404, 'text/plain', b'Not found')
+
+
+class ImageServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # Clients that time out hang up mid-response.
+        pass
+
+
+class RetrieveImageTests(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = ImageServer(('127.0.0.1', 0), ImageHandler)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.base = 'http://127.0.0.1:{0}'.format(cls.server.server_port)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        http = urllib3.PoolManager(
+            timeout=urllib3.Timeout(connect=1.0, read=0.2), retries=False)
+        patcher = mock.patch.object(pipeline, 'http', http)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(http.clear)
+
+    def test_image(self):
+        with pipeline.retrieve_image(self.base + '/avatar.png') as image:
+            self.assertEqual(image.read(), IMAGE)
+
+    def test_connection_is_reused(self):
+        ImageHandler.connections = 0
+        for _ in range(3):
+            pipeline.retrieve_image(self.base + '/avatar.png').close()
+        self.assertEqual(ImageHandler.connections, 1)
+
+    def test_size_limit(self):
+        for path in ['/large.png', '/unsized.png']:
+            with self.subTest(path=path):
+                with self.assertRaisesMessage(pipeline.ImageFetchError,
+                                              'larger than'):
+                    pipeline.retrieve_image(self.base + path,
+                                            max_size=len(IMAGE) * 2)
+
+    def test_not_an_image(self):
+        with self.assertRaisesMessage(pipeline.ImageFetchError,
+                                      'text/html, not an image'):
+            pipeline.retrieve_image(self.base + '/page')
+        with self.assertRaisesMessage(pipeline.ImageFetchError, '404'):
+            pipeline.retrieve_image(self.base + '/missing.png')
+
+    def test_timeout(self):
+        with self.assertRaises(urllib3.exceptions.HTTPError):
+            pipeline.retrieve_image(self.base + '/slow.png')
+
+
+@mock.patch('dashboard.tasks.close_old_connections')
+class SaveAvatarTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        LocationFactory(id=1)
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings = override_settings(
+            DEFAULT_FILE_STORAGE='django.core.files.storage.FileSystemStorage',
+            MEDIA_ROOT=media_root)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    @mock.patch.object(pipeline, 'process_avatar')
+    @mock.patch.object(pipeline, 'retrieve_image',
+                       side_effect=lambda url: io.BytesIO(IMAGE))
+    def test_queued_and_run(self, retrieve_image, process_avatar,
+                            close_old_connections):
+        user = UserFactory()
+        record = pipeline.save_avatar.delay(user.id, 'http://cdn/a.png')
+        self.assertEqual(record.name, 'dashboard.pipeline.save_avatar')
+        tasks.execute(record.id)
+        self.assertEqual(Task.objects.get(id=record.id).status, 'D')
+        retrieve_image.assert_called_once_with('http://cdn/a.png')
+        employee = Employee.objects.get(user=user)
+        self.assertEqual(employee.image.name,
+                         'avatars/user_{0}.jpg'.format(user.id))
+        process_avatar.assert_called_once_with(employee.id)
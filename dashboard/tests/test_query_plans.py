@@ -0,0 +1,90 @@
+import re
+from unittest import skipUnless
+
+from django.db import connection
+from django.db.models import Count
+from django.test import TestCase
+
+from dashboard.models import (Company, Employee, Item, ItemRequest, Location,
+                              Message, PurchaseOrder, User)
+
+FULL_SCAN = re.compile(r'^SCAN (TABLE )?dashboard_')
+SORT = 'USE TEMP B-TREE FOR ORDER BY'
+
+
+@skipUnless(connection.vendor == 'sqlite', 'EXPLAIN QUERY PLAN is SQLite')
+class QueryPlanTests(TestCase):
+    """The queries behind the views must be answered from indexes. Each test
+    mirrors the queryset of a view and checks SQLite's query plan."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.company = Company.objects.create(name='Acme')
+        Location.objects.create(id=1, name='Head Office', company=cls.company)
+        cls.user = User.objects.create_user('admin@acme.com')
+
+    def plan(self, queryset):
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+            return [row[-1] for row in cursor.fetchall()]
+
+    def assertIndexed(self, queryset, index=None, sorted_by_index=False):
+        plan = self.plan(queryset)
+        text = '\n'.join(plan)
+        for step in plan:
+            self.assertIsNone(FULL_SCAN.match(step),
+                              'Full table scan:\n' + text)
+        if index is not None:
+            self.assertIn(index, text)
+        if sorted_by_index:
+            self.assertNotIn(SORT, text)
+
+    def test_pending_requests(self):
+        self.assertIndexed(ItemRequest.objects.filter(
+            item__company=self.company, status='P').select_related(
+            'item', 'user__employee__location'),
+            index='(item_id=? AND status=?)')
+
+    def test_item_usage_history(self):
+        self.assertIndexed(ItemRequest.objects.filter(
+            item_id='SKU1').order_by('created_at'), sorted_by_index=True)
+
+    def test_inbox(self):
+        self.assertIndexed(self.user.inbox_messages.filter(
+            from_user_id__gte=2).order_by('-date_sent'),
+            sorted_by_index=True)
+
+    def test_unread_alerts(self):
+        self.assertIndexed(self.user.inbox_messages.filter(
+            from_user_id=1, read=False).order_by('-date_sent'),
+            index='(to_user_id=? AND read=? AND from_user_id=?)',
+            sorted_by_index=True)
+
+    def test_unread_counts(self):
+        self.assertIndexed(Message.objects.filter(
+            to_user_id=self.user.pk, read=False).values('from_user_id'),
+            index='COVERING INDEX')
+
+    def test_purchase_orders_of_item(self):
+        self.assertIndexed(PurchaseOrder.objects.filter(
+            item_id='SKU1').order_by('created_at'), sorted_by_index=True)
+
+    def test_purchase_orders(self):
+        self.assertIndexed(PurchaseOrder.objects.filter(
+            item__company=self.company).order_by('-created_at', '-id'))
+
+    def test_items(self):
+        self.assertIndexed(Item.objects.filter(
+            company=self.company).order_by('description', 'SKU'),
+            sorted_by_index=True)
+
+    def test_most_requested_items(self):
+        self.assertIndexed(Item.objects.filter(
+            company=self.company).annotate(
+            requests=Count('itemrequest')).order_by('-requests'))
+
+    def test_team(self):
+        self.assertIndexed(Employee.objects.filter(
+            location__company=self.company).select_related(
+            'user', 'location').order_by('-user__last_login', '-id'))
@@ -0,0 +1,57 @@
+from django.test import TestCase
+
+from dashboard import reorder
+from dashboard.models import (CompanyFactory, Item, ItemFactory,
+                              LocationFactory, PurchaseOrder)
+
+
+class ReorderTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.company = LocationFactory(id=1).company
+        for sku, available, reorder_point, usage, lead_time in [
+                ('USED', 20, 0, (2, 4), (5, 7)),
+                ('MANUAL', 5, 5, (0, 0), (3, 3)),
+                ('STOCKED', 100, 0, (2, 4), (5, 7)),
+                ('SENT', 0, 0, (1, 1), (1, 1)),
+                ('DONE', 0, 0, (1, 1), (1, 1))]:
+            ItemFactory(
+                SKU=sku, company=cls.company, quantity_available=available,
+                reorder_point=reorder_point, average_daily_usage=usage[0],
+                maximum_daily_usage=usage[1], average_lead_time=lead_time[0],
+                maximum_lead_time=lead_time[1])
+        PurchaseOrder.objects.create(item_id='SENT', quantity=3, status='S')
+        PurchaseOrder.objects.create(item_id='DONE', quantity=3, status='F')
+        ItemFactory(SKU='GLOBEX')
+
+    def test_plan(self):
+        plan = reorder.plan(self.company)
+        self.assertEqual(list(plan.skus),
+                         ['DONE', 'MANUAL', 'SENT', 'STOCKED', 'USED'])
+        used = list(plan.skus).index('USED')
+        # Lead time demand 2 * 5, safety stock 4 * 7 - 10.
+        self.assertEqual(plan.lead_time_demand[used], 10)
+        self.assertEqual(plan.safety_stock[used], 18)
+        self.assertEqual(plan.reorder_point[used], 28)
+        self.assertEqual(list(plan.due), [True, True, True, False, True])
+
+    def test_run(self):
+        orders = reorder.run(self.company)
+        self.assertEqual(sorted((order.item_id, order.quantity, order.status)
+                                for order in orders),
+                         [('DONE', 2, 'Q'), ('MANUAL', 1, 'Q'),
+                          ('USED', 18, 'Q')])
+        self.assertEqual(dict(Item.objects.filter(
+            company=self.company).values_list('SKU', 'reorder_point')), {
+            'DONE': 1, 'MANUAL': 5, 'SENT': 1, 'STOCKED': 28, 'USED': 28})
+        # The queued orders are not doubled by the next run.
+        self.assertEqual(reorder.run(self.company), [])
+
+    def test_reorder_points_kept(self):
+        reorder.run(self.company, update_reorder_points=False)
+        self.assertEqual(Item.objects.get(SKU='USED').reorder_point, 0)
+        self.assertEqual(PurchaseOrder.objects.filter(
+            item__company=self.company, status='Q').count(), 3)
+
+    def test_no_items(self):
+        self.assertEqual(reorder.run(CompanyFactory()), [])
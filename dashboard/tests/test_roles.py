@@ -0,0 +1,72 @@
+from django.contrib.auth.models import Group
+from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
+from django.test import TestCase
+
+from dashboard import roles
+from dashboard.models import Employee, LocationFactory, User, UserFactory
+from dashboard.tests.helpers import ReplicaMixin
+
+
+class RoleTests(ReplicaMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.location = LocationFactory(id=1)
+        cls.admins = Group.objects.create(name='Company Admins')
+        cls.user = UserFactory()
+
+    def setUp(self):
+        cache.clear()
+
+    def fresh_user(self):
+        return User.objects.get(pk=self.user.pk)
+
+    def test_cached(self):
+        self.assertEqual(roles.get_role_info(self.fresh_user()), {
+            'groups': frozenset(), 'company_id': self.location.company_id})
+        user = self.fresh_user()
+        with self.assertNumQueries(0):
+            roles.get_role_info(user)
+            self.assertFalse(roles.is_company_admin(user))
+
+    def test_group_changes_invalidate(self):
+        roles.get_role_info(self.fresh_user())
+        self.user.groups.add(self.admins)
+        self.assertTrue(roles.is_company_admin(self.fresh_user()))
+        self.admins.user_set.remove(self.user)
+        self.assertFalse(roles.is_company_admin(self.fresh_user()))
+        self.admins.user_set.add(self.user)
+        self.assertTrue(roles.is_company_admin(self.fresh_user()))
+        self.admins.user_set.clear()
+        self.assertFalse(roles.is_company_admin(self.fresh_user()))
+
+    def test_employee_changes_invalidate(self):
+        roles.get_role_info(self.fresh_user())
+        employee = Employee.objects.get(user=self.user)
+        employee.location = LocationFactory()
+        employee.save()
+        self.assertEqual(roles.get_role_info(self.fresh_user())['company_id'],
+                         employee.location.company_id)
+        employee.delete()
+        self.assertIsNone(
+            roles.get_role_info(self.fresh_user())['company_id'])
+
+    def test_sidebar_cached_per_role(self):
+        admin = UserFactory()
+        admin.groups.add(self.admins)
+        company_id = self.location.company_id
+        for user, roles_key, admin_links in [
+                (self.user, '', False), (admin, 'Company Admins', True),
+                (self.user, '', False)]:
+            self.client.force_login(user)
+            response = self.client.get('/profile/')
+            if admin_links:
+                self.assertContains(response, 'Manage Employees')
+            else:
+                self.assertNotContains(response, 'Manage Employees')
+            self.assertIsNotNone(cache.get(make_template_fragment_key(
+                'sidebar', [roles_key, company_id])))
+        admin.groups.remove(self.admins)
+        self.client.force_login(admin)
+        self.assertNotContains(self.client.get('/profile/'),
+                               'Manage Employees')
@@ -0,0 +1,69 @@
+from unittest import mock
+
+from django.db import connection
+from django.test import TestCase
+
+from dashboard import search
+from dashboard.models import (CategoryFactory, ItemFactory, ItemSearchIndex,
+                              LocationFactory, Supplier, SupplierFactory,
+                              UserFactory)
+from dashboard.tests.helpers import ReplicaMixin
+
+
+class SearchTests(ReplicaMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.company = LocationFactory(id=1).company
+        cls.supplier = SupplierFactory(name='Dell', company=cls.company)
+        category = CategoryFactory(name='Accessories', company=cls.company)
+        for sku, description in [
+                ('STD01', 'Laptop stand with adjustable height, cable tray '
+                          'and ventilated aluminium deck'),
+                ('BAG01', 'Laptop bag'),
+                ('MON01', 'Monitor'),
+                ('LAPTOP-KEY', 'Keyboard')]:
+            ItemFactory(SKU=sku, company=cls.company, description=description,
+                        supplier=cls.supplier, category=category)
+        ItemFactory(SKU='GLOBEX', description='Laptop bag',
+                    supplier__name='Dell')
+        cls.user = UserFactory()
+
+    def skus(self, query, limit=20):
+        return [item.SKU for item in
+                search.search_items(self.company, query, limit)]
+
+    def test_ranking(self):
+        # SKU prefix matches first, then the shorter, closer description.
+        self.assertEqual(self.skus('laptop'),
+                         ['LAPTOP-KEY', 'BAG01', 'STD01'])
+        self.assertEqual(self.skus('laptop', limit=2),
+                         ['LAPTOP-KEY', 'BAG01'])
+
+    def test_prefixes_of_every_word_must_match(self):
+        self.assertEqual(self.skus('lap ba'), ['BAG01'])
+        self.assertEqual(self.skus('laptop dell'),
+                         ['BAG01', 'LAPTOP-KEY', 'STD01'])
+        self.assertEqual(self.skus('monitor bag'), [])
+        self.assertEqual(self.skus('  '), [])
+        self.assertEqual(self.skus('"*'), [])
+
+    def test_renamed_supplier_is_reindexed(self):
+        supplier = Supplier.objects.get(id=self.supplier.id)
+        supplier.name = 'Lenovo'
+        supplier.save()
+        self.assertEqual(self.skus('lenovo monitor'), ['MON01'])
+        self.assertEqual(ItemSearchIndex.objects.filter(
+            company=self.company, body__contains='Dell').count(), 0)
+
+    def test_fallback_scan(self):
+        with mock.patch.object(connection, 'vendor', 'postgresql'):
+            self.assertEqual(self.skus('laptop bag'), ['BAG01'])
+            self.assertEqual(self.skus('mon'), ['MON01'])
+
+    def test_typeahead(self):
+        self.client.force_login(self.user)
+        data = self.client.get('/items/search/', {'q': 'bag'}).json()
+        self.assertEqual(data['results'], [{
+            'SKU': 'BAG01', 'description': 'Laptop bag',
+            'category': 'Accessories', 'supplier': 'Dell',
+            'url': '/items/BAG01/'}])
@@ -0,0 +1,93 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.test import TestCase
+from django.utils import timezone
+
+from dashboard import tasks
+from dashboard.models import Task
+
+calls = []
+
+
+@tasks.task
+def remember(value, twice=False):
+    calls.extend([value] * (2 if twice else 1))
+
+
+@tasks.task(max_attempts=2, backoff=10)
+def explode():
+    raise RuntimeError('Boom')
+
+
+# The worker closes stale connections around each task, which would close
+# the connection holding the test transaction.
+@mock.patch('dashboard.tasks.close_old_connections')
+class TaskQueueTests(TestCase):
+    def setUp(self):
+        del calls[:]
+
+    def run_task(self, function, *args, **kwargs):
+        record = function.delay(*args, **kwargs)
+        self.assertEqual(tasks.claim(60, 10), [record.id])
+        tasks.execute(record.id)
+        record.refresh_from_db()
+        return record
+
+    def test_delay_queues_without_running(self, close):
+        record = remember.delay(1)
+        self.assertEqual(calls, [])
+        self.assertEqual((record.name, record.status),
+                         ('dashboard.tests.test_tasks.remember', 'Q'))
+
+    def test_run(self, close):
+        record = self.run_task(remember, 'a', twice=True)
+        self.assertEqual(calls, ['a', 'a'])
+        self.assertEqual((record.status, record.attempts), ('D', 1))
+        self.assertIsNone(record.locked_until)
+
+    def test_claim(self, close):
+        first, second = remember.delay(1), remember.delay(2)
+        later = remember.delay(3)
+        Task.objects.filter(id=later.id).update(
+            run_at=timezone.now() + timedelta(minutes=5))
+        self.assertEqual(tasks.claim(60, 1), [first.id])
+        self.assertEqual(tasks.claim(60, 10), [second.id])
+        self.assertEqual(tasks.claim(60, 10), [])
+        self.assertEqual(Task.objects.get(id=first.id).status, 'R')
+
+    def test_visibility_timeout(self, close):
+        record = remember.delay(1)
+        self.assertEqual(tasks.claim(60, 10), [record.id])
+        self.assertEqual(tasks.claim(60, 10), [])
+        # The worker that claimed it died; once the lock expires another
+        # worker takes the task over.
+        Task.objects.filter(id=record.id).update(
+            locked_until=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(tasks.claim(60, 10), [record.id])
+        self.assertEqual(Task.objects.get(id=record.id).attempts, 2)
+
+    def test_retry_then_fail(self, close):
+        with self.assertLogs('dashboard.tasks', 'ERROR'):
+            record = self.run_task(explode)
+        self.assertEqual((record.status, record.attempts), ('Q', 1))
+        self.assertIn('RuntimeError: Boom', record.last_error)
+        self.assertAlmostEqual(
+            (record.run_at - timezone.now()).total_seconds(), 10, delta=2)
+        self.assertEqual(tasks.claim(60, 10), [])
+
+        Task.objects.filter(id=record.id).update(run_at=timezone.now())
+        self.assertEqual(tasks.claim(60, 10), [record.id])
+        with self.assertLogs('dashboard.tasks', 'ERROR'):
+            tasks.execute(record.id)
+        record.refresh_from_db()
+        self.assertEqual((record.status, record.attempts), ('F', 2))
+        self.assertEqual(tasks.claim(60, 10), [])
+
+    def test_unknown_task_fails(self, close):
+        record = Task.objects.create(name='dashboard.tasks.missing',
+                                     max_attempts=1)
+        self.assertEqual(tasks.claim(60, 10), [record.id])
+        with self.assertLogs('dashboard.tasks', 'ERROR'):
+            tasks.execute(record.id)
+        self.assertEqual(Task.objects.get(id=record.id).status, 'F')
@@ -0,0 +1,518 @@
+import json
+import unittest
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth.models import Group
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from dashboard import (benchmark, history, querystats, reference, replicas,
+                       synthetic, tenancy)
+from dashboard.models import (Category, Company, Employee, Item,
+                              ItemRequest, ItemReturn, Location, Message,
+                              PurchaseOrder, Supplier, User)
+from dashboard.tests.helpers import QueryBudgetMixin, ReplicaMixin
+
+
+class QueryBudgetTests(ReplicaMixin, QueryBudgetMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        company = Company.objects.create(name='Acme')
+        Location.objects.create(id=1, name='Head Office', company=company)
+        category = Category.objects.create(name='Laptops', company=company)
+        supplier = Supplier.objects.create(name='Dell', company=company,
+                                           email='sales@dell.com')
+        system = User.objects.create_user('system@crystalims.com')
+        cls.user = User.objects.create_user('admin@acme.com', 'password',
+                                            is_staff=True)
+        for name in ['Company Superusers', 'Company Admins',
+                     'Company Employees']:
+            Group.objects.create(name=name)
+        cls.user.groups.set(Group.objects.filter(
+            name__in=['Company Superusers', 'Company Admins']))
+        for number in range(20):
+            item = Item.objects.create(
+                SKU='LAP{0:03d}'.format(number), company=company,
+                description='Laptop {0}'.format(number), price=1000,
+                supplier=supplier, category=category, quantity_purchased=5,
+                quantity_available=5)
+            ItemRequest.objects.create(item=item, user=cls.user)
+        Message.objects.create(from_user=system, to_user=cls.user,
+                               text='Stock is low')
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+
+    def test_dashboard(self):
+        response = self.assertViewQueryBudget('/dashboard/', 10)
+        self.assertContains(response, '100,000</span>')
+
+    def test_items(self):
+        self.assertViewQueryBudget('/items/list/', 8)
+
+    def test_item(self):
+        self.assertViewQueryBudget('/items/LAP001/', 11)
+
+    def test_item_requests(self):
+        self.assertViewQueryBudget('/requests/pending/', 8)
+
+    def test_profile(self):
+        self.assertViewQueryBudget('/profile/', 7)
+
+    def test_messages(self):
+        self.assertViewQueryBudget('/messages/list/', 10)
+
+    def test_budget_failure_lists_statements(self):
+        with self.assertRaisesMessage(self.failureException,
+                                      '2 queries run, budget is 1'):
+            with self.assertQueryBudget(1):
+                list(Item.objects.all())
+                list(Category.objects.all())
+
+
+class QueryStatsMiddlewareTests(ReplicaMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        company = Company.objects.create(name='Acme')
+        Location.objects.create(id=1, name='Head Office', company=company)
+        cls.user = User.objects.create_user('admin@acme.com', 'password',
+                                            is_staff=True)
+
+    def setUp(self):
+        querystats.summary.clear()
+        self.client.force_login(self.user)
+
+    @override_settings(QUERY_STATS_HEADERS=True)
+    def test_headers(self):
+        response = self.client.get('/profile/')
+        self.assertGreater(int(response['X-Query-Count']), 0)
+        self.assertIn('X-Query-Time', response)
+
+    @override_settings(QUERY_STATS_HEADERS=False)
+    def test_headers_disabled(self):
+        response = self.client.get('/profile/')
+        self.assertNotIn('X-Query-Count', response)
+
+    def test_summary(self):
+        self.client.get('/profile/')
+        self.client.get('/profile/')
+        report = self.client.get('/query-stats/').json()
+        self.assertEqual(report['profile']['requests'], 2)
+        self.assertGreater(report['profile']['queries_p50'], 0)
+
+    def test_log(self):
+        with self.assertLogs('dashboard.queries', 'DEBUG') as logs:
+            self.client.get('/profile/')
+        entry = json.loads(logs.records[0].getMessage())
+        self.assertEqual((entry['endpoint'], entry['status']),
+                         ('profile', 200))
+        self.assertGreater(entry['queries'], 0)
+
+
+class MessageUpdatesTests(ReplicaMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        company = Company.objects.create(name='Acme')
+        Location.objects.create(id=1, name='Head Office', company=company)
+        cls.system = User.objects.create_user('system@crystalims.com')
+        cls.sender = User.objects.create_user('sender@acme.com')
+        cls.user = User.objects.create_user('user@acme.com')
+        cls.old = Message.objects.create(from_user=cls.sender,
+                                         to_user=cls.user, text='Old')
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def updates(self, since):
+        return self.client.get('/messages/updates/', {'since': since}).json()
+
+    def test_returns_only_newer_messages(self):
+        alert = Message.objects.create(from_user=self.system,
+                                       to_user=self.user, text='Stock is low')
+        data = self.updates(self.old.id)
+        self.assertEqual([message['id'] for message in data['messages']],
+                         [alert.id])
+        self.assertTrue(data['messages'][0]['alert'])
+        self.assertEqual(data['last_message_id'], alert.id)
+        self.assertEqual((data['messages_count'], data['alerts_count']),
+                         (1, 1))
+
+    def test_no_news(self):
+        data = self.updates(self.old.id)
+        self.assertEqual(data['messages'], [])
+        self.assertEqual(data['last_message_id'], self.old.id)
+
+    @override_settings(MESSAGE_POLL_INTERVAL=5)
+    def test_navigation_bar_polls(self):
+        response = self.client.get('/profile/')
+        self.assertContains(response, '"/messages/updates/"')
+        self.assertContains(response, 'var interval = 5;')
+
+    def test_invalid_since(self):
+        response = self.client.get('/messages/updates/', {'since': 'x'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_reading_a_message_updates_counts(self):
+        self.client.get('/messages/{0}/'.format(self.old.id))
+        self.assertEqual(self.updates(self.old.id)['messages_count'], 0)
+
+    def test_send_message(self):
+        self.client.force_login(self.sender)
+        self.client.post('/messages/send/', {'to_user': self.user.id,
+                                             'message': 'Hello'})
+        self.client.force_login(self.user)
+        data = self.updates(self.old.id)
+        self.assertEqual([message['text'] for message in data['messages']],
+                         ['Hello'])
+        self.assertEqual(data['messages_count'], 2)
+
+
+class ReferenceDataTests(QueryBudgetMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.company = Company.objects.create(name='Acme')
+        cls.location = Location.objects.create(id=1, name='Head Office',
+                                               company=cls.company)
+
+    def setUp(self):
+        cache.clear()
+
+    def load_locations(self):
+        return self.client.get('/ajax/load-locations/',
+                               {'company': self.company.id})
+
+    def test_locations_served_from_cache(self):
+        self.load_locations()
+        with self.assertQueryBudget(0):
+            response = self.load_locations()
+        self.assertContains(response, 'Head Office')
+
+    def test_saving_invalidates(self):
+        self.load_locations()
+        Location.objects.create(name='Warehouse', company=self.company)
+        self.assertContains(self.load_locations(), 'Warehouse')
+        self.location.name = 'Main Office'
+        self.location.save()
+        self.assertContains(self.load_locations(), 'Main Office')
+
+    def test_deleting_invalidates(self):
+        category = Category.objects.create(name='Laptops',
+                                           company=self.company)
+        self.assertEqual(reference.categories(self.company.id),
+                         [(category.id, 'Laptops')])
+        category.delete()
+        self.assertEqual(reference.categories(self.company.id), [])
+
+    def test_companies_scope(self):
+        self.assertEqual([company.name for company in reference.companies()],
+                         ['Acme'])
+        Company.objects.create(name='Globex')
+        self.assertEqual([company.name for company in reference.companies()],
+                         ['Acme', 'Globex'])
+        self.assertEqual(len(reference.locations(self.company.id)), 1)
+
+    def test_evicted_version_does_not_revive_old_data(self):
+        reference.locations(self.company.id)
+        cache.delete(reference.version_key(self.company.id))
+        Location.objects.create(name='Warehouse', company=self.company)
+        self.assertEqual(len(reference.locations(self.company.id)), 2)
+
+    def test_invalid_company(self):
+        response = self.client.get('/ajax/load-locations/', {'company': 'x'})
+        self.assertNotContains(response, 'Head Office')
+
+
+class TenantTests(ReplicaMixin, QueryBudgetMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.company = Company.objects.create(name='Acme')
+        cls.location = Location.objects.create(id=1, name='Head Office',
+                                               company=cls.company)
+        cls.user = User.objects.create_user('user@acme.com')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_cached(self):
+        tenancy.get_tenant(self.user)
+        user = User.objects.get(pk=self.user.pk)
+        with self.assertQueryBudget(0):
+            tenant = tenancy.get_tenant(user)
+            self.assertEqual(tenant.company, self.company)
+            self.assertEqual(user.employee.location.company.name, 'Acme')
+
+    def test_location_change_invalidates(self):
+        tenancy.get_tenant(self.user)
+        other = Company.objects.create(name='Globex')
+        location = Location.objects.create(name='Plant', company=other)
+        employee = Employee.objects.get(user=self.user)
+        employee.location = location
+        employee.save()
+        user = User.objects.get(pk=self.user.pk)
+        self.assertEqual(tenancy.get_tenant(user).company, other)
+
+    def test_company_rename_invalidates(self):
+        tenancy.get_tenant(self.user)
+        self.company.name = 'Acme Corp'
+        self.company.save()
+        user = User.objects.get(pk=self.user.pk)
+        self.assertEqual(tenancy.get_tenant(user).company.name, 'Acme Corp')
+
+    def test_request_tenant(self):
+        self.client.force_login(self.user)
+        response = self.client.get('/profile/')
+        self.assertEqual(response.wsgi_request.tenant.company_id,
+                         self.company.id)
+
+
+class ReplicaRouterTests(TestCase):
+    def setUp(self):
+        self.router = replicas.ReplicaRouter()
+        self.addCleanup(setattr, replicas.state, 'replica', False)
+
+    def test_routing(self):
+        replicas.state.replica = True
+        with mock.patch.object(replicas, 'replica_enabled',
+                               return_value=False):
+            self.assertEqual(self.router.db_for_read(Item), 'default')
+        with mock.patch.object(replicas, 'replica_enabled',
+                               return_value=True):
+            self.assertEqual(self.router.db_for_read(Item), 'replica')
+            self.assertEqual(self.router.db_for_write(Item), 'default')
+            with replicas.use_primary():
+                self.assertEqual(self.router.db_for_read(Item), 'default')
+            replicas.state.replica = False
+            self.assertEqual(self.router.db_for_read(Item), 'default')
+
+    def test_writes_make_reads_sticky(self):
+        company = Company.objects.create(name='Acme')
+        Location.objects.create(id=1, name='Head Office', company=company)
+        user = User.objects.create_user('user@acme.com')
+        self.client.force_login(user)
+        response = self.client.get('/messages/')
+        self.assertNotIn(replicas.STICKY_COOKIE, response.cookies)
+        response = self.client.post('/messages/send/', {
+            'to_user': user.id, 'message': 'Hello'})
+        cookie = response.cookies[replicas.STICKY_COOKIE]
+        self.assertEqual(cookie['max-age'], settings.REPLICA_STICKY_SECONDS)
+        self.assertFalse(replicas.reading_replica())
+
+
+@unittest.skipUnless(replicas.REPLICA in settings.DATABASES,
+                     'no replica database configured, see '
+                     'crystalims/test_settings.py')
+class ReplicaReadTests(ReplicaMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        company = Company.objects.create(name='Acme')
+        Location.objects.create(id=1, name='Head Office', company=company)
+        cls.user = User.objects.create_user('user@acme.com')
+        cls.supplier = Supplier.objects.create(name='Dell', company=company)
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def get(self, url):
+        """Request ``url`` and return the response with the databases its
+        model reads were routed to."""
+        aliases = []
+        db_for_read = replicas.ReplicaRouter.db_for_read
+
+        def record(router, model, **hints):
+            alias = db_for_read(router, model, **hints)
+            aliases.append(alias)
+            return alias
+
+        with mock.patch.object(replicas.ReplicaRouter, 'db_for_read', record):
+            response = self.client.get(url)
+        return response, set(aliases)
+
+    def test_read_only_view_reads_replica(self):
+        response, aliases = self.get('/suppliers/{0}/'.format(
+            self.supplier.id))
+        self.assertContains(response, 'Dell')
+        self.assertIn(replicas.REPLICA, aliases)
+
+    def test_sticky_cookie_reads_primary(self):
+        self.client.cookies[replicas.STICKY_COOKIE] = '1'
+        response, aliases = self.get('/suppliers/{0}/'.format(
+            self.supplier.id))
+        self.assertContains(response, 'Dell')
+        self.assertNotIn(replicas.REPLICA, aliases)
+
+    def test_other_views_read_primary(self):
+        response, aliases = self.get('/messages/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(aliases, {replicas.PRIMARY})
+
+
+class ItemHistoryTests(ReplicaMixin, QueryBudgetMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        company = Company.objects.create(name='Acme')
+        Location.objects.create(id=1, name='Head Office', company=company)
+        category = Category.objects.create(name='Paper', company=company)
+        supplier = Supplier.objects.create(name='Staples', company=company,
+                                           email='sales@staples.com')
+        cls.item = Item.objects.create(
+            SKU='PAP001', company=company, description='A4 paper',
+            price=5, supplier=supplier, category=category,
+            quantity_purchased=100, quantity_available=100)
+        cls.users = [User.objects.create_user(
+            'user{0}@acme.com'.format(number)) for number in range(3)]
+        for number in range(25):
+            ItemRequest.objects.create(item=cls.item,
+                                       user=cls.users[number % 3])
+        for status, quantity in [('Q', 10), ('S', 5), ('F', 20), ('C', 7)]:
+            PurchaseOrder.objects.create(item=cls.item, status=status,
+                                         quantity=quantity)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.users[0])
+
+    def test_requests_page(self):
+        url = '/items/PAP001/history/requests/'
+        self.client.get(url)
+        with self.assertQueryBudget(6):
+            response = self.client.get(url)
+        page = response.context['page']
+        self.assertEqual(len(page), 10)
+        self.assertTrue(page.has_next)
+        self.assertEqual(page.count, 25)
+        response = self.client.get(url + '?' + page.next_query)
+        self.assertEqual(len(response.context['page']), 10)
+
+    def test_orders_page(self):
+        response = self.client.get('/items/PAP001/history/orders/')
+        self.assertEqual(len(response.context['page']), 4)
+
+    def test_unknown_history(self):
+        response = self.client.get('/items/PAP001/history/returns/')
+        self.assertRedirects(response, '/user-not-found/')
+
+    def test_summary(self):
+        months = history.monthly_requests(self.item)
+        self.assertEqual(len(months), history.SUMMARY_MONTHS)
+        self.assertEqual(months[-1][1], 25)
+        self.assertEqual(sum(count for _, count in months[:-1]), 0)
+        self.assertEqual(history.order_totals(self.item), {
+            'ordered': 35, 'outstanding_orders': 2,
+            'outstanding_quantity': 15})
+
+    def test_item_page_loads_no_history_rows(self):
+        response = self.client.get('/items/PAP001/')
+        self.assertContains(response, '/items/PAP001/history/requests/')
+        self.assertNotIn('usage_history', response.context)
+
+
+class FulfilmentViewTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        company = Company.objects.create(name='Acme')
+        Location.objects.create(id=1, name='Head Office', company=company)
+        cls.item = Item.objects.create(
+            SKU='LAP001', company=company, description='Laptop', price=10,
+            quantity_purchased=5, quantity_available=5, is_returnable=True,
+            supplier=Supplier.objects.create(name='Dell', company=company),
+            category=Category.objects.create(name='Laptops',
+                                             company=company))
+        cls.admin = User.objects.create_user('admin@acme.com')
+        cls.admin.groups.add(Group.objects.create(name='Company Admins'))
+        cls.employee = User.objects.create_user('employee@acme.com')
+        cls.item_request = ItemRequest.objects.create(
+            item=cls.item, user=cls.employee, status='P')
+
+        other = Company.objects.create(name='Globex')
+        other_item = Item.objects.create(
+            SKU='GLOBEX', company=other, description='Theirs', price=1,
+            quantity_purchased=5, quantity_available=4, is_returnable=True,
+            supplier=Supplier.objects.create(name='HP', company=other),
+            category=Category.objects.create(name='Misc', company=other))
+        cls.other_return = ItemReturn.objects.create(
+            request=ItemRequest.objects.create(item=other_item,
+                                               user=cls.employee,
+                                               status='F'))
+
+    def status(self):
+        return ItemRequest.objects.get(id=self.item_request.id).status
+
+    def test_fulfil_needs_admin_and_post(self):
+        url = '/requests/{0}/fulfil/'.format(self.item_request.id)
+        self.client.force_login(self.employee)
+        self.client.post(url)
+        self.client.force_login(self.admin)
+        self.client.get(url)
+        self.assertEqual(self.status(), 'P')
+        response = self.client.post(url)
+        self.assertRedirects(response, '/requests/pending/',
+                             fetch_redirect_response=False)
+        self.assertEqual(self.status(), 'F')
+
+    def test_edit_item_leaves_stock(self):
+        self.client.force_login(self.admin)
+        data = {'SKU': 'LAP001', 'price': 12,
+                'supplier': self.item.supplier_id,
+                'category': self.item.category_id, 'reorder_point': 2,
+                'max_daily_usage': 3, 'avg_daily_usage': 1,
+                'max_lead_time': 4, 'avg_lead_time': 2}
+        with querystats.QueryRecorder() as recorder:
+            self.client.post('/items/LAP001/edit/', data)
+        update, = [sql for sql, _ in recorder.statements
+                   if sql.startswith('UPDATE "dashboard_item"')]
+        self.assertNotIn('quantity_available', update)
+        item = Item.objects.get(SKU='LAP001')
+        self.assertEqual((item.price, item.reorder_point,
+                          item.quantity_available), (12, 2, 5))
+
+    def test_return(self):
+        self.client.post('/requests/fulfil/', {
+            'request_ids': [self.item_request.id]})
+        self.assertEqual(self.status(), 'P')
+        self.client.force_login(self.admin)
+        self.client.post('/requests/fulfil/', {
+            'request_ids': [self.item_request.id]})
+        item_return = ItemReturn.objects.get(request=self.item_request)
+        url = '/requests/{0}/return/'.format(item_return.id)
+
+        self.client.logout()
+        response = self.client.post(url)
+        self.assertTrue(response['Location'].startswith('/login/'))
+        self.client.force_login(self.employee)
+        self.client.post(url)
+        self.client.force_login(self.admin)
+        self.client.get(url)
+        self.assertFalse(ItemReturn.objects.get(
+            id=item_return.id).is_returned)
+        self.client.post(url)
+        self.assertTrue(ItemReturn.objects.get(
+            id=item_return.id).is_returned)
+        self.assertEqual(Item.objects.get(SKU='LAP001').quantity_available,
+                         5)
+
+        self.client.post('/requests/{0}/return/'.format(
+            self.other_return.id))
+        self.assertFalse(ItemReturn.objects.get(
+            id=self.other_return.id).is_returned)
+
+
+class BenchmarkTests(ReplicaMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        company = Company.objects.create(name='System')
+        Location.objects.create(id=1, name='Head Office', company=company)
+        User.objects.create_user('system@crystalims.com')
+        cls.company, = synthetic.generate(items=30, requests=100,
+                                          messages=20, employees=3, seed=1)
+
+    def test_pages_respond(self):
+        user = benchmark.benchmark_user(self.company.id)
+        results = benchmark.run(user, iterations=2)
+        names = {result['name'] for result in results}
+        self.assertTrue({'dashboard', 'items', 'item', 'item_requests',
+                         'export_items', 'search_items'} <= names)
+        for result in results:
+            self.assertLess(result['status'], 500, result['name'])
+            self.assertLessEqual(result['p50_ms'], result['p95_ms'])
@@ -1,6 +1,6 @@
 from django.urls import path
 
-from . import views
+from . import api, views
 
 urlpatterns = [
     path('', views.home, name='home'),
@@ -12,16 +12,26 @@ urlpatterns = [
     path('messages/list/', views.messages, name='messages'),
     path('messages/<int:pk>/', views.message, name='message'),
     path('messages/send/', views.send_message, name='send'),
+    path('messages/updates/', views.message_updates, name='message_updates'),
     path('team/list/', views.team, name='team'),
     path('team/new/', views.add_employee, name='add_employee'),
     path('team/<int:pk>/', views.team_member, name='team_member'),
     path('items/list/', views.items, name='items'),
     path('items/new/', views.add_item, name='add_item'),
+    path('items/import/', views.import_items, name='import_items'),
+    path('items/export/', views.export_items, name='export_items'),
+    path('items/search/', views.search_items, name='search_items'),
     path('items/<slug:pk>/', views.item, name='item'),
+    path('items/<slug:pk>/history/<slug:kind>/', views.item_history,
+         name='item_history'),
     path('items/<slug:pk>/edit/', views.edit_item, name='edit_item'),
     path('items/<slug:pk>/request/', views.request_item, name='request_item'),
     path('items/<slug:pk>/delete/', views.delete_item, name='delete_item'),
     path('requests/pending/', views.item_requests, name='item_requests'),
+    path('requests/export/', views.export_item_requests,
+         name='export_item_requests'),
+    path('requests/fulfil/', views.fulfil_item_requests,
+         name='fulfil_item_requests'),
     path('requests/<int:pk>/fulfil/', views.fulfil_item_request,
          name='fulfil_item_request'),
     path('requests/<int:pk>/return/', views.return_item, name='return_item'),
@@ -30,11 +40,30 @@ urlpatterns = [
     # path('dashboard/export/', views.pdf, name='export_pdf'),
     path('user-not-found/', views.error, name='page_not_found'),
     path('place-order/', views.place_order, name='place_order'),
+    path('purchase-orders/reorder/', views.reorder_items,
+         name='reorder_items'),
     path('verify/<int:pk>/', views.verify, name='verify'),
     path('purchase-orders/', views.purchase_orders, name='purchase_orders'),
+    path('purchase-orders/export/', views.export_purchase_orders,
+         name='export_purchase_orders'),
     path('suppliers/list/', views.suppliers, name='suppliers'),
     path('suppliers/<int:pk>/', views.supplier, name='supplier'),
     path('suppliers/new/', views.add_supplier, name='add_supplier'),
     path('ajax/load-locations/', views.load_locations,
          name='ajax_load_locations'),
+    path('query-stats/', views.query_stats, name='query_stats'),
+    path('api/v1/items/', api.items, name='api_items'),
+    path('api/v1/items/lookup/', api.lookup_items, name='api_lookup_items'),
+    path('api/v1/items/stock/', api.update_stock, name='api_update_stock'),
+    path('api/v1/items/<slug:sku>/', api.item, name='api_item'),
+    path('api/v1/requests/', api.item_requests, name='api_item_requests'),
+    path('api/v1/requests/<int:pk>/', api.item_request,
+         name='api_item_request'),
+    path('api/v1/purchase-orders/', api.purchase_orders,
+         name='api_purchase_orders'),
+    path('api/v1/purchase-orders/<int:pk>/', api.purchase_order,
+         name='api_purchase_order'),
+    path('api/v1/suppliers/', api.suppliers, name='api_suppliers'),
+    path('api/v1/suppliers/<int:pk>/', api.supplier, name='api_supplier'),
+    path('api/v1/stock/', api.stock_levels, name='api_stock_levels'),
 ]
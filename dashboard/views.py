@@ -5,17 +5,23 @@ from django.contrib.auth import update_session_auth_hash, login
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.forms import PasswordChangeForm
 from django.contrib.sites.shortcuts import get_current_site
-from django.core.mail import send_mail
-from django.core.paginator import Paginator
-from django.db.models import Count, Sum
-from django.http import HttpResponse
+from django.db import transaction
+from django.db.models import Count
+from django.http import HttpResponse, HttpResponseForbidden, JsonResponse
 from django.shortcuts import render, redirect
 from django.template.loader import render_to_string
 from django.urls import reverse
 from django.utils.encoding import force_bytes, force_text
 from django.utils.http import urlsafe_base64_encode, urlsafe_base64_decode
 
+from . import (avatars, history, notifications, outbox, querystats,
+               reference, reorder, search, stock)
+from .exports import export_response
+from .importer import ItemImporter, read_rows
 from .models import *
+from .pagination import page_of_list, page_size, paginate
+from .replicas import read_only
+from .roles import is_company_admin
 from .tokens import account_activation_token
 
 
@@ -24,46 +30,18 @@ def home(request):
 
 
 @login_required
+@read_only
 def dashboard(request):
     user = request.user
-    company = user.employee.location.company
-    if user.groups.filter(name__in=["Company Admins", "Company Superusers"]):
+    company = request.tenant.company
+    if is_company_admin(user):
+        metrics = CompanyMetrics.for_company(company)
         most_requested = Item.objects.filter(
             company=company).annotate(
             requests=Count('itemrequest')).order_by('-requests')[
                          :10]
-        inventory_value = Item.objects.filter(
-            company=company).aggregate(total=
-                                       Sum(F('price') * F(
-                                           'quantity_available')))
-        pending_requests = ItemRequest.objects.filter(
-            item__company=company, status='P').count()
-        total_quantity_purchased = Item.objects.aggregate(Sum(
-            'quantity_purchased'))['quantity_purchased__sum']
-        total_quantity_available = Item.objects.aggregate(Sum(
-            'quantity_available'))['quantity_available__sum']
-        if total_quantity_available > 0:
-            inventory_turns = round(
-                total_quantity_purchased / total_quantity_available, 2)
-        else:
-            inventory_turns = 0
-        items_count = Item.objects.filter(
-            company=company).count()
-        requests = ItemRequest.objects.all().count()
-        if requests > 0:
-            percent_stockout = ItemRequest.objects.filter(status='SO').count()
-            percent_fulfilled = ItemRequest.objects.filter(status='F').count()
-            percent_pending = ItemRequest.objects.filter(status='P').count()
-            percent_stockouts = ((percent_stockout) / requests) * 100
-        else:
-            percent_stockout = 0
-            percent_fulfilled = 0
-            percent_pending = 0
-            percent_stockouts = 0
         categories = Category.objects.filter(company=company).annotate(
             Count('item'))
-        categories_count = categories.count()
-        alerts, unread_messages = unread_messages_notification(user)
         inventory_monthly_value = company.itemlog_set.filter(
             year=timezone.now().year)
         year = timezone.now().year
@@ -71,20 +49,18 @@ def dashboard(request):
         for monthly_value in inventory_monthly_value:
             inventory_mv[monthly_value.month] = monthly_value.inventory_value
         context = {'company': company,
-                   'unread_messages': unread_messages,
-                   'alerts': alerts,
                    'most_requested': most_requested,
-                   'inventory_value': inventory_value,
-                   'items_count': items_count,
-                   'pending_requests': pending_requests,
+                   'inventory_value': metrics.inventory_value,
+                   'items_count': metrics.items_count,
+                   'pending_requests': metrics.pending_count,
                    'categories': categories,
-                   'categories_count': categories_count,
+                   'categories_count': metrics.categories_count,
                    'inventory_mv': inventory_mv,
-                   'percent_stockout': percent_stockout,
-                   'percent_fulfilled': percent_fulfilled,
-                   'percent_pending': percent_pending,
-                   'inventory_turns': inventory_turns,
-                   'percent_stockouts': percent_stockouts,
+                   'percent_stockout': metrics.stockout_count,
+                   'percent_fulfilled': metrics.fulfilled_count,
+                   'percent_pending': metrics.pending_count,
+                   'inventory_turns': metrics.inventory_turns,
+                   'percent_stockouts': metrics.percent_stockouts,
                    'year': year}
         return render(request, 'dashboard.html', context)
     else:
@@ -92,16 +68,17 @@ def dashboard(request):
 
 
 def load_locations(request):
-    company_id = request.GET.get('company')
-    locations = Location.objects.filter(company_id=company_id).order_by('name')
+    company_id = request.GET.get('company', '')
+    locations = reference.locations(int(company_id)) \
+        if company_id.isdigit() else []
     return render(request, 'registration/company_dropdown_list_options.html',
                   {'locations': locations})
 
 
 def signup(request):
     if request.method == "GET":
-        companies = Company.objects.all().order_by('name')
-        locations = Location.objects.none()
+        companies = reference.companies()
+        locations = []
         return render(request, 'registration/register.html',
                       {'companies': companies, 'locations': locations})
     elif request.method == "POST":
@@ -123,6 +100,7 @@ def signup(request):
         user.employee.username = first_name[:3] + "_" + last_name[:3]
         user.employee.image = image
         user.employee.save()
+        avatars.process_avatar.delay(user.employee.id)
         return HttpResponse(
             'Account has been created successfully. Look out for the verification link sent to your email address.')
 
@@ -138,15 +116,13 @@ def send_activation_email(company, email, request, user):
         'token': account_activation_token.make_token(user),
     })
     to_email = email
-    send_mail(mail_subject, message, from_email="no-reply@crystalims.com",
-              recipient_list=[to_email],
-              fail_silently=False, )
+    outbox.queue(mail_subject, message, recipient_list=[to_email])
 
 
 def social_signup(request):
     if request.method == "GET":
-        companies = Company.objects.all().order_by('name')
-        locations = Location.objects.none()
+        companies = reference.companies()
+        locations = []
         return render(request, 'registration/register_social.html',
                       {'companies': companies, 'locations': locations})
     elif request.method == "POST":
@@ -155,67 +131,75 @@ def social_signup(request):
 
 
 @login_required
+@read_only
 def items(request):
     if request.method == "GET":
-        user = request.user
-        alerts, unread_messages = unread_messages_notification(user)
-        company = user.employee.location.company
+        company = request.tenant.company
 
-        items_list = Item.objects.filter(
-            company=company).order_by(
-            'description')
-        items = pager(items_list, request)
+        query = request.GET.get('q', '')
+        if query:
+            items = page_of_list(search.search_items(
+                company, query, limit=page_size(request)), request)
+        else:
+            items_list = Item.objects.filter(
+                company=company).select_related('category')
+            items = paginate(items_list, request, ['description', 'SKU'])
         return render(request, 'items.html',
-                      {'company': company, 'items': items,
-                       'unread_messages': unread_messages,
-                       'alerts': alerts})
-
-
-def pager(list, request):
-    if "num" in request.GET.keys():
-        number = int(request.GET["num"])
-    else:
-        number = 10
-    paginator = Paginator(list, number)
-    page = request.GET.get('page')
-    items = paginator.get_page(page)
-    return items
+                      {'company': company, 'items': items, 'query': query})
 
 
-def unread_messages_notification(user):
-    unread_messages = user.inbox_messages.filter(from_user_id__gte=2,
-                                                 read=False).order_by(
-        '-date_sent')
-    alerts = user.inbox_messages.filter(from_user_id=1, read=False).order_by(
-        '-date_sent')
-    return alerts, unread_messages
+@login_required
+@read_only
+def search_items(request):
+    company = request.tenant.company
+    results = search.search_items(company, request.GET.get('q', ''),
+                                  limit=10)
+    return JsonResponse({'results': [
+        {'SKU': item.SKU, 'description': item.description,
+         'category': item.category.name, 'supplier': item.supplier.name,
+         'url': reverse('item', args=[item.SKU])}
+        for item in results]})
 
 
+@login_required
+@read_only
 def item(request, pk):
-    user = request.user
-    company = request.user.employee.location.company
-    item = Item.objects.get(SKU=pk)
-    usage_history = item.itemrequest_set.all()
-    purchase_orders = item.purchaseorder_set.all()
-    categories = company.category_set.all()
-    suppliers = company.supplier_set.all()
-    alerts, unread_messages = unread_messages_notification(user)
+    company = request.tenant.company
+    item = Item.objects.select_related('category__company').get(
+        SKU=pk, company=company)
+    categories = reference.categories(company.id)
+    suppliers = reference.suppliers(company.id)
     return render(request, 'item.html',
-                  {'item': item, 'usage_history': usage_history,
-                   'purchase_orders': purchase_orders,
-                   'unread_messages': unread_messages, 'alerts': alerts,
-                   'categories': categories, 'suppliers': suppliers})
+                  {'item': item, 'categories': categories,
+                   'suppliers': suppliers,
+                   'monthly_requests': history.monthly_requests(item),
+                   'order_totals': history.order_totals(item)})
 
 
 @login_required
+@read_only
+def item_history(request, pk, kind):
+    """Render one page of an item's request or purchase order history, for
+    the item page to load into its history tables."""
+    item = Item.objects.filter(SKU=pk, company=request.tenant.company).first()
+    if item is None or kind not in ('requests', 'orders'):
+        return redirect('page_not_found')
+    if kind == 'requests':
+        rows = item.itemrequest_set.select_related('user')
+    else:
+        rows = item.purchaseorder_set.all()
+    page = paginate(rows, request, ['-created_at', '-id'])
+    return render(request, 'item_history.html',
+                  {'item': item, 'kind': kind, 'page': page})
+
+
+@login_required
+@read_only
 def profile(request):
     if request.method == "GET":
         user = request.user
-        alerts, unread_messages = unread_messages_notification(user)
-        requests = user.item_requests.all()
-        return render(request, 'profile.html', {'requests': requests,
-                                                'unread_messages': unread_messages,
-                                                'alerts': alerts})
+        requests = user.item_requests.select_related('item')
+        return render(request, 'profile.html', {'requests': requests})
 
 
 def create(request):
@@ -249,23 +233,21 @@ def create(request):
         user.employee.username = first_name[:3] + "_" + last_name[:3]
         user.employee.image = image
         user.employee.save()
+        avatars.process_avatar.delay(user.employee.id)
         user.groups.set([1])
 
         return redirect('login')
 
 
 @login_required
+@read_only
 def team(request):
-    user = request.user
-    alerts, unread_messages = unread_messages_notification(user)
-
     team_list = Employee.objects.filter(
-        location__company=user.employee.location.company).order_by(
-        '-user__last_login')
-    team = pager(team_list, request)
+        location__company=request.tenant.company).select_related(
+        'user', 'location')
+    team = paginate(team_list, request, ['-user__last_login', '-id'])
     return render(request, 'team.html',
-                  {'team': team, 'unread_messages': unread_messages,
-                   'alerts': alerts})
+                  {'team': team})
 
 
 def activate(request, uidb64, token):
@@ -285,26 +267,20 @@ def activate(request, uidb64, token):
 
 
 @login_required
+@read_only
 def team_member(request, pk):
     if request.method == "GET":
-        user = User.objects.get(id=pk)
-        logged_in_user = request.user
-        alerts, unread_messages = unread_messages_notification(user)
-        if user.employee.location.company_id == logged_in_user.employee.location.company_id:
-            requests = user.item_requests.all()
+        user = User.objects.select_related('employee__location').get(id=pk)
+        if user.employee.location.company_id == request.tenant.company_id:
+            requests = user.item_requests.select_related('item')
             return render(request, 'profile.html', {'requests': requests,
-                                                    'unread_messages': unread_messages,
-                                                    'alerts': alerts,
                                                     'user': user})
         else:
             return redirect('page_not_found')
 
 
 def error(request):
-    user = request.user
-    alerts, unread_messages = unread_messages_notification(user)
-    return render(request, '404.html',
-                  {'unread_messages': unread_messages, 'alerts': alerts})
+    return render(request, '404.html')
 
 
 @login_required
@@ -314,6 +290,7 @@ def image_upload(request):
     user.employee.image.delete()
     user.employee.image = image
     user.employee.save()
+    avatars.process_avatar.delay(user.employee.id)
     return redirect('profile')
 
 
@@ -342,15 +319,12 @@ def edit_user(request):
 @login_required
 def add_employee(request):
     user = request.user
-    company = user.employee.location.company
-    if user.groups.filter(name__in=["Company Admins", "Company Superusers"]):
+    company = request.tenant.company
+    if is_company_admin(user):
         if request.method == "GET":
-            alerts, unread_messages = unread_messages_notification(user)
-            locations = company.location_set.all()
+            locations = reference.locations(company.id)
             return render(request, 'add_employee.html',
-                          {'locations': locations,
-                           'unread_messages': unread_messages,
-                           'alerts': alerts})
+                          {'locations': locations})
         elif request.method == "POST":
             f_name = request.POST['first_name']
             l_name = request.POST['last_name']
@@ -374,16 +348,13 @@ def add_employee(request):
 @login_required
 def add_item(request):
     user = request.user
-    company = user.employee.location.company
-    if user.groups.filter(name__in=["Company Admins", "Company Superusers"]):
+    company = request.tenant.company
+    if is_company_admin(user):
         if request.method == "GET":
-            alerts, unread_messages = unread_messages_notification(user)
-            categories = company.category_set.all()
-            suppliers = company.supplier_set.all()
+            categories = reference.categories(company.id)
+            suppliers = reference.suppliers(company.id)
             return render(request, 'add_item.html',
-                          {'categories': categories, 'suppliers': suppliers,
-                           'unread_messages': unread_messages,
-                           'alerts': alerts})
+                          {'categories': categories, 'suppliers': suppliers})
         elif request.method == "POST":
             SKU = request.POST['SKU']
             description = request.POST['description']
@@ -393,32 +364,53 @@ def add_item(request):
             category = request.POST['category']
             is_returnable = bool(request.POST.get('returnable') == '1')
 
-            company = request.user.employee.location.company
-            item = Item.objects.create(SKU=SKU, supplier_id=supplier,
-                                       description=description, price=price,
-                                       quantity_purchased=quantity,
-                                       quantity_available=quantity,
-                                       category_id=category, company=company,
-                                       is_returnable=is_returnable)
-            item.save()
+            company = request.tenant.company
+            # The receipt is recorded by a receiver, in the same transaction.
+            with transaction.atomic():
+                item = Item.objects.create(
+                    SKU=SKU, supplier_id=supplier, description=description,
+                    price=price, quantity_purchased=quantity,
+                    quantity_available=quantity, category_id=category,
+                    company=company, is_returnable=is_returnable)
+                item.save()
             return redirect('items')
     else:
         return redirect('items')
 
 
 @login_required
+def import_items(request):
+    user = request.user
+    if is_company_admin(user):
+        context = {}
+        if request.method == "POST":
+            upload = request.FILES['items_file']
+            importer = ItemImporter(request.tenant.company)
+            try:
+                context['result'] = importer.run(
+                    read_rows(upload, upload.name))
+            except ValueError as error:
+                context['error'] = error
+        return render(request, 'import_items.html', context)
+    else:
+        return redirect('items')
+
+
+@login_required
+@read_only
 def item_requests(request):
     user = request.user
-    if user.groups.filter(name__in=["Company Admins", "Company Superusers"]):
-        alerts, unread_messages = unread_messages_notification(user)
+    if is_company_admin(user):
+        company = request.tenant.company
         pending_requests = ItemRequest.objects.filter(
-            item__company=user.employee.location.company, status='P')
-        pending_returns = ItemReturn.objects.filter(is_returned=False)
+            item__company=company, status='P').select_related(
+            'item', 'user__employee__location')
+        pending_returns = ItemReturn.objects.filter(
+            request__item__company=company, is_returned=False).select_related(
+            'request__item', 'request__user__employee__location')
         return render(request, 'item_requests.html',
                       {'pending_requests': pending_requests,
-                       'pending_returns': pending_returns,
-                       'unread_messages': unread_messages,
-                       'alerts': alerts})
+                       'pending_returns': pending_returns})
     else:
         return redirect('dashboard')
 
@@ -426,13 +418,10 @@ def item_requests(request):
 @login_required
 def add_category(request):
     user = request.user
-    company = user.employee.location.company
-    if user.groups.filter(name__in=["Company Admins", "Company Superusers"]):
+    company = request.tenant.company
+    if is_company_admin(user):
         if request.method == "GET":
-            alerts, unread_messages = unread_messages_notification(user)
-            return render(request, 'add_category.html',
-                          {'unread_messages': unread_messages,
-                           'alerts': alerts})
+            return render(request, 'add_category.html')
         elif request.method == "POST":
             name = request.POST['category']
             category = Category.objects.create(name=name, company=company)
@@ -444,28 +433,25 @@ def add_category(request):
 def messages(request):
     user = request.user
     employees = Employee.objects.filter(
-        location__company=user.employee.location.company).order_by(
-        'user__first_name')
-    alerts, unread_messages = unread_messages_notification(user)
+        location__company=request.tenant.company).order_by(
+        'user__first_name').select_related('user')
     inbox = user.inbox_messages.filter(from_user_id__gte=2).order_by(
+        '-date_sent').select_related('from_user')
+    alerts = user.inbox_messages.filter(from_user_id=1, read=False).order_by(
         '-date_sent')
-    sent = user.sent_messages.all()
+    sent = user.sent_messages.select_related('to_user')
     return render(request, 'messages.html',
-                  {'inbox': inbox, 'sent': sent,
-                   'unread_messages': unread_messages, 'alerts': alerts,
+                  {'inbox': inbox, 'sent': sent, 'alerts': alerts,
                    'employees': employees})
 
 
 @login_required
 def add_location(request):
     user = request.user
-    company = user.employee.location.company
-    if user.groups.filter(name__in=["Company Admins", "Company Superusers"]):
+    company = request.tenant.company
+    if is_company_admin(user):
         if request.method == "GET":
-            alerts, unread_messages = unread_messages_notification(user)
-            return render(request, 'add_location.html',
-                          {'unread_messages': unread_messages,
-                           'alerts': alerts})
+            return render(request, 'add_location.html')
         elif request.method == "POST":
             name = request.POST['name']
             address = request.POST['address']
@@ -482,15 +468,12 @@ def add_location(request):
 @login_required
 def message(request, pk):
     user = request.user
-    alerts, unread_messages = unread_messages_notification(user)
-    message = Message.objects.get(pk=pk)
+    message = Message.objects.select_related(
+        'from_user', 'to_user').get(pk=pk)
     if (user == message.to_user) | (user == message.from_user):
         if user == message.to_user:
-            message.read = True
-            message.save()
-        return render(request, 'message.html',
-                      {'unread_messages': unread_messages, 'alerts': alerts,
-                       'message': message})
+            notifications.mark_read(message)
+        return render(request, 'message.html', {'message': message})
     else:
         return redirect('page_not_found')
 
@@ -500,18 +483,39 @@ def send_message(request):
     to_user = request.POST['to_user']
     message = request.POST['message']
     user = request.user
-    Message.objects.create(to_user_id=to_user, text=message,
-                           from_user_id=user.id)
+    with transaction.atomic():
+        Message.objects.create(to_user_id=to_user, text=message,
+                               from_user_id=user.id)
     return redirect('messages')
 
 
+@login_required
+def message_updates(request):
+    """Return the unread counts and the messages newer than the ``since``
+    message id."""
+    try:
+        since = max(int(request.GET.get('since', 0)), 0)
+    except ValueError:
+        return JsonResponse({'error': 'Invalid since.'}, status=400)
+    return JsonResponse(notifications.updates(request.user, since))
+
+
 @login_required
 def place_order(request):
-    quantity = request.GET['quantity']
-    item_id = request.GET['item']
-    item = Item.objects.get(id=item_id)
-    item.order(quantity)
-    return None
+    company = request.tenant.company
+    if request.method == "POST" and is_company_admin(request.user):
+        item = Item.objects.get(SKU=request.POST['item'], company=company)
+        PurchaseOrder.objects.create(item=item,
+                                     quantity=request.POST['quantity'],
+                                     status='Q')
+    return redirect(purchase_orders)
+
+
+@login_required
+def reorder_items(request):
+    if request.method == "POST" and is_company_admin(request.user):
+        reorder.run(request.tenant.company)
+    return redirect(purchase_orders)
 
 
 def change_password(request):
@@ -539,24 +543,27 @@ def verify(request, pk):
 
 
 @login_required
+@read_only
 def purchase_orders(request):
-    company = request.user.employee.location.company
+    company = request.tenant.company
     po_list = PurchaseOrder.objects.filter(
-        item__company=company).order_by('-created_at')
-    purchase_orders = pager(po_list, request)
+        item__company=company).select_related('item')
+    purchase_orders = paginate(po_list, request, ['-created_at', '-id'])
     return render(request, 'purchase_orders.html',
                   {'purchase_orders': purchase_orders})
 
 
 @login_required
+@read_only
 def suppliers(request):
-    company = request.user.employee.location.company
-    suppliers_list = Supplier.objects.filter(company=company).order_by('id')
-    suppliers = pager(suppliers_list, request)
+    company = request.tenant.company
+    suppliers_list = Supplier.objects.filter(company=company)
+    suppliers = paginate(suppliers_list, request, ['id'])
     return render(request, 'suppliers.html', {'suppliers': suppliers})
 
 
 @login_required
+@read_only
 def supplier(request, pk):
     supplier = Supplier.objects.get(id=pk)
     return render(request, 'supplier.html', {'supplier': supplier})
@@ -569,7 +576,7 @@ def add_supplier(request):
         name = request.POST['name']
         email = request.POST['email']
         description = request.POST['description']
-        company = request.user.employee.location.company
+        company = request.tenant.company
         supplier = Supplier.objects.create(name=name, email=email,
                                            description=description,
                                            company=company)
@@ -578,7 +585,6 @@ def add_supplier(request):
 
 
 def edit_item(request, pk):
-    SKU = request.POST['SKU']
     price = request.POST['price']
     supplier = request.POST['supplier']
     category = request.POST['category']
@@ -590,7 +596,6 @@ def edit_item(request, pk):
     is_returnable = bool(request.POST.get('returnable') == '1')
 
     item = Item.objects.get(SKU=pk)
-    item.SKU = SKU
     item.price = price
     item.supplier_id = supplier
     item.category_id = category
@@ -600,7 +605,12 @@ def edit_item(request, pk):
     item.maximum_daily_usage = max_daily_usage
     item.average_daily_usage = avg_daily_usage
     item.is_returnable = is_returnable
-    item.save()
+    # Stock columns are left out so that fulfilments made since the item
+    # was read are not overwritten.
+    item.save(update_fields=[
+        'price', 'supplier', 'category', 'reorder_point', 'maximum_lead_time',
+        'average_lead_time', 'maximum_daily_usage', 'average_daily_usage',
+        'is_returnable'])
     return redirect('item', pk)
 
 
@@ -611,15 +621,21 @@ def request_item(request, pk):
     return redirect('profile')
 
 
+@login_required
 def fulfil_item_request(request, pk):
-    item_request = ItemRequest.objects.get(id=pk)
-    item_request.status = 'F'
-    item_request.save()
-    item_request.item.quantity_available -= 1
-    item_request.item.save()
-    if item_request.item.is_returnable == True:
-        item_return = ItemReturn.objects.create(request=item_request)
-        item_return.save()
+    if request.method == "POST" and is_company_admin(request.user):
+        stock.fulfil_requests([pk], request.tenant.company)
+    return redirect(item_requests)
+
+
+@login_required
+def fulfil_item_requests(request):
+    user = request.user
+    if request.method == "POST" and is_company_admin(user):
+        request_ids = [request_id
+                       for request_id in request.POST.getlist('request_ids')
+                       if request_id.isdigit()]
+        stock.fulfil_requests(request_ids, request.tenant.company)
     return redirect(item_requests)
 
 
@@ -629,10 +645,90 @@ def delete_item(request, pk):
     return redirect('profile')
 
 
+@login_required
 def return_item(request, pk):
-    item_return = ItemReturn.objects.get(id=pk)
-    item_return.is_returned = True
-    item_return.save()
-    item_return.request.item.quantity_available += 1
-    item_return.request.item.save()
+    if request.method == "POST" and is_company_admin(request.user):
+        stock.return_item(pk, request.tenant.company)
     return redirect(item_requests)
+
+
+ITEM_EXPORT_COLUMNS = [
+    ('SKU', 'SKU'),
+    ('description', 'description'),
+    ('price', 'price'),
+    ('quantity_purchased', 'quantity_purchased'),
+    ('quantity_available', 'quantity_available'),
+    ('reorder_point', 'reorder_point'),
+    ('returnable', 'is_returnable'),
+    ('supplier', 'supplier__name'),
+    ('category', 'category__name'),
+]
+
+ITEM_REQUEST_EXPORT_COLUMNS = [
+    ('id', 'id'),
+    ('SKU', 'item_id'),
+    ('item', 'item__description'),
+    ('user', 'user__email'),
+    ('status', 'status'),
+    ('created_at', 'created_at'),
+]
+
+PURCHASE_ORDER_EXPORT_COLUMNS = [
+    ('id', 'id'),
+    ('SKU', 'item_id'),
+    ('item', 'item__description'),
+    ('supplier', 'item__supplier__name'),
+    ('quantity', 'quantity'),
+    ('status', 'status'),
+    ('created_at', 'created_at'),
+]
+
+
+@login_required
+@read_only
+def export_items(request):
+    user = request.user
+    if is_company_admin(user):
+        items_list = Item.objects.filter(
+            company=request.tenant.company)
+        return export_response(items_list, ITEM_EXPORT_COLUMNS, 'items',
+                               request.GET.get('format', 'csv'))
+    else:
+        return redirect('items')
+
+
+@login_required
+@read_only
+def export_item_requests(request):
+    user = request.user
+    if is_company_admin(user):
+        requests_list = ItemRequest.objects.filter(
+            item__company=request.tenant.company)
+        if 'status' in request.GET:
+            requests_list = requests_list.filter(status=request.GET['status'])
+        return export_response(requests_list, ITEM_REQUEST_EXPORT_COLUMNS,
+                               'item_requests',
+                               request.GET.get('format', 'csv'))
+    else:
+        return redirect('dashboard')
+
+
+@login_required
+@read_only
+def export_purchase_orders(request):
+    user = request.user
+    if is_company_admin(user):
+        po_list = PurchaseOrder.objects.filter(
+            item__company=request.tenant.company)
+        return export_response(po_list, PURCHASE_ORDER_EXPORT_COLUMNS,
+                               'purchase_orders',
+                               request.GET.get('format', 'csv'))
+    else:
+        return redirect('dashboard')
+
+
+@login_required
+def query_stats(request):
+    if not request.user.is_staff:
+        return HttpResponseForbidden()
+    return JsonResponse(querystats.summary.report())